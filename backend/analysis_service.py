@@ -1,17 +1,31 @@
 from __future__ import annotations
 
+import asyncio
 import math
-from datetime import datetime, timezone
-from typing import Any
+import os
+from datetime import date, datetime, timezone
+from typing import Any, AsyncIterator
 
-from starlette.concurrency import run_in_threadpool
+import numpy as np
+from pydantic import TypeAdapter
 
 import fetch_reddit_data
 import fetch_stock_data
+import instrumentation
+import correlation
+import sentiment_store
+import timeseries
+from cache import TTLCache
 from schemas import (
     AnalysisMetrics,
     AnalysisResponse,
+    AnalysisStreamSummary,
+    BatchAnalysisResponse,
+    RedditPost,
     SentimentSummary,
+    SentimentTimeseriesPoint,
+    SourceFreshness,
+    StockHistoryColumns,
     StockHistoryPoint,
     StockSummary,
 )
@@ -34,31 +48,96 @@ def _as_int(value: Any) -> int | None:
     return int(number) if number is not None else None
 
 
-def _normalize_stock(ticker: str, stock_data: dict[str, Any] | None) -> StockSummary | None:
+def _iso_timestamp(timestamp: float) -> str:
+    return datetime.fromtimestamp(timestamp, tz=timezone.utc).isoformat().replace("+00:00", "Z")
+
+
+def _build_freshness(ticker: str) -> dict[str, SourceFreshness]:
+    entries = {
+        "stock": fetch_stock_data.get_freshness(ticker),
+        "reddit": fetch_reddit_data.get_freshness(ticker),
+    }
+    return {
+        source: SourceFreshness(
+            fetchedAt=_iso_timestamp(entry.stored_at),
+            freshUntil=_iso_timestamp(entry.fresh_until),
+            stale=entry.is_stale(),
+        )
+        for source, entry in entries.items()
+        if entry is not None
+    }
+
+
+HISTORY_FORMATS = ("rows", "columnar", "columnar-delta")
+
+
+def _row_value(row: dict[str, Any], name: str) -> Any:
+    title = name.title()
+    return row.get(title) if title in row else row.get(name)
+
+
+def history_columns(rows: list[dict[str, Any]], delta_dates: bool = False) -> StockHistoryColumns:
+    dated = [row for row in rows if row.get("Date") or row.get("date")]
+    dates = [row.get("Date") or row.get("date") for row in dated]
+    columns = {
+        name: [_as_float(_row_value(row, name)) for row in dated]
+        for name in ("open", "high", "low", "close")
+    }
+    columns["volume"] = [_as_int(_row_value(row, "volume")) for row in dated]
+    if delta_dates and dates:
+        days = timeseries.day_index(dates)
+        if not (days == timeseries.NO_DAY).any():
+            return StockHistoryColumns(
+                dateStart=timeseries.day_labels(days[:1])[0],
+                dateDeltas=np.diff(days, prepend=days[0]).tolist(),
+                **columns,
+            )
+    return StockHistoryColumns(date=dates, **columns)
+
+
+def _history_arrays(stock: StockSummary | None) -> tuple[np.ndarray, np.ndarray]:
+    if stock is None:
+        return np.empty(0, dtype=np.int64), np.empty(0)
+    columns = stock.historyColumns
+    if columns is None:
+        return (
+            timeseries.day_index([point.date for point in stock.history]),
+            np.array([point.close for point in stock.history], dtype=np.float64),
+        )
+    if columns.dateDeltas is not None:
+        days = timeseries.day_number(date.fromisoformat(columns.dateStart)) + np.cumsum(columns.dateDeltas)
+    else:
+        days = timeseries.day_index(columns.date or [])
+    return days.astype(np.int64), np.array(columns.close, dtype=np.float64)
+
+
+@instrumentation.span("normalize_stock")
+def _normalize_stock(
+    ticker: str,
+    stock_data: dict[str, Any] | None,
+    history_format: str = "rows",
+) -> StockSummary | None:
     if not stock_data:
         return None
 
     info = stock_data.get("info") or {}
-    history = [
-        StockHistoryPoint(
-            date=row.get("Date") or row.get("date"),
-            open=_as_float(row.get("Open") if "Open" in row else row.get("open")),
-            high=_as_float(row.get("High") if "High" in row else row.get("high")),
-            low=_as_float(row.get("Low") if "Low" in row else row.get("low")),
-            close=_as_float(row.get("Close") if "Close" in row else row.get("close")),
-            volume=_as_int(row.get("Volume") if "Volume" in row else row.get("volume")),
-        )
-        for row in stock_data.get("history", [])
-        if row.get("Date") or row.get("date")
-    ]
+    columns = history_columns(stock_data.get("history", []), delta_dates=history_format == "columnar-delta")
+    history = []
+    if history_format == "rows":
+        history = [
+            StockHistoryPoint(date=day, open=open_, high=high, low=low, close=close, volume=volume)
+            for day, open_, high, low, close, volume in zip(
+                columns.date, columns.open, columns.high, columns.low, columns.close, columns.volume
+            )
+        ]
 
     current_price = _as_float(info.get("currentPrice"))
-    if current_price is None and history:
-        current_price = history[-1].close
+    if current_price is None and columns.close:
+        current_price = columns.close[-1]
 
     previous_close = _as_float(info.get("previousClose"))
-    if previous_close is None and len(history) > 1:
-        previous_close = history[-2].close
+    if previous_close is None and len(columns.close) > 1:
+        previous_close = columns.close[-2]
 
     change = _as_float(info.get("regularMarketChange"))
     change_percent = _as_float(info.get("regularMarketChangePercent"))
@@ -84,6 +163,7 @@ def _normalize_stock(ticker: str, stock_data: dict[str, Any] | None) -> StockSum
         peRatio=_as_float(info.get("trailingPE")),
         beta=_as_float(info.get("beta")),
         history=history,
+        historyColumns=None if history_format == "rows" else columns,
     )
 
 
@@ -106,26 +186,80 @@ def _build_sentiment(posts: list[dict[str, Any]]) -> SentimentSummary:
     )
 
 
-def _pearson(x_values: list[float], y_values: list[float]) -> float | None:
-    if len(x_values) < 3 or len(x_values) != len(y_values):
-        return None
-    x_mean = sum(x_values) / len(x_values)
-    y_mean = sum(y_values) / len(y_values)
-    numerator = sum((x - x_mean) * (y - y_mean) for x, y in zip(x_values, y_values))
-    x_denominator = math.sqrt(sum((x - x_mean) ** 2 for x in x_values))
-    y_denominator = math.sqrt(sum((y - y_mean) ** 2 for y in y_values))
-    if not x_denominator or not y_denominator:
-        return None
-    return round(numerator / (x_denominator * y_denominator), 3)
+ROLLING_CORRELATION_WINDOW = 20
+MAX_LEAD_DAYS = 5
+
+
+def _rounded(value: float) -> float | None:
+    return round(float(value), 3) if np.isfinite(value) else None
+
+
+def _rounded_list(values: np.ndarray) -> list[float | None]:
+    return [None if value != value else value for value in np.round(values, 3).tolist()]
 
 
+def _correlation_metrics(
+    price_days: np.ndarray,
+    closes: np.ndarray,
+    sentiment_series: list[dict[str, Any]],
+) -> dict[str, Any]:
+    active = [item for item in sentiment_series if item.get("post_count", 1)]
+    if not len(closes) or not active or not closes[0]:
+        return {}
+
+    sentiment_days = timeseries.day_index([item["date"] for item in active])
+    known_days = sentiment_days[sentiment_days != timeseries.NO_DAY]
+    if not len(known_days):
+        return {}
+    start_day = int(known_days.min())
+    span = int(known_days.max()) - start_day + 1 + MAX_LEAD_DAYS
+
+    price_moves = timeseries.scatter_days(
+        price_days,
+        (closes - closes[0]) / closes[0] * 100,
+        start_day,
+        span,
+    )
+    scores = timeseries.scatter_days(
+        sentiment_days,
+        np.fromiter((item["score"] for item in active), dtype=np.float64, count=len(active)),
+        start_day,
+        span,
+    )
+
+    lagged, observations = correlation.lagged_pearson(scores, price_moves, MAX_LEAD_DAYS)
+    matched_days = np.flatnonzero(np.isfinite(scores) & np.isfinite(price_moves))
+    rolling = correlation.rolling_pearson(
+        scores[matched_days], price_moves[matched_days], ROLLING_CORRELATION_WINDOW
+    )
+    leads = np.abs(lagged[1:])
+    return {
+        "correlation": _rounded(lagged[0]),
+        "rollingWindow": ROLLING_CORRELATION_WINDOW,
+        "rollingCorrelation": [
+            {"date": day, "correlation": value}
+            for day, value in zip(
+                timeseries.day_labels(matched_days[ROLLING_CORRELATION_WINDOW - 1:] + start_day),
+                _rounded_list(rolling),
+            )
+        ],
+        "laggedCorrelations": [
+            {"lagDays": lag, "correlation": _rounded(value), "observations": int(count)}
+            for lag, (value, count) in enumerate(zip(lagged.tolist(), observations.tolist()))
+        ],
+        "strongestLeadDays": int(np.nanargmax(leads)) + 1 if np.isfinite(leads).any() else None,
+    }
+
+
+@instrumentation.span("build_metrics")
 def _build_metrics(
     stock: StockSummary | None,
     sentiment: SentimentSummary,
     sentiment_series: list[dict[str, Any]],
 ) -> AnalysisMetrics:
-    history = stock.history if stock else []
-    closes = [point.close for point in history if point.close is not None]
+    price_days, closes = _history_arrays(stock)
+    priced = np.isfinite(closes)
+    price_days, closes = price_days[priced], closes[priced]
     if len(closes) < 2 or sentiment.postCount == 0:
         return AnalysisMetrics(
             averageSentiment=sentiment.score if sentiment.postCount else None,
@@ -134,7 +268,7 @@ def _build_metrics(
             inverseSignal="unknown",
         )
 
-    price_change = closes[-1] - closes[0]
+    price_change = float(closes[-1] - closes[0])
     price_change_percent = (price_change / closes[0]) * 100 if closes[0] else None
     if price_change_percent is None:
         price_direction = "unknown"
@@ -173,16 +307,6 @@ def _build_metrics(
     elif alignment == "mixed":
         inverse_signal = "unclear"
 
-    sentiment_by_date = {item["date"]: item["score"] for item in sentiment_series}
-    matched_sentiment: list[float] = []
-    matched_prices: list[float] = []
-    base_close = closes[0]
-    for point in history:
-        if point.close is None or point.date not in sentiment_by_date or not base_close:
-            continue
-        matched_sentiment.append(float(sentiment_by_date[point.date]))
-        matched_prices.append(((point.close - base_close) / base_close) * 100)
-
     return AnalysisMetrics(
         averageSentiment=sentiment.score,
         priceChange=round(price_change, 3),
@@ -191,40 +315,291 @@ def _build_metrics(
         alignment=alignment,
         alignmentLabel=alignment_label,
         inverseSignal=inverse_signal,
-        correlation=_pearson(matched_sentiment, matched_prices),
+        **_correlation_metrics(price_days, closes, sentiment_series),
     )
 
 
-async def get_analysis(ticker: str, period: str, days: int, limit: int) -> AnalysisResponse:
+ANALYSIS_CACHE_TTL_SECONDS = int(os.getenv("ANALYSIS_CACHE_TTL_SECONDS", "86400"))
+ANALYSIS_RESPONSE_ADAPTER = TypeAdapter(AnalysisResponse)
+_response_cache = TTLCache[bytes](
+    ttl_seconds=ANALYSIS_CACHE_TTL_SECONDS,
+    max_entries=512,
+    max_bytes=64 * 1024 * 1024,
+    name="analysis",
+)
+STOCK_TIMEOUT_SECONDS = 20.0
+REDDIT_TIMEOUT_SECONDS = 15.0
+BATCH_MAX_TICKERS = 50
+BATCH_CONCURRENCY = 8
+SOURCE_ERROR_PREFIXES = {
+    "stock": "Stock data unavailable",
+    "posts": "Reddit data unavailable",
+    "sentimentSeries": "Reddit data unavailable",
+}
+STREAM_EVENT_ADAPTERS: dict[str, TypeAdapter] = {
+    "stock": TypeAdapter(StockSummary | None),
+    "sentiment": TypeAdapter(SentimentSummary),
+    "posts": TypeAdapter(list[RedditPost]),
+    "sentimentSeries": TypeAdapter(list[SentimentTimeseriesPoint]),
+    "metrics": TypeAdapter(AnalysisMetrics),
+    "done": TypeAdapter(AnalysisStreamSummary),
+}
+
+
+def cache_stats() -> dict[str, Any]:
+    return {"analysis": _response_cache.stats()}
+
+
+def response_cache_key(
+    ticker: str,
+    period: str,
+    days: int,
+    limit: int,
+    history_format: str = "rows",
+) -> str | None:
+    stock_entry = fetch_stock_data.get_freshness(ticker)
+    reddit_entry = fetch_reddit_data.get_freshness(ticker)
+    if stock_entry is None or reddit_entry is None:
+        return None
+    versions = ":".join(
+        f"{entry.version}{'s' if entry.is_stale() else ''}" for entry in (stock_entry, reddit_entry)
+    )
+    today = datetime.now(timezone.utc).date().isoformat()
+    watermark = sentiment_store.store.watermark(ticker)
+    return f"{ticker}:{period}:{days}:{limit}:{history_format}:{today}:{versions}:{watermark}"
+
+
+async def _load_stock(ticker: str, period: str, history_format: str) -> StockSummary | None:
+    stock_data = await fetch_stock_data.get_stock_data_async(ticker, period)
+    return _normalize_stock(ticker, stock_data, history_format)
+
+
+def _now_iso() -> str:
+    return datetime.now(timezone.utc).isoformat().replace("+00:00", "Z")
+
+
+def _describe_error(exc: BaseException, timeout_seconds: float) -> str:
+    if isinstance(exc, asyncio.TimeoutError):
+        return f"timed out after {timeout_seconds:g}s"
+    return str(exc)
+
+
+async def _settle_sources(
+    ticker: str,
+    period: str,
+    days: int,
+    limit: int,
+    history_format: str,
+) -> AsyncIterator[tuple[str, Any, float]]:
+    loaders = {
+        "stock": (_load_stock(ticker, period, history_format), STOCK_TIMEOUT_SECONDS),
+        "posts": (fetch_reddit_data.get_reddit_data(ticker, limit=limit), REDDIT_TIMEOUT_SECONDS),
+        "sentimentSeries": (fetch_reddit_data.get_sentiment_timeseries(ticker, days=days), REDDIT_TIMEOUT_SECONDS),
+    }
+    tasks = {
+        asyncio.ensure_future(asyncio.wait_for(loader, timeout_seconds)): (section, timeout_seconds)
+        for section, (loader, timeout_seconds) in loaders.items()
+    }
+    order = list(loaders)
+    pending = set(tasks)
+    try:
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in sorted(done, key=lambda task: order.index(tasks[task][0])):
+                section, timeout_seconds = tasks[task]
+                result = task.exception() or task.result()
+                yield section, result, timeout_seconds
+    finally:
+        for task in pending:
+            task.cancel()
+
+
+async def _run_analysis(
+    ticker: str,
+    period: str,
+    days: int,
+    limit: int,
+    history_format: str = "rows",
+) -> AsyncIterator[tuple[str, Any]]:
     normalized_ticker = ticker.upper().strip()
     partial_errors: list[str] = []
     stock = None
     posts: list[dict[str, Any]] = []
     sentiment_series: list[dict[str, Any]] = []
 
-    try:
-        stock_data = await run_in_threadpool(fetch_stock_data.get_stock_data, normalized_ticker, period)
-        stock = _normalize_stock(normalized_ticker, stock_data)
-    except Exception as exc:
-        partial_errors.append(f"Stock data unavailable: {exc}")
-
-    try:
-        posts = await fetch_reddit_data.get_reddit_data(normalized_ticker, limit=limit)
-        sentiment_series = await fetch_reddit_data.get_sentiment_timeseries(normalized_ticker, days=days)
-    except Exception as exc:
-        partial_errors.append(f"Reddit data unavailable: {exc}")
+    async for section, result, timeout_seconds in _settle_sources(
+        normalized_ticker, period, days, limit, history_format
+    ):
+        if isinstance(result, BaseException):
+            message = f"{SOURCE_ERROR_PREFIXES[section]}: {_describe_error(result, timeout_seconds)}"
+            if message not in partial_errors:
+                partial_errors.append(message)
+            result = None if section == "stock" else []
+
+        if section == "stock":
+            stock = result
+            yield "stock", stock
+        elif section == "posts":
+            posts = result
+            yield "sentiment", _build_sentiment(posts)
+            yield "posts", posts
+        else:
+            sentiment_series = result
+            yield "sentimentSeries", sentiment_series
 
     sentiment = _build_sentiment(posts)
     metrics = _build_metrics(stock, sentiment, sentiment_series)
+    yield "metrics", metrics
 
-    return AnalysisResponse(
+    yield "done", AnalysisResponse(
         ticker=normalized_ticker,
         stock=stock,
         sentiment=sentiment,
         sentimentSeries=sentiment_series,
         posts=posts,
         metrics=metrics,
-        generatedAt=datetime.now(timezone.utc).isoformat().replace("+00:00", "Z"),
+        generatedAt=_now_iso(),
+        freshness=_build_freshness(normalized_ticker),
         sources=["Defeat Beta API", "Reddit", "VADER"],
         partialErrors=partial_errors,
     )
+
+
+async def get_analysis(
+    ticker: str,
+    period: str,
+    days: int,
+    limit: int,
+    history_format: str = "rows",
+) -> AnalysisResponse:
+    async for event, payload in _run_analysis(ticker, period, days, limit, history_format):
+        if event == "done":
+            return payload
+    raise RuntimeError("Analysis finished without a response")
+
+
+async def get_analysis_json(
+    ticker: str,
+    period: str,
+    days: int,
+    limit: int,
+    history_format: str = "rows",
+) -> tuple[bytes, str | None]:
+    normalized_ticker = ticker.upper().strip()
+    cache_key = response_cache_key(normalized_ticker, period, days, limit, history_format)
+    if cache_key is not None:
+        cached = _response_cache.get(cache_key)
+        if cached is not None:
+            return cached, cache_key
+
+    response = await get_analysis(normalized_ticker, period, days, limit, history_format)
+    with instrumentation.span("serialize"):
+        body = ANALYSIS_RESPONSE_ADAPTER.dump_json(response)
+    settled_key = _settled_key(cache_key, response, period, days, limit, history_format)
+    if settled_key is not None:
+        _response_cache.set(settled_key, body)
+    return body, settled_key
+
+
+def cached_response(
+    ticker: str,
+    period: str,
+    days: int,
+    limit: int,
+    history_format: str = "rows",
+) -> tuple[str | None, bytes | None]:
+    cache_key = response_cache_key(ticker.upper().strip(), period, days, limit, history_format)
+    cached = _response_cache.get(cache_key) if cache_key is not None else None
+    return (cache_key, cached) if cached is not None else (None, None)
+
+
+def _settled_key(
+    cache_key: str | None,
+    response: AnalysisResponse,
+    period: str,
+    days: int,
+    limit: int,
+    history_format: str,
+) -> str | None:
+    settled_key = response_cache_key(response.ticker, period, days, limit, history_format)
+    if response.partialErrors or settled_key is None or cache_key not in (None, settled_key):
+        return None
+    return settled_key
+
+
+async def _replay_analysis(response: AnalysisResponse) -> AsyncIterator[tuple[str, Any]]:
+    yield "stock", response.stock
+    yield "sentiment", response.sentiment
+    yield "posts", response.posts
+    yield "sentimentSeries", response.sentimentSeries
+    yield "metrics", response.metrics
+    yield "done", response
+
+
+def _encode_event(event: str, data: bytes, stream_format: str) -> bytes:
+    if stream_format == "sse":
+        return b"event: " + event.encode() + b"\ndata: " + data + b"\n\n"
+    return b'{"event":"' + event.encode() + b'","data":' + data + b"}\n"
+
+
+async def stream_analysis(
+    ticker: str,
+    period: str,
+    days: int,
+    limit: int,
+    stream_format: str = "ndjson",
+    history_format: str = "rows",
+    cached_body: bytes | None = None,
+) -> AsyncIterator[bytes]:
+    if cached_body is not None:
+        events = _replay_analysis(ANALYSIS_RESPONSE_ADAPTER.validate_json(cached_body))
+    else:
+        cache_key = response_cache_key(ticker.upper().strip(), period, days, limit, history_format)
+        events = _run_analysis(ticker, period, days, limit, history_format)
+    async for event, payload in events:
+        if event == "done":
+            if cached_body is None:
+                settled_key = _settled_key(cache_key, payload, period, days, limit, history_format)
+                if settled_key is not None:
+                    with instrumentation.span("serialize"):
+                        _response_cache.set(settled_key, ANALYSIS_RESPONSE_ADAPTER.dump_json(payload))
+            payload = AnalysisStreamSummary(
+                ticker=payload.ticker,
+                generatedAt=payload.generatedAt,
+                freshness=payload.freshness,
+                sources=payload.sources,
+                partialErrors=payload.partialErrors,
+            )
+        adapter = STREAM_EVENT_ADAPTERS[event]
+        with instrumentation.span("serialize"):
+            data = adapter.dump_json(adapter.validate_python(payload))
+        yield _encode_event(event, data, stream_format)
+
+
+async def get_batch_analysis(
+    tickers: list[str],
+    period: str,
+    days: int,
+    limit: int,
+    history_format: str = "rows",
+) -> BatchAnalysisResponse:
+    unique_tickers = list(dict.fromkeys(ticker.upper().strip() for ticker in tickers))
+    semaphore = asyncio.Semaphore(BATCH_CONCURRENCY)
+
+    async def analyze(ticker: str) -> AnalysisResponse:
+        async with semaphore:
+            return await get_analysis(ticker, period=period, days=days, limit=limit, history_format=history_format)
+
+    outcomes = await asyncio.gather(*(analyze(ticker) for ticker in unique_tickers), return_exceptions=True)
+
+    results: list[AnalysisResponse] = []
+    errors: dict[str, str] = {}
+    for ticker, outcome in zip(unique_tickers, outcomes):
+        if isinstance(outcome, Exception):
+            errors[ticker] = str(outcome) or type(outcome).__name__
+            continue
+        results.append(outcome)
+        if outcome.partialErrors:
+            errors[ticker] = "; ".join(outcome.partialErrors)
+
+    return BatchAnalysisResponse(results=results, errors=errors, generatedAt=_now_iso())
@@ -0,0 +1,50 @@
+"""Compare payload size and serialize time of row and columnar price history.
+
+Run from ``backend/``::
+
+    python -m benchmarks.bench_history_format
+"""
+
+import sys
+import timeit
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import analysis_service  # noqa: E402
+import fetch_stock_data  # noqa: E402
+from benchmarks.bench_stock_history import synthetic_price_frame  # noqa: E402
+from schemas import AnalysisMetrics, AnalysisResponse, SentimentSummary  # noqa: E402
+
+
+def best_of(fn, repeat: int = 5, number: int = 3) -> float:
+    return min(timeit.repeat(fn, repeat=repeat, number=number)) / number
+
+
+def build_response(stock_data: dict, history_format: str) -> bytes:
+    response = AnalysisResponse(
+        ticker="BENCH",
+        stock=analysis_service._normalize_stock("BENCH", stock_data, history_format),
+        sentiment=SentimentSummary(label="neutral", displayLabel="Mixed", score=0.0, postCount=0),
+        metrics=AnalysisMetrics(),
+        generatedAt="2026-06-15T00:00:00Z",
+    )
+    return analysis_service.ANALYSIS_RESPONSE_ADAPTER.dump_json(response)
+
+
+def main() -> None:
+    full_frame = synthetic_price_frame("1985-01-01", "2026-06-15")
+    print(f"{'period':<8}{'format':<16}{'rows':>8}{'bytes':>12}{'vs rows':>9}{'build+dump ms':>16}")
+    for period in ("1y", "5y", "all"):
+        frame = fetch_stock_data._filter_price_frame(full_frame, period)
+        stock_data = {"info": {"symbol": "BENCH"}, "history": fetch_stock_data._history_records(frame)}
+        row_size = len(build_response(stock_data, "rows"))
+        for history_format in analysis_service.HISTORY_FORMATS:
+            size = len(build_response(stock_data, history_format))
+            elapsed = best_of(lambda: build_response(stock_data, history_format))
+            print(f"{period:<8}{history_format:<16}{len(frame):>8}{size:>12}{size / row_size:>8.0%}"
+                  f"{elapsed * 1000:>16.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""Compare per-window pure Python correlations with the vectorized metrics engine.
+
+Run from ``backend/``::
+
+    python -m benchmarks.bench_metrics
+"""
+
+import math
+import sys
+import timeit
+from datetime import date, timedelta
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import analysis_service  # noqa: E402
+from schemas import SentimentSummary, StockHistoryPoint, StockSummary  # noqa: E402
+
+END_DATE = date(2026, 6, 15)
+
+
+def legacy_pearson(x_values: list[float], y_values: list[float]) -> float | None:
+    if len(x_values) < 3 or len(x_values) != len(y_values):
+        return None
+    x_mean = sum(x_values) / len(x_values)
+    y_mean = sum(y_values) / len(y_values)
+    numerator = sum((x - x_mean) * (y - y_mean) for x, y in zip(x_values, y_values))
+    x_denominator = math.sqrt(sum((x - x_mean) ** 2 for x in x_values))
+    y_denominator = math.sqrt(sum((y - y_mean) ** 2 for y in y_values))
+    if not x_denominator or not y_denominator:
+        return None
+    return round(numerator / (x_denominator * y_denominator), 3)
+
+
+def legacy_metrics(history: list[StockHistoryPoint], series: list[dict]) -> dict:
+    base_close = history[0].close
+    moves = {point.date: (point.close - base_close) / base_close * 100 for point in history}
+    scores = {item["date"]: item["score"] for item in series}
+    matched = [(scores[day], move) for day, move in moves.items() if day in scores]
+    sentiment, prices = [pair[0] for pair in matched], [pair[1] for pair in matched]
+    window = analysis_service.ROLLING_CORRELATION_WINDOW
+    lagged = []
+    for lag in range(analysis_service.MAX_LEAD_DAYS + 1):
+        pairs = [
+            (score, moves[shifted])
+            for day, score in scores.items()
+            if (shifted := (date.fromisoformat(day) + timedelta(days=lag)).isoformat()) in moves
+        ]
+        lagged.append(legacy_pearson([pair[0] for pair in pairs], [pair[1] for pair in pairs]))
+    return {
+        "correlation": legacy_pearson(sentiment, prices),
+        "rolling": [
+            legacy_pearson(sentiment[start:start + window], prices[start:start + window])
+            for start in range(len(sentiment) - window + 1)
+        ],
+        "lagged": lagged,
+    }
+
+
+def synthetic_inputs(years: int, seed: int = 13) -> tuple[StockSummary, list[dict]]:
+    rng = np.random.default_rng(seed)
+    days = [END_DATE - timedelta(days=offset) for offset in range(years * 365, -1, -1)]
+    sessions = [day for day in days if day.weekday() < 5]
+    closes = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, len(sessions))))
+    history = [StockHistoryPoint(date=day.isoformat(), close=float(close)) for day, close in zip(sessions, closes)]
+    series = [
+        {"date": day.isoformat(), "score": float(score), "sentiment": "neutral", "post_count": 1}
+        for day, score in zip(days, rng.uniform(-0.8, 0.8, len(days)))
+    ]
+    return StockSummary(symbol="BENCH", history=history), series
+
+
+def best_of(fn, repeat: int = 5, number: int = 3) -> float:
+    return min(timeit.repeat(fn, repeat=repeat, number=number)) / number
+
+
+def main() -> None:
+    sentiment = SentimentSummary(label="positive", displayLabel="Bullish", score=0.2, postCount=10)
+    print(f"{'window':<8}{'sessions':>10}{'python ms':>12}{'vectorized ms':>16}{'speedup':>10}")
+    for years in (1, 5, 10):
+        stock, series = synthetic_inputs(years)
+        legacy = legacy_metrics(stock.history, series)
+        metrics = analysis_service._build_metrics(stock, sentiment, series)
+        assert legacy["correlation"] == metrics.correlation
+        assert legacy["lagged"] == [point.correlation for point in metrics.laggedCorrelations]
+        assert len(legacy["rolling"]) == len(metrics.rollingCorrelation)
+        python = best_of(lambda: legacy_metrics(stock.history, series))
+        vectorized = best_of(lambda: analysis_service._build_metrics(stock, sentiment, series))
+        print(f"{years:<2}y{'':<5}{len(stock.history):>10}{python * 1000:>12.2f}{vectorized * 1000:>16.2f}"
+              f"{python / vectorized:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""Compare concurrent provider frame fetching with the old one-after-another loop.
+
+Each frame call sleeps for a simulated provider round trip. Run from ``backend/``::
+
+    python -m benchmarks.bench_provider_frames
+"""
+
+import statistics
+import sys
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import fetch_stock_data  # noqa: E402
+
+ROUND_TRIPS = {"price": 0.30, "market_cap": 0.12, "ttm_pe": 0.18, "beta": 0.25}
+
+
+class SimulatedTicker:
+    def __init__(self, ticker: str):
+        self.ticker = ticker
+
+    def _frame(self, name: str) -> pd.DataFrame:
+        time.sleep(ROUND_TRIPS[name])
+        return pd.DataFrame([{"symbol": self.ticker, name: 1.0}])
+
+    def price(self) -> pd.DataFrame:
+        return self._frame("price")
+
+    def market_capitalization(self) -> pd.DataFrame:
+        return self._frame("market_cap")
+
+    def ttm_pe(self) -> pd.DataFrame:
+        return self._frame("ttm_pe")
+
+    def beta(self, _period: str) -> pd.DataFrame:
+        return self._frame("beta")
+
+
+def legacy_provider_frames(ticker: str) -> dict:
+    provider = SimulatedTicker(ticker)
+    frames = {"price": provider.price()}
+    optional_frames = {
+        "market_cap": provider.market_capitalization,
+        "ttm_pe": provider.ttm_pe,
+        "beta": lambda: provider.beta("5y"),
+    }
+    for key, fetch_frame in optional_frames.items():
+        try:
+            frames[key] = fetch_frame()
+        except Exception:
+            frames[key] = None
+    return frames
+
+
+def _time(fetch, runs: int) -> float:
+    samples = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        fetch("BENCH")
+        samples.append(time.perf_counter() - started)
+    return statistics.median(samples)
+
+
+def main(runs: int = 5) -> None:
+    sys.modules["defeatbeta_api.data.ticker"] = SimpleNamespace(Ticker=SimulatedTicker)
+    legacy = _time(legacy_provider_frames, runs)
+    concurrent = _time(fetch_stock_data._fetch_provider_frames, runs)
+    print(f"sum of round trips  {sum(ROUND_TRIPS.values()) * 1000:7.1f} ms")
+    print(f"slowest round trip  {max(ROUND_TRIPS.values()) * 1000:7.1f} ms")
+    print(f"sequential          {legacy * 1000:7.1f} ms")
+    print(f"concurrent          {concurrent * 1000:7.1f} ms  ({legacy / concurrent:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""Measure VADER scoring throughput (posts/sec) on a synthetic corpus.
+
+Run from ``backend/``::
+
+    python -m benchmarks.bench_sentiment [corpus_size]
+"""
+
+import asyncio
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import sentiment_scoring  # noqa: E402
+from sentiment_scoring import SentimentScorer  # noqa: E402
+
+WORDS = (
+    "calls puts moon crash earnings beat miss guidance bullish bearish hold sell buy "
+    "tendies bagholder rocket dump squeeze dividend rally tank great terrible love hate"
+).split()
+
+
+def synthetic_corpus(size: int, seed: int = 11) -> list[tuple[str, str]]:
+    rng = random.Random(seed)
+    return [
+        (f"post{index}", " ".join(rng.choice(WORDS) for _ in range(rng.randint(8, 80))))
+        for index in range(size)
+    ]
+
+
+def report(label: str, count: int, elapsed: float) -> None:
+    print(f"{label:<34}{count:>8}{elapsed * 1000:>12.1f} ms{count / elapsed:>14.0f} posts/s")
+
+
+async def main(size: int) -> None:
+    corpus = synthetic_corpus(size)
+    texts = [text for _, text in corpus]
+
+    started = time.perf_counter()
+    sentiment_scoring.score_texts(texts)
+    report("serial on one thread", size, time.perf_counter() - started)
+
+    scorer = SentimentScorer(process_batch_size=1)
+    try:
+        await scorer.score_many(corpus[:1])
+        scorer.clear()
+        started = time.perf_counter()
+        await scorer.score_many(corpus)
+        report(f"process pool ({scorer.max_processes} workers)", size, time.perf_counter() - started)
+
+        started = time.perf_counter()
+        await scorer.score_many(corpus)
+        report("cached re-score", size, time.perf_counter() - started)
+    finally:
+        scorer.shutdown()
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 5000))
@@ -0,0 +1,78 @@
+"""Compare the column-wise history builder with the old iterrows loop.
+
+Run from ``backend/``::
+
+    python -m benchmarks.bench_stock_history
+"""
+
+import sys
+import timeit
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import fetch_stock_data  # noqa: E402
+
+
+def synthetic_price_frame(start: str, end: str, seed: int = 7) -> pd.DataFrame:
+    dates = pd.bdate_range(start, end)
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, len(dates))))
+    frame = pd.DataFrame({
+        "symbol": "BENCH",
+        "report_date": dates,
+        "open": close * (1 + rng.normal(0, 0.002, len(dates))),
+        "high": close * 1.01,
+        "low": close * 0.99,
+        "close": close,
+        "volume": rng.integers(1_000_000, 50_000_000, len(dates)).astype(float),
+    })
+    frame.loc[frame.sample(frac=0.01, random_state=seed).index, "open"] = np.nan
+    return frame
+
+
+def legacy_history_records(price_frame: pd.DataFrame) -> list[dict[str, Any]]:
+    def format_report_date(value: Any) -> str:
+        if hasattr(value, "strftime"):
+            return value.strftime("%Y-%m-%d")
+        return str(value)[:10]
+
+    clean = fetch_stock_data._clean_number
+    row_value = fetch_stock_data._row_value
+    history = []
+    for _, row in price_frame.iterrows():
+        volume = clean(row_value(row, "volume"))
+        history.append({
+            "Date": format_report_date(row_value(row, "report_date")),
+            "Open": clean(row_value(row, "open")),
+            "High": clean(row_value(row, "high")),
+            "Low": clean(row_value(row, "low")),
+            "Close": clean(row_value(row, "close")),
+            "Volume": int(volume) if volume is not None else None,
+            "Dividends": None,
+            "Stock Splits": None,
+        })
+    return history
+
+
+def best_of(fn, repeat: int = 5, number: int = 3) -> float:
+    return min(timeit.repeat(fn, repeat=repeat, number=number)) / number
+
+
+def main() -> None:
+    full_frame = synthetic_price_frame("1985-01-01", "2026-06-15")
+    print(f"{'period':<8}{'rows':>8}{'iterrows ms':>14}{'vectorized ms':>16}{'speedup':>10}")
+    for period in ("5y", "all"):
+        frame = fetch_stock_data._filter_price_frame(full_frame, period)
+        assert legacy_history_records(frame) == fetch_stock_data._history_records(frame)
+        legacy = best_of(lambda: legacy_history_records(frame))
+        vectorized = best_of(lambda: fetch_stock_data._history_records(frame))
+        print(f"{period:<8}{len(frame):>8}{legacy * 1000:>14.2f}{vectorized * 1000:>16.2f}{legacy / vectorized:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
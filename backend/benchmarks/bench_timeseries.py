@@ -0,0 +1,144 @@
+"""Compare the day-by-day sentiment timeseries loop with the array-backed builder.
+
+Run from ``backend/``::
+
+    python -m benchmarks.bench_timeseries [days]
+"""
+
+import sys
+import timeit
+from collections import defaultdict
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import analysis_service  # noqa: E402
+import fetch_reddit_data  # noqa: E402
+import timeseries  # noqa: E402
+from schemas import SentimentSummary, StockHistoryPoint, StockSummary  # noqa: E402
+
+END_DATE = date(2026, 6, 15)
+
+
+def synthetic_daily_rows(days: int, fill: float, seed: int = 5) -> list[tuple[date, float, int]]:
+    rng = np.random.default_rng(seed)
+    offsets = np.flatnonzero(rng.random(days + 1) < fill)
+    counts = rng.integers(1, 40, len(offsets))
+    sums = rng.uniform(-0.6, 0.6, len(offsets)) * counts
+    start = END_DATE - timedelta(days=days)
+    return [
+        (start + timedelta(days=int(offset)), float(score_sum), int(count))
+        for offset, score_sum, count in zip(offsets, sums, counts)
+    ]
+
+
+def legacy_timeseries(rows: list[tuple[date, float, int]], days: int) -> list[dict[str, Any]]:
+    totals: dict[date, list[float]] = defaultdict(lambda: [0.0, 0])
+    for day, score_sum, count in rows:
+        totals[day][0] += score_sum
+        totals[day][1] += count
+
+    series = []
+    current_date = END_DATE - timedelta(days=days)
+    while current_date <= END_DATE:
+        if current_date in totals:
+            score_sum, count = totals[current_date]
+            average = score_sum / count
+            series.append({
+                "date": current_date.strftime("%Y-%m-%d"),
+                "score": average,
+                "sentiment": fetch_reddit_data.classify_sentiment(average),
+                "post_count": count,
+            })
+        else:
+            series.append({
+                "date": current_date.strftime("%Y-%m-%d"),
+                "score": 0.0,
+                "sentiment": "neutral",
+                "post_count": 0,
+            })
+        current_date += timedelta(days=1)
+    return series
+
+
+def columnar_timeseries(rows: list[tuple[date, float, int]], days: int) -> list[dict[str, Any]]:
+    return timeseries.dense_daily_series(
+        timeseries.day_index([day.isoformat() for day, _, _ in rows]),
+        np.fromiter((score_sum for _, score_sum, _ in rows), dtype=np.float64, count=len(rows)),
+        np.fromiter((count for _, _, count in rows), dtype=np.int64, count=len(rows)),
+        timeseries.day_number(END_DATE - timedelta(days=days)),
+        timeseries.day_number(END_DATE),
+    ).records()
+
+
+def legacy_alignment(history: list[StockHistoryPoint], series: list[dict[str, Any]]) -> tuple[list, list]:
+    sentiment_by_date = {item["date"]: item["score"] for item in series}
+    base_close = history[0].close
+    matched_sentiment, matched_prices = [], []
+    for point in history:
+        if point.close is None or point.date not in sentiment_by_date:
+            continue
+        matched_sentiment.append(float(sentiment_by_date[point.date]))
+        matched_prices.append(((point.close - base_close) / base_close) * 100)
+    return matched_sentiment, matched_prices
+
+
+def columnar_alignment(history: list[StockHistoryPoint], series: list[dict[str, Any]]) -> tuple[list, list]:
+    sentiment_days = timeseries.day_index([item["date"] for item in series])
+    start_day = int(sentiment_days.min())
+    span = int(sentiment_days.max()) - start_day + 1
+    closes = np.fromiter((point.close for point in history), dtype=np.float64, count=len(history))
+    prices = timeseries.scatter_days(
+        timeseries.day_index([point.date for point in history]),
+        (closes - closes[0]) / closes[0] * 100,
+        start_day,
+        span,
+    )
+    scores = timeseries.scatter_days(
+        sentiment_days,
+        np.fromiter((item["score"] for item in series), dtype=np.float64, count=len(series)),
+        start_day,
+        span,
+    )
+    matched = np.isfinite(scores) & np.isfinite(prices)
+    return scores[matched].tolist(), prices[matched].tolist()
+
+
+def best_of(fn, repeat: int = 5, number: int = 5) -> float:
+    return min(timeit.repeat(fn, repeat=repeat, number=number)) / number
+
+
+def main(days: int) -> None:
+    print(f"{'posting days':<14}{'rows':>8}{'loop ms':>12}{'columnar ms':>14}{'speedup':>10}")
+    for fill in (0.05, 0.5, 1.0):
+        rows = synthetic_daily_rows(days, fill)
+        legacy = legacy_timeseries(rows, days)
+        columnar = columnar_timeseries(rows, days)
+        assert [item["date"] for item in legacy] == [item["date"] for item in columnar]
+        assert [item["sentiment"] for item in legacy] == [item["sentiment"] for item in columnar]
+        loop = best_of(lambda: legacy_timeseries(rows, days))
+        vectorized = best_of(lambda: columnar_timeseries(rows, days))
+        print(f"{fill:<14.0%}{len(rows):>8}{loop * 1000:>12.2f}{vectorized * 1000:>14.2f}{loop / vectorized:>9.1f}x")
+
+    series = columnar_timeseries(synthetic_daily_rows(days, 0.5), days)
+    history = [
+        StockHistoryPoint(date=(END_DATE - timedelta(days=offset)).isoformat(), close=100 + offset % 17)
+        for offset in range(days, -1, -1)
+        if (END_DATE - timedelta(days=offset)).weekday() < 5
+    ]
+    stock = StockSummary(symbol="BENCH", history=history)
+    sentiment = SentimentSummary(label="positive", displayLabel="Bullish", score=0.2, postCount=10)
+    assert legacy_alignment(history, series)[0] == columnar_alignment(history, series)[0]
+    loop = best_of(lambda: legacy_alignment(history, series))
+    vectorized = best_of(lambda: columnar_alignment(history, series))
+    metrics = best_of(lambda: analysis_service._build_metrics(stock, sentiment, series))
+    print(f"\nprice alignment over {len(history)} sessions: loop {loop * 1000:.2f} ms, "
+          f"columnar {vectorized * 1000:.2f} ms, full _build_metrics {metrics * 1000:.2f} ms")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 3650)
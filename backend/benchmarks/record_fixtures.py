@@ -0,0 +1,122 @@
+"""Record Defeat Beta frames and Reddit submissions for the offline benchmark suite.
+
+Run from ``backend/``::
+
+    python -m benchmarks.record_fixtures AAPL TSLA     # live, needs network and Reddit credentials
+    python -m benchmarks.record_fixtures --synthetic   # deterministic stand-ins, no network
+"""
+
+import argparse
+import asyncio
+import random
+import sys
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import fetch_reddit_data  # noqa: E402
+import fetch_stock_data  # noqa: E402
+from benchmarks import replay  # noqa: E402
+from benchmarks.bench_stock_history import synthetic_price_frame  # noqa: E402
+
+SYNTHETIC_RECORDED_AT = pd.Timestamp("2026-10-16", tz="UTC")
+SYNTHETIC_TICKERS = {
+    "BNCH": {"start": "1985-01-01", "posts": 60},
+    "MEME": {"start": "2021-01-04", "posts": 100},
+}
+PHRASES = (
+    "calls printing", "earnings beat", "guidance miss", "bag holding", "to the moon",
+    "crash incoming", "solid fundamentals", "overvalued", "buying the dip", "selling everything",
+)
+
+
+def _submission_record(submission: Any) -> dict[str, Any]:
+    author = getattr(submission, "author", None)
+    subreddit = getattr(submission, "subreddit", None)
+    return {
+        "id": str(submission.id),
+        "title": submission.title or "",
+        "selftext": submission.selftext or "",
+        "author": getattr(author, "name", None),
+        "created_utc": float(submission.created_utc),
+        "score": int(submission.score or 0),
+        "num_comments": int(submission.num_comments or 0),
+        "url": str(submission.url),
+        "subreddit": getattr(subreddit, "display_name", "unknown"),
+    }
+
+
+async def _record_submissions(ticker: str) -> list[dict[str, Any]]:
+    reddit = fetch_reddit_data.get_async_reddit()
+    try:
+        subreddit = await reddit.subreddit("all")
+        return [
+            _submission_record(submission)
+            async for submission in subreddit.search(f"${ticker}", sort="new", limit=fetch_reddit_data.REDDIT_FETCH_LIMIT)
+        ]
+    finally:
+        await reddit.close()
+
+
+def record_live(ticker: str) -> Path:
+    frames = fetch_stock_data._fetch_provider_frames(ticker)
+    submissions = asyncio.run(_record_submissions(ticker))
+    return replay.write_fixture(ticker, frames, submissions, source="live")
+
+
+def _synthetic_submissions(ticker: str, count: int, rng: random.Random) -> list[dict[str, Any]]:
+    now = SYNTHETIC_RECORDED_AT.timestamp()
+    records = []
+    for index in range(count):
+        words = rng.sample(PHRASES, 3)
+        records.append({
+            "id": f"{ticker.lower()}{index:05d}",
+            "title": f"${ticker} {words[0]}",
+            "selftext": f"{words[1]}, {words[2]}" if index % 3 else "",
+            "author": f"user{rng.randrange(500)}" if index % 11 else None,
+            "created_utc": now - rng.uniform(0, 45 * 86400),
+            "score": rng.randrange(0, 5000),
+            "num_comments": rng.randrange(0, 800),
+            "url": f"https://reddit.com/r/stocks/comments/{ticker.lower()}{index:05d}",
+            "subreddit": rng.choice(("stocks", "wallstreetbets", "investing")),
+        })
+    return records
+
+
+def record_synthetic(ticker: str, start: str, posts: int, seed: int = 7) -> Path:
+    price = synthetic_price_frame(start, SYNTHETIC_RECORDED_AT.strftime("%Y-%m-%d"), seed=seed)
+    price["symbol"] = ticker
+    quarters = price["report_date"].iloc[::63].reset_index(drop=True)
+    close = price["close"].iloc[::63].to_numpy()
+    frames = {
+        "price": price,
+        "market_cap": pd.DataFrame({"report_date": quarters, "market_capitalization": close * 1e9}),
+        "ttm_pe": pd.DataFrame({"report_date": quarters, "ttm_pe": np.round(close / 5, 2)}),
+        "beta": pd.DataFrame({"symbol": [ticker], "beta": [1.2]}),
+    }
+    submissions = _synthetic_submissions(ticker, posts, random.Random(seed))
+    return replay.write_fixture(
+        ticker, frames, submissions, source="synthetic", recorded_at=SYNTHETIC_RECORDED_AT.timestamp()
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("tickers", nargs="*")
+    parser.add_argument("--synthetic", action="store_true", help="write the bundled synthetic fixtures")
+    args = parser.parse_args()
+
+    if args.synthetic:
+        paths = [record_synthetic(ticker, **options) for ticker, options in SYNTHETIC_TICKERS.items()]
+    else:
+        paths = [record_live(ticker.upper()) for ticker in args.tickers]
+    for path in paths:
+        print(f"wrote {path}")
+
+
+if __name__ == "__main__":
+    main()
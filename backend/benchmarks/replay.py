@@ -0,0 +1,148 @@
+"""Load recorded Defeat Beta frames and Reddit submissions and replay them offline.
+
+Fixtures live in ``benchmarks/fixtures/<TICKER>.json.gz`` and are written by
+``python -m benchmarks.record_fixtures``.
+"""
+
+import asyncio
+import gzip
+import json
+import sys
+import tempfile
+import time
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any
+
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import fetch_reddit_data  # noqa: E402
+import fetch_stock_data  # noqa: E402
+import resilience  # noqa: E402
+import sentiment_store  # noqa: E402
+
+FIXTURE_DIR = Path(__file__).resolve().parent / "fixtures"
+
+
+def frame_to_json(frame: Any) -> dict[str, Any] | None:
+    if frame is None or not hasattr(frame, "to_json"):
+        return None
+    return json.loads(frame.to_json(orient="split", index=False, date_format="iso"))
+
+
+def frame_from_json(payload: dict[str, Any] | None) -> pd.DataFrame | None:
+    if payload is None:
+        return None
+    frame = pd.DataFrame(payload["data"], columns=payload["columns"])
+    if "report_date" in frame.columns:
+        frame["report_date"] = pd.to_datetime(frame["report_date"], utc=True).dt.tz_localize(None)
+    return frame
+
+
+def write_fixture(
+    ticker: str,
+    frames: dict[str, Any],
+    submissions: list[dict[str, Any]],
+    source: str,
+    recorded_at: float | None = None,
+) -> Path:
+    FIXTURE_DIR.mkdir(parents=True, exist_ok=True)
+    path = FIXTURE_DIR / f"{ticker.upper()}.json.gz"
+    payload = {
+        "ticker": ticker.upper(),
+        "source": source,
+        "recordedAt": time.time() if recorded_at is None else recorded_at,
+        "frames": {name: frame_to_json(frame) for name, frame in frames.items()},
+        "submissions": submissions,
+    }
+    with gzip.GzipFile(path, "wb", mtime=0) as handle:
+        handle.write(json.dumps(payload, separators=(",", ":")).encode("utf-8"))
+    return path
+
+
+def available_tickers() -> list[str]:
+    return sorted(path.name.split(".")[0] for path in FIXTURE_DIR.glob("*.json.gz"))
+
+
+def load_fixture(ticker: str) -> dict[str, Any]:
+    with gzip.open(FIXTURE_DIR / f"{ticker.upper()}.json.gz", "rt", encoding="utf-8") as handle:
+        return json.load(handle)
+
+
+class ReplaySubreddit:
+    def __init__(self, submissions: dict[str, list[SimpleNamespace]], latency: float):
+        self._submissions = submissions
+        self._latency = latency
+
+    async def search(self, query: str, sort: str = "new", limit: int = 100):
+        if self._latency:
+            await asyncio.sleep(self._latency)
+        for submission in self._submissions.get(query.lstrip("$").upper(), [])[:limit]:
+            yield submission
+
+
+class ReplayReddit:
+    def __init__(self, submissions: dict[str, list[SimpleNamespace]], latency: float):
+        self._subreddit = ReplaySubreddit(submissions, latency)
+
+    async def subreddit(self, _name: str) -> ReplaySubreddit:
+        return self._subreddit
+
+    async def close(self) -> None:
+        pass
+
+
+def _submission(record: dict[str, Any], shift_seconds: float) -> SimpleNamespace:
+    return SimpleNamespace(
+        id=record["id"],
+        title=record["title"],
+        selftext=record["selftext"],
+        author=SimpleNamespace(name=record["author"]) if record["author"] else None,
+        created_utc=record["created_utc"] + shift_seconds,
+        score=record["score"],
+        num_comments=record["num_comments"],
+        url=record["url"],
+        subreddit=SimpleNamespace(display_name=record["subreddit"]),
+    )
+
+
+def _shifted_frame(payload: dict[str, Any] | None, shift_days: int) -> pd.DataFrame | None:
+    frame = frame_from_json(payload)
+    if frame is not None and "report_date" in frame.columns:
+        frame["report_date"] = frame["report_date"] + pd.Timedelta(days=shift_days)
+    return frame
+
+
+def install(tickers: list[str], provider_latency: float = 0.0, reddit_latency: float = 0.0) -> None:
+    """Point the data layer at recorded fixtures instead of Defeat Beta and Reddit.
+
+    Every timestamp is moved forward by the whole days elapsed since recording,
+    so period filters and day windows see the same data however old the fixture is.
+    """
+    frames = {}
+    submissions = {}
+    for ticker in tickers:
+        fixture = load_fixture(ticker)
+        shift_days = max(int((time.time() - fixture["recordedAt"]) // 86400), 0)
+        frames[fixture["ticker"]] = {
+            name: _shifted_frame(payload, shift_days) for name, payload in fixture["frames"].items()
+        }
+        submissions[fixture["ticker"]] = [
+            _submission(record, shift_days * 86400)
+            for record in sorted(fixture["submissions"], key=lambda record: record["created_utc"], reverse=True)
+        ]
+
+    def replay_frames(ticker: str) -> dict[str, Any]:
+        if provider_latency:
+            time.sleep(provider_latency)
+        if ticker not in frames:
+            raise RuntimeError(f"No recorded provider frames for {ticker}")
+        return {name: frame.copy() if frame is not None else None for name, frame in frames[ticker].items()}
+
+    for upstream in (resilience.reddit, resilience.defeatbeta):
+        upstream.limiter = resilience.TokenBucket(rate_per_second=1e9, burst=10**9)
+    fetch_stock_data._fetch_provider_frames = replay_frames
+    fetch_reddit_data.get_async_reddit = lambda: ReplayReddit(submissions, reddit_latency)
+    sentiment_store.store = sentiment_store.SentimentStore(str(Path(tempfile.mkdtemp()) / "sentiment.sqlite3"))
@@ -0,0 +1,281 @@
+"""Offline end-to-end benchmark suite replaying recorded provider and Reddit fixtures.
+
+Run from ``backend/``::
+
+    python -m benchmarks.suite                  # compare against benchmarks/baseline.json
+    python -m benchmarks.suite --save-baseline  # re-record the baseline on this machine
+
+Baselines are wall-clock numbers for one machine and are not committed. The
+first run saves one; later runs exit non-zero when a scenario's p50 or time
+per operation regresses past ``--tolerance``. Scenarios faster than
+``--min-gated-ms`` are reported but not gated, since sub-millisecond timings
+are mostly noise.
+"""
+
+import argparse
+import asyncio
+import json
+import statistics
+import sys
+import time
+import tracemalloc
+from collections.abc import Awaitable, Callable
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from benchmarks import replay  # noqa: E402
+
+import analysis_service  # noqa: E402
+import fetch_reddit_data  # noqa: E402
+import fetch_stock_data  # noqa: E402
+import sentiment_scoring  # noqa: E402
+import sentiment_store  # noqa: E402
+import server  # noqa: E402
+
+BASELINE_PATH = Path(__file__).resolve().parent / "baseline.json"
+
+
+@dataclass
+class Result:
+    p50_ms: float
+    p95_ms: float
+    mean_ms: float
+    ops_per_sec: float
+    peak_kib: float
+
+
+def reset_caches() -> None:
+    fetch_stock_data._frame_cache.clear()
+    fetch_stock_data._stock_cache.clear()
+    fetch_reddit_data._reddit_cache.clear()
+    analysis_service._response_cache.clear()
+    sentiment_scoring.scorer.clear()
+    sentiment_store.store.clear()
+
+
+def _percentile(samples: list[float], fraction: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(int(len(ordered) * fraction), len(ordered) - 1)]
+
+
+def _summarize(samples: list[float], elapsed: float, operations: int, peak_bytes: int) -> Result:
+    return Result(
+        p50_ms=round(statistics.median(samples) * 1000, 3),
+        p95_ms=round(_percentile(samples, 0.95) * 1000, 3),
+        mean_ms=round(statistics.fmean(samples) * 1000, 3),
+        ops_per_sec=round(operations / elapsed, 1),
+        peak_kib=round(peak_bytes / 1024, 1),
+    )
+
+
+async def _peak_allocation(call: Callable[[], Awaitable[Any]], setup: Callable[[], None]) -> int:
+    setup()
+    tracemalloc.start()
+    try:
+        await call()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+async def measure(call: Callable[[], Awaitable[Any]], setup: Callable[[], None], iterations: int) -> Result:
+    setup()
+    await call()
+    samples = []
+    for _ in range(iterations):
+        setup()
+        started = time.perf_counter()
+        await call()
+        samples.append(time.perf_counter() - started)
+    return _summarize(samples, sum(samples), iterations, await _peak_allocation(call, setup))
+
+
+async def measure_concurrent(
+    call: Callable[[int], Awaitable[Any]],
+    setup: Callable[[], None],
+    requests: int,
+    concurrency: int,
+) -> Result:
+    semaphore = asyncio.Semaphore(concurrency)
+    samples: list[float] = []
+
+    async def timed(index: int) -> None:
+        async with semaphore:
+            started = time.perf_counter()
+            await call(index)
+            samples.append(time.perf_counter() - started)
+
+    async def run_all() -> None:
+        await asyncio.gather(*(timed(index) for index in range(requests)))
+
+    setup()
+    await run_all()
+    samples.clear()
+    setup()
+    started = time.perf_counter()
+    await run_all()
+    elapsed = time.perf_counter() - started
+    measured = list(samples)
+    return _summarize(measured, elapsed, requests, await _peak_allocation(run_all, setup))
+
+
+async def asgi_get(path: str, query: str = "") -> int:
+    status = 0
+
+    async def receive() -> dict[str, Any]:
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message: dict[str, Any]) -> None:
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+
+    await server.app(
+        {
+            "type": "http",
+            "asgi": {"version": "3.0"},
+            "http_version": "1.1",
+            "method": "GET",
+            "scheme": "http",
+            "path": path,
+            "raw_path": path.encode(),
+            "query_string": query.encode(),
+            "headers": [],
+            "client": ("127.0.0.1", 1234),
+            "server": ("benchmark", 80),
+        },
+        receive,
+        send,
+    )
+    if status != 200:
+        raise RuntimeError(f"GET {path}?{query} returned {status}")
+    return status
+
+
+def warm() -> None:
+    pass
+
+
+def scenarios(
+    tickers: list[str],
+    iterations: int,
+    requests: int,
+    concurrency: int,
+) -> dict[str, Callable[[], Awaitable[Result]]]:
+    ticker = tickers[0]
+
+    def stock(period: str) -> Callable[[], Awaitable[Any]]:
+        return lambda: asyncio.to_thread(fetch_stock_data.get_stock_data, ticker, period)
+
+    def analysis_request(index: int) -> Awaitable[int]:
+        query = ("period=1mo", "period=1y", "period=all")[index % 3]
+        return asgi_get(f"/api/analysis/{tickers[index % len(tickers)]}", f"{query}&days=30&limit=10")
+
+    return {
+        "stock_cold_all": lambda: measure(stock("all"), reset_caches, iterations),
+        "stock_warm_1y": lambda: measure(stock("1y"), warm, iterations),
+        "reddit_cold": lambda: measure(lambda: fetch_reddit_data.get_reddit_data(ticker), reset_caches, iterations),
+        "timeseries_30d": lambda: measure(
+            lambda: fetch_reddit_data.get_sentiment_timeseries(ticker, 30), warm, iterations
+        ),
+        "timeseries_3650d": lambda: measure(
+            lambda: fetch_reddit_data.get_sentiment_timeseries(ticker, 3650), warm, iterations
+        ),
+        "analysis_cold_1y": lambda: measure(
+            lambda: analysis_service.get_analysis(ticker, "1y", 30, 10), reset_caches, iterations
+        ),
+        "analysis_model_warm_all": lambda: measure(
+            lambda: analysis_service.get_analysis(ticker, "all", 365, 10), warm, iterations
+        ),
+        "analysis_json_warm": lambda: measure(
+            lambda: analysis_service.get_analysis_json(ticker, "1y", 30, 10), warm, iterations
+        ),
+        "asgi_analysis_cold": lambda: measure_concurrent(analysis_request, reset_caches, requests, concurrency),
+        "asgi_analysis_warm": lambda: measure_concurrent(analysis_request, warm, requests, concurrency),
+    }
+
+
+def best_of(runs: list[Result]) -> Result:
+    return Result(
+        p50_ms=min(run.p50_ms for run in runs),
+        p95_ms=min(run.p95_ms for run in runs),
+        mean_ms=min(run.mean_ms for run in runs),
+        ops_per_sec=max(run.ops_per_sec for run in runs),
+        peak_kib=min(run.peak_kib for run in runs),
+    )
+
+
+async def run(tickers: list[str], iterations: int, requests: int, concurrency: int, repeats: int) -> dict[str, Result]:
+    results = {}
+    for name, scenario in scenarios(tickers, iterations, requests, concurrency).items():
+        results[name] = best_of([await scenario() for _ in range(repeats)])
+        print(f"{name:26} " + "  ".join(f"{key}={value}" for key, value in asdict(results[name]).items()))
+    await fetch_reddit_data.reddit_pool.close()
+    sentiment_scoring.scorer.shutdown()
+    return results
+
+
+def regressions(
+    results: dict[str, Result],
+    baseline: dict[str, dict[str, float]],
+    tolerance: float,
+    min_gated_ms: float,
+) -> list[str]:
+    failures = []
+    for name, result in results.items():
+        expected = baseline.get(name)
+        if expected is None:
+            continue
+        timings = (
+            ("p50_ms", result.p50_ms, expected["p50_ms"]),
+            ("ms_per_op", 1000 / result.ops_per_sec, 1000 / expected["ops_per_sec"]),
+        )
+        for metric, value, reference in timings:
+            limit = reference * (1 + tolerance)
+            if reference >= min_gated_ms and value > limit:
+                failures.append(f"{name}.{metric}: {value:.3f} > {limit:.3f}")
+        if result.peak_kib > expected["peak_kib"] * (1 + tolerance):
+            failures.append(f"{name}.peak_kib: {result.peak_kib} > {expected['peak_kib'] * (1 + tolerance):.1f}")
+    return failures
+
+
+def save_baseline(path: Path, results: dict[str, Result]) -> None:
+    path.write_text(json.dumps({name: asdict(result) for name, result in results.items()}, indent=2) + "\n")
+    print(f"saved baseline to {path}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tickers", nargs="+", default=replay.available_tickers())
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--requests", type=int, default=120)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--provider-latency", type=float, default=0.0, help="seconds added to each provider fetch")
+    parser.add_argument("--reddit-latency", type=float, default=0.0, help="seconds added to each Reddit search")
+    parser.add_argument("--repeats", type=int, default=3, help="keep the best of this many runs per scenario")
+    parser.add_argument("--tolerance", type=float, default=1.0, help="allowed relative slowdown or growth")
+    parser.add_argument("--min-gated-ms", type=float, default=5.0, help="only gate scenarios at least this slow")
+    parser.add_argument("--baseline", type=Path, default=BASELINE_PATH)
+    parser.add_argument("--save-baseline", action="store_true")
+    args = parser.parse_args()
+
+    replay.install(args.tickers, args.provider_latency, args.reddit_latency)
+    results = asyncio.run(run(args.tickers, args.iterations, args.requests, args.concurrency, args.repeats))
+
+    if args.save_baseline or not args.baseline.exists():
+        save_baseline(args.baseline, results)
+        return
+
+    failures = regressions(results, json.loads(args.baseline.read_text()), args.tolerance, args.min_gated_ms)
+    for failure in failures:
+        print(f"REGRESSION {failure}")
+    if failures:
+        sys.exit(1)
+    print("no regressions")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,37 +1,311 @@
+import asyncio
+import threading
 import time
-from dataclasses import dataclass
-from typing import Generic, TypeVar
+from concurrent.futures import Executor, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Generic, TypeVar
+
+from cache_backends import CacheBackend, CacheEntry, create_backend
 
 
 T = TypeVar("T")
 
 
+_refresh_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="cache-refresh")
+_version_lock = threading.Lock()
+_last_version = 0
+
+
+def _next_version() -> int:
+    global _last_version
+    with _version_lock:
+        _last_version = max(time.time_ns(), _last_version + 1)
+        return _last_version
+
+
 @dataclass
-class CacheEntry(Generic[T]):
-    value: T
-    expires_at: float
+class _Call(Generic[T]):
+    done: threading.Event = field(default_factory=threading.Event)
+    value: T | None = None
+    error: BaseException | None = None
+
+
+class SingleFlight(Generic[T]):
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: dict[str, _Call[T]] = {}
+        self._tasks: dict[str, asyncio.Task] = {}
+
+    def do(self, key: str, load: Callable[[], T]) -> T:
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.value
+
+        try:
+            call.value = load()
+            return call.value
+        except BaseException as exc:
+            call.error = exc
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.done.set()
+
+    async def do_async(self, key: str, load: Callable[[], Awaitable[T]]) -> T:
+        task = self._tasks.get(key)
+        if task is None:
+            task = asyncio.ensure_future(load())
+            self._tasks[key] = task
+            task.add_done_callback(lambda _task: self._tasks.pop(key, None))
+        # Shield so one cancelled waiter does not cancel the fetch for the rest.
+        return await asyncio.shield(task)
 
 
 class TTLCache(Generic[T]):
-    def __init__(self, ttl_seconds: int):
+    def __init__(
+        self,
+        ttl_seconds: int,
+        max_entries: int | None = None,
+        max_bytes: int | None = None,
+        sweep_interval_seconds: float = 60.0,
+        stale_ttl_seconds: int | None = None,
+        name: str | None = None,
+        backend: CacheBackend | None = None,
+        refresh_executor: Executor | None = None,
+    ):
         self.ttl_seconds = ttl_seconds
-        self._items: dict[str, CacheEntry[T]] = {}
+        self.stale_ttl_seconds = max(stale_ttl_seconds or ttl_seconds, ttl_seconds)
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.sweep_interval_seconds = sweep_interval_seconds
+        self.name = name
+        self._backend = backend or create_backend(name, max_entries=max_entries, max_bytes=max_bytes)
+        self._refresh_executor = refresh_executor or _refresh_executor
+        self._lock = threading.RLock()
+        self._flight = SingleFlight[CacheEntry[T]]()
+        self._refreshing: set[str] = set()
+        self._refresh_tasks: set[asyncio.Task] = set()
+        self._next_sweep_at = time.time() + sweep_interval_seconds
+        self._hits = 0
+        self._stale_hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._expirations = 0
+        self._refreshes = 0
+        self._refresh_failures = 0
 
     def get(self, key: str) -> T | None:
-        entry = self._items.get(key)
-        if not entry:
-            return None
-        if entry.expires_at < time.time():
-            self._items.pop(key, None)
-            return None
-        return entry.value
+        entry = self.get_entry(key)
+        return entry.value if entry else None
+
+    def get_entry(self, key: str) -> CacheEntry[T] | None:
+        now = time.time()
+        self._maybe_sweep(now)
+        entry = self._backend.get(key)
+        if entry is not None and entry.expires_at < now:
+            self._backend.delete(key)
+            with self._lock:
+                self._expirations += 1
+            entry = None
+        with self._lock:
+            if entry is None:
+                self._misses += 1
+                return None
+            if entry.is_stale(now):
+                self._stale_hits += 1
+            else:
+                self._hits += 1
+            return entry
 
     def set(self, key: str, value: T) -> T:
-        self._items[key] = CacheEntry(
+        return self.set_entry(key, value).value
+
+    def set_entry(self, key: str, value: T) -> CacheEntry[T]:
+        now = time.time()
+        entry = CacheEntry(
             value=value,
-            expires_at=time.time() + self.ttl_seconds,
+            expires_at=now + self.stale_ttl_seconds,
+            fresh_until=now + self.ttl_seconds,
+            stored_at=now,
+            version=_next_version(),
         )
-        return value
+        evicted = self._backend.set(key, entry)
+        with self._lock:
+            self._evictions += evicted
+        self._maybe_sweep(now)
+        return entry
+
+    def get_or_load(self, key: str, load: Callable[[], T]) -> T:
+        return self.get_or_load_entry(key, load).value
+
+    def get_or_load_entry(self, key: str, load: Callable[[], T]) -> CacheEntry[T]:
+        entry = self.get_entry(key)
+        if entry is not None:
+            if entry.is_stale():
+                self._refresh_in_background(key, load)
+            return entry
+
+        def load_and_set() -> CacheEntry[T]:
+            entry = self._peek(key)
+            if entry is not None and not entry.is_stale():
+                return entry
+            return self.set_entry(key, load())
+
+        return self._flight.do(key, load_and_set)
+
+    async def get_or_load_async(self, key: str, load: Callable[[], Awaitable[T]]) -> T:
+        return (await self.get_or_load_entry_async(key, load)).value
+
+    async def get_or_load_entry_async(
+        self,
+        key: str,
+        load: Callable[[], Awaitable[T]],
+    ) -> CacheEntry[T]:
+        entry = self.get_entry(key)
+        if entry is not None:
+            if entry.is_stale():
+                self._refresh_in_background_async(key, load)
+            return entry
+
+        async def load_and_set() -> CacheEntry[T]:
+            return self.set_entry(key, await load())
+
+        return await self._flight.do_async(key, load_and_set)
+
+    def refresh(self, key: str, load: Callable[[], T]) -> CacheEntry[T]:
+        error = None
+        try:
+            return self._flight.do(key, lambda: self.set_entry(key, load()))
+        except Exception as exc:
+            error = exc
+            raise
+        finally:
+            self._finish_refresh(key, error, claimed=False)
+
+    async def refresh_async(self, key: str, load: Callable[[], Awaitable[T]]) -> CacheEntry[T]:
+        error = None
+        try:
+            return await self._flight.do_async(key, lambda: self._store_loaded(key, load))
+        except Exception as exc:
+            error = exc
+            raise
+        finally:
+            self._finish_refresh(key, error, claimed=False)
+
+    def peek_entry(self, key: str) -> CacheEntry[T] | None:
+        return self._peek(key)
+
+    def peek_metadata(self, key: str) -> CacheEntry[T] | None:
+        # Versions and deadlines only; the value may be left undecoded.
+        entry = self._backend.metadata(key)
+        if not entry or entry.expires_at < time.time():
+            return None
+        return entry
+
+    def expires_within(self, key: str, seconds: float) -> bool:
+        entry = self.peek_metadata(key)
+        return entry is None or entry.fresh_until - time.time() <= seconds
+
+    def stats(self) -> dict[str, Any]:
+        entries = self._backend.entry_count()
+        size = self._backend.byte_count()
+        with self._lock:
+            lookups = self._hits + self._stale_hits + self._misses
+            return {
+                "backend": type(self._backend).__name__,
+                "entries": entries,
+                "bytes": size,
+                "maxEntries": self.max_entries,
+                "maxBytes": self.max_bytes,
+                "ttlSeconds": self.ttl_seconds,
+                "staleTtlSeconds": self.stale_ttl_seconds,
+                "hits": self._hits,
+                "staleHits": self._stale_hits,
+                "misses": self._misses,
+                "hitRatio": round((self._hits + self._stale_hits) / lookups, 4) if lookups else None,
+                "evictions": self._evictions,
+                "expirations": self._expirations,
+                "refreshes": self._refreshes,
+                "refreshFailures": self._refresh_failures,
+            }
 
     def clear(self) -> None:
-        self._items.clear()
+        self._backend.clear()
+
+    def _claim_refresh(self, key: str) -> bool:
+        with self._lock:
+            if key in self._refreshing:
+                return False
+            self._refreshing.add(key)
+            return True
+
+    def _finish_refresh(self, key: str, error: BaseException | None, claimed: bool = True) -> None:
+        with self._lock:
+            if claimed:
+                self._refreshing.discard(key)
+            if error is None:
+                self._refreshes += 1
+            else:
+                self._refresh_failures += 1
+
+    def _refresh_in_background(self, key: str, load: Callable[[], T]) -> None:
+        if not self._claim_refresh(key):
+            return
+
+        def refresh() -> None:
+            error = None
+            try:
+                self._flight.do(key, lambda: self.set_entry(key, load()))
+            except Exception as exc:
+                error = exc
+            finally:
+                self._finish_refresh(key, error)
+
+        try:
+            self._refresh_executor.submit(refresh)
+        except Exception as exc:
+            self._finish_refresh(key, exc)
+
+    def _refresh_in_background_async(self, key: str, load: Callable[[], Awaitable[T]]) -> None:
+        if not self._claim_refresh(key):
+            return
+
+        async def refresh() -> None:
+            error = None
+            try:
+                await self._flight.do_async(key, lambda: self._store_loaded(key, load))
+            except Exception as exc:
+                error = exc
+            finally:
+                self._finish_refresh(key, error)
+
+        task = asyncio.ensure_future(refresh())
+        self._refresh_tasks.add(task)
+        task.add_done_callback(self._refresh_tasks.discard)
+
+    async def _store_loaded(self, key: str, load: Callable[[], Awaitable[T]]) -> CacheEntry[T]:
+        return self.set_entry(key, await load())
+
+    def _peek(self, key: str) -> CacheEntry[T] | None:
+        entry = self._backend.get(key, touch=False)
+        if not entry or entry.expires_at < time.time():
+            return None
+        return entry
+
+    def _maybe_sweep(self, now: float) -> None:
+        with self._lock:
+            if now < self._next_sweep_at:
+                return
+            self._next_sweep_at = now + self.sweep_interval_seconds
+        expired = self._backend.sweep(now)
+        with self._lock:
+            self._expirations += expired
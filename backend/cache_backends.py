@@ -0,0 +1,349 @@
+import os
+import pickle
+import sqlite3
+import sys
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Generic, Protocol, TypeVar
+
+
+T = TypeVar("T")
+
+CACHE_BACKEND = os.getenv("CACHE_BACKEND", "memory")
+CACHE_SQLITE_PATH = os.getenv(
+    "CACHE_SQLITE_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "stocksentiment.sqlite3"),
+)
+
+
+@dataclass
+class CacheEntry(Generic[T]):
+    value: T
+    expires_at: float
+    fresh_until: float = 0.0
+    stored_at: float = 0.0
+    version: int = 0
+    size: int = 0
+
+    def is_stale(self, now: float | None = None) -> bool:
+        return self.fresh_until < (time.time() if now is None else now)
+
+
+class CacheBackend(Protocol):
+    def get(self, key: str, touch: bool = True) -> CacheEntry | None: ...
+
+    def metadata(self, key: str) -> CacheEntry | None: ...
+
+    def set(self, key: str, entry: CacheEntry) -> int: ...
+
+    def delete(self, key: str) -> None: ...
+
+    def sweep(self, now: float) -> int: ...
+
+    def clear(self) -> None: ...
+
+    def entry_count(self) -> int: ...
+
+    def byte_count(self) -> int: ...
+
+
+def estimate_size(value: Any) -> int:
+    memory_usage = getattr(value, "memory_usage", None)
+    if callable(memory_usage):
+        try:
+            return int(memory_usage(deep=True).sum())
+        except Exception:
+            pass
+    try:
+        return len(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+    except Exception:
+        return sys.getsizeof(value)
+
+
+def encode_value(value: Any) -> bytes:
+    return zlib.compress(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL), 3)
+
+
+def decode_value(blob: bytes) -> Any:
+    return pickle.loads(zlib.decompress(blob))
+
+
+def _over_budget(entries: int, size: int, max_entries: int | None, max_bytes: int | None) -> bool:
+    return entries > 1 and (
+        (max_entries is not None and entries > max_entries)
+        or (max_bytes is not None and size > max_bytes)
+    )
+
+
+class MemoryBackend:
+    def __init__(self, max_entries: int | None = None, max_bytes: int | None = None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._items: OrderedDict[str, CacheEntry] = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.RLock()
+
+    def get(self, key: str, touch: bool = True) -> CacheEntry | None:
+        with self._lock:
+            entry = self._items.get(key)
+            if entry and touch:
+                self._items.move_to_end(key)
+            return entry
+
+    def metadata(self, key: str) -> CacheEntry | None:
+        return self._items.get(key)
+
+    def set(self, key: str, entry: CacheEntry) -> int:
+        entry.size = estimate_size(entry.value)
+        with self._lock:
+            self._drop(key)
+            self._items[key] = entry
+            self._bytes += entry.size
+            evicted = 0
+            while _over_budget(len(self._items), self._bytes, self.max_entries, self.max_bytes):
+                self._drop(next(iter(self._items)))
+                evicted += 1
+            return evicted
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._drop(key)
+
+    def sweep(self, now: float) -> int:
+        with self._lock:
+            expired = [key for key, entry in self._items.items() if entry.expires_at < now]
+            for key in expired:
+                self._drop(key)
+            return len(expired)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._items.clear()
+            self._bytes = 0
+
+    def entry_count(self) -> int:
+        return len(self._items)
+
+    def byte_count(self) -> int:
+        return self._bytes
+
+    def _drop(self, key: str) -> None:
+        entry = self._items.pop(key, None)
+        if entry:
+            self._bytes -= entry.size
+
+
+class SQLiteBackend:
+    def __init__(
+        self,
+        path: str,
+        namespace: str,
+        max_entries: int | None = None,
+        max_bytes: int | None = None,
+        decoded_entries: int = 64,
+    ):
+        self.path = path
+        self.namespace = namespace
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.decoded_entries = decoded_entries
+        self._local = threading.local()
+        self._decoded: OrderedDict[str, tuple[int, Any]] = OrderedDict()
+        # LRU touches from reads, written out with the next write transaction
+        # so a cache hit never takes the database write lock.
+        self._touched: dict[str, float] = {}
+        self._lock = threading.Lock()
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with self._connect() as connection:
+            connection.execute(
+                """
+                CREATE TABLE IF NOT EXISTS cache_entries (
+                    namespace TEXT NOT NULL,
+                    key TEXT NOT NULL,
+                    value BLOB NOT NULL,
+                    expires_at REAL NOT NULL,
+                    fresh_until REAL NOT NULL,
+                    stored_at REAL NOT NULL,
+                    version INTEGER NOT NULL,
+                    size INTEGER NOT NULL,
+                    accessed_at REAL NOT NULL,
+                    PRIMARY KEY (namespace, key)
+                )
+                """
+            )
+            connection.execute(
+                "CREATE INDEX IF NOT EXISTS cache_entries_lru ON cache_entries (namespace, accessed_at)"
+            )
+
+    def get(self, key: str, touch: bool = True) -> CacheEntry | None:
+        entry = self.metadata(key)
+        if entry is None:
+            return None
+        value = self._decoded_value(key, entry.version)
+        if value is None:
+            blob = self._connect().execute(
+                "SELECT value FROM cache_entries WHERE namespace = ? AND key = ? AND version = ?",
+                (self.namespace, key, entry.version),
+            ).fetchone()
+            if blob is None:
+                return None
+            value = decode_value(blob[0])
+            self._remember(key, entry.version, value)
+        if touch:
+            with self._lock:
+                self._touched[key] = time.time()
+        entry.value = value
+        return entry
+
+    def metadata(self, key: str) -> CacheEntry | None:
+        row = self._connect().execute(
+            "SELECT expires_at, fresh_until, stored_at, version, size FROM cache_entries "
+            "WHERE namespace = ? AND key = ?",
+            (self.namespace, key),
+        ).fetchone()
+        if row is None:
+            return None
+        expires_at, fresh_until, stored_at, version, size = row
+        return CacheEntry(
+            value=None,
+            expires_at=expires_at,
+            fresh_until=fresh_until,
+            stored_at=stored_at,
+            version=version,
+            size=size,
+        )
+
+    def set(self, key: str, entry: CacheEntry) -> int:
+        blob = encode_value(entry.value)
+        entry.size = len(blob)
+        connection = self._connect()
+        with connection:
+            self._flush_touches(connection)
+            connection.execute(
+                "INSERT OR REPLACE INTO cache_entries "
+                "(namespace, key, value, expires_at, fresh_until, stored_at, version, size, accessed_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    self.namespace,
+                    key,
+                    blob,
+                    entry.expires_at,
+                    entry.fresh_until,
+                    entry.stored_at,
+                    entry.version,
+                    entry.size,
+                    time.time(),
+                ),
+            )
+            evicted = self._evict_over_budget(connection)
+        self._remember(key, entry.version, entry.value)
+        return evicted
+
+    def delete(self, key: str) -> None:
+        connection = self._connect()
+        with connection:
+            connection.execute(
+                "DELETE FROM cache_entries WHERE namespace = ? AND key = ?",
+                (self.namespace, key),
+            )
+        with self._lock:
+            self._decoded.pop(key, None)
+            self._touched.pop(key, None)
+
+    def sweep(self, now: float) -> int:
+        connection = self._connect()
+        with connection:
+            cursor = connection.execute(
+                "DELETE FROM cache_entries WHERE namespace = ? AND expires_at < ?",
+                (self.namespace, now),
+            )
+        return cursor.rowcount
+
+    def clear(self) -> None:
+        connection = self._connect()
+        with connection:
+            connection.execute("DELETE FROM cache_entries WHERE namespace = ?", (self.namespace,))
+        with self._lock:
+            self._decoded.clear()
+            self._touched.clear()
+
+    def entry_count(self) -> int:
+        return self._totals(self._connect())[0]
+
+    def byte_count(self) -> int:
+        return self._totals(self._connect())[1]
+
+    def _connect(self) -> sqlite3.Connection:
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=30)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+        return connection
+
+    def _totals(self, connection: sqlite3.Connection) -> tuple[int, int]:
+        count, size = connection.execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM cache_entries WHERE namespace = ?",
+            (self.namespace,),
+        ).fetchone()
+        return int(count), int(size)
+
+    def _flush_touches(self, connection: sqlite3.Connection) -> None:
+        with self._lock:
+            touched, self._touched = self._touched, {}
+        connection.executemany(
+            "UPDATE cache_entries SET accessed_at = max(accessed_at, ?) WHERE namespace = ? AND key = ?",
+            [(accessed_at, self.namespace, key) for key, accessed_at in touched.items()],
+        )
+
+    def _evict_over_budget(self, connection: sqlite3.Connection) -> int:
+        if self.max_entries is None and self.max_bytes is None:
+            return 0
+        evicted = 0
+        count, size = self._totals(connection)
+        while _over_budget(count, size, self.max_entries, self.max_bytes):
+            key, entry_size = connection.execute(
+                "SELECT key, size FROM cache_entries WHERE namespace = ? ORDER BY accessed_at LIMIT 1",
+                (self.namespace,),
+            ).fetchone()
+            connection.execute(
+                "DELETE FROM cache_entries WHERE namespace = ? AND key = ?",
+                (self.namespace, key),
+            )
+            with self._lock:
+                self._decoded.pop(key, None)
+                self._touched.pop(key, None)
+            count -= 1
+            size -= entry_size
+            evicted += 1
+        return evicted
+
+    def _decoded_value(self, key: str, version: int) -> Any | None:
+        with self._lock:
+            decoded = self._decoded.get(key)
+            if decoded is None or decoded[0] != version:
+                return None
+            self._decoded.move_to_end(key)
+            return decoded[1]
+
+    def _remember(self, key: str, version: int, value: Any) -> None:
+        with self._lock:
+            self._decoded[key] = (version, value)
+            self._decoded.move_to_end(key)
+            while len(self._decoded) > self.decoded_entries:
+                self._decoded.popitem(last=False)
+
+
+def create_backend(
+    namespace: str | None,
+    max_entries: int | None = None,
+    max_bytes: int | None = None,
+) -> CacheBackend:
+    if namespace and CACHE_BACKEND == "sqlite":
+        return SQLiteBackend(CACHE_SQLITE_PATH, namespace, max_entries=max_entries, max_bytes=max_bytes)
+    return MemoryBackend(max_entries=max_entries, max_bytes=max_bytes)
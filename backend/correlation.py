@@ -0,0 +1,38 @@
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+
+MIN_OBSERVATIONS = 3
+
+
+def _column_pearson(x: np.ndarray, y: np.ndarray, valid: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    counts = valid.sum(axis=0)
+    safe_counts = np.maximum(counts, 1)
+    x = np.where(valid, x, 0.0)
+    y = np.where(valid, y, 0.0)
+    x_centered = np.where(valid, x - x.sum(axis=0) / safe_counts, 0.0)
+    y_centered = np.where(valid, y - y.sum(axis=0) / safe_counts, 0.0)
+    numerator = (x_centered * y_centered).sum(axis=0)
+    denominator = np.sqrt((x_centered ** 2).sum(axis=0) * (y_centered ** 2).sum(axis=0))
+    with np.errstate(invalid="ignore", divide="ignore"):
+        correlations = numerator / denominator
+    correlations[(counts < MIN_OBSERVATIONS) | ~(denominator > 1e-12)] = np.nan
+    return correlations, counts
+
+
+def lagged_pearson(leading: np.ndarray, lagging: np.ndarray, max_lag: int) -> tuple[np.ndarray, np.ndarray]:
+    padded = np.concatenate([lagging, np.full(max_lag, np.nan)])
+    shifted = sliding_window_view(padded, max_lag + 1)[:len(leading)]
+    repeated = np.broadcast_to(leading[:, None], shifted.shape)
+    valid = np.isfinite(repeated) & np.isfinite(shifted)
+    return _column_pearson(repeated, shifted, valid)
+
+
+def rolling_pearson(x: np.ndarray, y: np.ndarray, window: int) -> np.ndarray:
+    if len(x) < window:
+        return np.empty(0)
+    x_windows = sliding_window_view(x, window)
+    y_windows = sliding_window_view(y, window)
+    valid = np.isfinite(x_windows) & np.isfinite(y_windows)
+    correlations, _counts = _column_pearson(x_windows.T, y_windows.T, valid.T)
+    return correlations
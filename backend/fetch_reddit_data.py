@@ -1,22 +1,52 @@
+import asyncio
 import os
 import random
-from collections import defaultdict
+from contextlib import asynccontextmanager
 from datetime import datetime, timedelta, timezone
-from typing import Any
+from typing import Any, AsyncIterator
 
 import asyncpraw
+import numpy as np
 from dotenv import load_dotenv
-from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
 
-from cache import TTLCache
+import instrumentation
+import resilience
+import sentiment_scoring
+import sentiment_store
+import timeseries
+from cache import CacheEntry, TTLCache
 from schemas import RedditPost, SentimentLabel
 
 load_dotenv()
 app_id = os.getenv("REDDIT_CLIENT_ID")
 client_secret = os.getenv("REDDIT_CLIENT_SECRET")
 
-analyzer = SentimentIntensityAnalyzer()
-_reddit_cache = TTLCache[list[dict[str, Any]]](ttl_seconds=86400)
+REDDIT_CACHE_TTL_SECONDS = int(os.getenv("REDDIT_CACHE_TTL_SECONDS", "86400"))
+REDDIT_CACHE_STALE_TTL_SECONDS = int(os.getenv("REDDIT_CACHE_STALE_TTL_SECONDS", str(3 * 86400)))
+
+_reddit_cache = TTLCache[list[dict[str, Any]]](
+    ttl_seconds=REDDIT_CACHE_TTL_SECONDS,
+    stale_ttl_seconds=REDDIT_CACHE_STALE_TTL_SECONDS,
+    max_entries=1024,
+    max_bytes=64 * 1024 * 1024,
+    name="reddit",
+)
+REDDIT_FETCH_LIMIT = 100
+REDDIT_RETAINED_POSTS = int(os.getenv("REDDIT_RETAINED_POSTS", "500"))
+_ingestion_stats = {"searches": 0, "incrementalSearches": 0, "newPosts": 0}
+REDDIT_MAX_CONCURRENT_SEARCHES = int(os.getenv("REDDIT_MAX_CONCURRENT_SEARCHES", "4"))
+
+
+def cache_stats() -> dict[str, Any]:
+    return {"reddit": {**_reddit_cache.stats(), "ingestion": dict(_ingestion_stats)}}
+
+
+def client_stats() -> dict[str, Any]:
+    return reddit_pool.stats()
+
+
+def get_freshness(ticker: str) -> CacheEntry[list[dict[str, Any]]] | None:
+    return _reddit_cache.peek_metadata(ticker.upper().strip())
 
 
 def classify_sentiment(score: float) -> SentimentLabel:
@@ -46,31 +76,175 @@ def get_async_reddit():
     )
 
 
+class RedditClientPool:
+    def __init__(self, max_concurrent_searches: int):
+        self.max_concurrent_searches = max_concurrent_searches
+        self._client = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._semaphore: asyncio.Semaphore | None = None
+        self._active = 0
+        self._waiting = 0
+        self._clients_created = 0
+        self._searches = 0
+        self._closing: set[asyncio.Future] = set()
+
+    async def start(self) -> None:
+        try:
+            self._ensure_client()
+        except RuntimeError:
+            pass
+
+    async def close(self) -> None:
+        client, self._client = self._client, None
+        self._loop = None
+        self._semaphore = None
+        if client is not None:
+            await client.close()
+
+    @asynccontextmanager
+    async def client(self) -> AsyncIterator[Any]:
+        client = self._ensure_client()
+        semaphore = self._semaphore
+        self._waiting += 1
+        try:
+            await semaphore.acquire()
+        finally:
+            self._waiting -= 1
+        self._active += 1
+        self._searches += 1
+        try:
+            yield client
+        finally:
+            self._active -= 1
+            semaphore.release()
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "connected": self._client is not None,
+            "maxConcurrentSearches": self.max_concurrent_searches,
+            "activeSearches": self._active,
+            "waitingSearches": self._waiting,
+            "clientsCreated": self._clients_created,
+            "searches": self._searches,
+        }
+
+    def _ensure_client(self) -> Any:
+        loop = asyncio.get_running_loop()
+        if self._client is None or self._loop is not loop:
+            if self._client is not None:
+                self._discard(self._client, self._loop)
+            self._client = get_async_reddit()
+            self._loop = loop
+            self._semaphore = asyncio.Semaphore(self.max_concurrent_searches)
+            self._clients_created += 1
+        return self._client
+
+    def _discard(self, client: Any, old_loop: asyncio.AbstractEventLoop | None) -> None:
+        # Close the old session on the loop that owns it; if that loop is gone,
+        # close it on this one so its connector is not leaked.
+        if old_loop is not None and old_loop.is_running():
+            future = asyncio.run_coroutine_threadsafe(client.close(), old_loop)
+        else:
+            future = asyncio.ensure_future(client.close())
+        self._closing.add(future)
+        future.add_done_callback(self._closed)
+
+    def _closed(self, future: Any) -> None:
+        self._closing.discard(future)
+        if not future.cancelled():
+            future.exception()
+
+
+reddit_pool = RedditClientPool(max_concurrent_searches=REDDIT_MAX_CONCURRENT_SEARCHES)
+
+
+def merge_posts(
+    new_posts: list[dict[str, Any]],
+    previous: list[dict[str, Any]],
+    retain: int = REDDIT_RETAINED_POSTS,
+) -> list[dict[str, Any]]:
+    merged = {post["id"]: post for post in previous}
+    merged.update((post["id"], post) for post in new_posts)
+    return sorted(merged.values(), key=lambda post: post["date"], reverse=True)[:retain]
+
+
+async def _search_posts(ticker: str, previous: list[dict[str, Any]] | None = None) -> list[dict[str, Any]]:
+    previous = previous or []
+    seen_ids = {post["id"] for post in previous}
+    cursor = max((post["date"] for post in previous), default=None)
+    submissions = []
+    with instrumentation.span("reddit_search"), resilience.reddit.admission() as timed:
+        async with reddit_pool.client() as reddit:
+            with timed():
+                query = f"${ticker}"
+                subreddit = await reddit.subreddit("all")
+                async for submission in subreddit.search(query, sort="new", limit=REDDIT_FETCH_LIMIT):
+                    created_utc = float(getattr(submission, "created_utc", 0) or 0)
+                    if cursor is not None and created_utc < cursor:
+                        break
+                    if str(getattr(submission, "id", "")) in seen_ids:
+                        continue
+                    submissions.append(submission)
+
+    _ingestion_stats["searches"] += 1
+    _ingestion_stats["incrementalSearches"] += bool(previous)
+    _ingestion_stats["newPosts"] += len(submissions)
+    if not submissions:
+        return previous
+
+    with instrumentation.span("sentiment_scoring"):
+        scores = await sentiment_scoring.scorer.score_many([
+            (str(getattr(submission, "id", "")), submission_text(submission))
+            for submission in submissions
+        ])
+    new_posts = [
+        format_submission(submission, compound_score=score)
+        for submission, score in zip(submissions, scores)
+    ]
+    await asyncio.to_thread(sentiment_store.store.record_posts, ticker, new_posts)
+    return merge_posts(new_posts, previous)
+
+
+def _retained_posts(ticker: str) -> list[dict[str, Any]] | None:
+    entry = _reddit_cache.peek_entry(ticker)
+    return entry.value if entry else None
+
+
 async def get_reddit_data(ticker: str, limit: int = 10):
     normalized_ticker = ticker.upper().strip()
-    cache_key = f"{normalized_ticker}:{limit}"
-    cached = _reddit_cache.get(cache_key)
-    if cached is not None:
-        return cached
+    posts = await _reddit_cache.get_or_load_async(
+        normalized_ticker,
+        lambda: _search_posts(normalized_ticker, previous=_retained_posts(normalized_ticker)),
+    )
+    return posts[:limit]
 
-    reddit = get_async_reddit()
-    posts = []
-    try:
-        query = f"${normalized_ticker}"
-        subreddit = await reddit.subreddit("all")
-        async for submission in subreddit.search(query, limit=limit):
-            posts.append(format_submission(submission))
-    finally:
-        await reddit.close()
 
-    return _reddit_cache.set(cache_key, posts)
+def submission_text(submission: Any) -> str:
+    title = getattr(submission, "title", "") or ""
+    selftext = getattr(submission, "selftext", "") or ""
+    return f"{title} {selftext}"
+
 
+def needs_refresh(ticker: str, lead_seconds: float) -> bool:
+    return _reddit_cache.expires_within(ticker.upper().strip(), lead_seconds)
 
-def format_submission(submission: Any) -> dict[str, Any]:
+
+async def refresh_reddit_data(ticker: str) -> None:
+    normalized_ticker = ticker.upper().strip()
+    await _reddit_cache.refresh_async(
+        normalized_ticker,
+        lambda: _search_posts(normalized_ticker, previous=_retained_posts(normalized_ticker)),
+    )
+
+
+def format_submission(submission: Any, compound_score: float | None = None) -> dict[str, Any]:
     title = getattr(submission, "title", "") or ""
     selftext = getattr(submission, "selftext", "") or ""
-    text_content = f"{title} {selftext}"
-    compound_score = analyzer.polarity_scores(text_content)["compound"]
+    if compound_score is None:
+        compound_score = sentiment_scoring.scorer.score(
+            str(getattr(submission, "id", "")),
+            submission_text(submission),
+        )
     avatar_num = random.randint(0, 7)
     avatar_url = f"https://www.redditstatic.com/avatars/defaults/v2/avatar_default_{avatar_num}.png"
     author = getattr(submission, "author", None)
@@ -125,43 +299,26 @@ async def categorize_sentiment(ticker: str):
 
 
 async def get_sentiment_timeseries(ticker: str, days: int = 30):
-    posts = await get_reddit_data(ticker, limit=50)
-
-    if not posts:
-        return []
-
-    posts_by_date = defaultdict(list)
-
-    for post in posts:
-        post_date = datetime.fromtimestamp(post["date"], tz=timezone.utc).date()
-        posts_by_date[post_date].append(post["score"])
+    normalized_ticker = ticker.upper().strip()
+    unavailable = None
+    try:
+        await get_reddit_data(normalized_ticker, limit=0)
+    except resilience.UpstreamUnavailableError as exc:
+        unavailable = exc
 
-    sentiment_timeseries = []
     end_date = datetime.now(timezone.utc).date()
     start_date = end_date - timedelta(days=days)
+    rows = await asyncio.to_thread(sentiment_store.store.daily_range, normalized_ticker, start_date, end_date)
+    if not rows:
+        if unavailable is not None:
+            raise unavailable
+        return []
 
-    current_date = start_date
-    while current_date <= end_date:
-        if current_date in posts_by_date:
-            scores = posts_by_date[current_date]
-            avg_score = sum(scores) / len(scores)
-            post_count = len(scores)
-            sentiment_category = classify_sentiment(avg_score)
-
-            sentiment_timeseries.append({
-                "date": current_date.strftime("%Y-%m-%d"),
-                "score": avg_score,
-                "sentiment": sentiment_category,
-                "post_count": post_count
-            })
-        else:
-            sentiment_timeseries.append({
-                "date": current_date.strftime("%Y-%m-%d"),
-                "score": 0.0,
-                "sentiment": "neutral",
-                "post_count": 0
-            })
-
-        current_date += timedelta(days=1)
-
-    return sentiment_timeseries
+    series = timeseries.dense_daily_series(
+        timeseries.day_index([row.day for row in rows]),
+        np.fromiter((row.score_sum for row in rows), dtype=np.float64, count=len(rows)),
+        np.fromiter((row.post_count for row in rows), dtype=np.int64, count=len(rows)),
+        timeseries.day_number(start_date),
+        timeseries.day_number(end_date),
+    )
+    return series.records()
@@ -1,13 +1,49 @@
 import math
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from concurrent.futures import TimeoutError as FutureTimeoutError
 from datetime import timedelta
 from typing import Any
 
+import numpy as np
 import pandas as pd
 
-from cache import TTLCache
-
-
-_stock_cache = TTLCache[dict[str, Any]](ttl_seconds=86400)
+import instrumentation
+import provider_executor
+import resilience
+from cache import CacheEntry, SingleFlight, TTLCache
+
+
+STOCK_CACHE_TTL_SECONDS = int(os.getenv("STOCK_CACHE_TTL_SECONDS", "86400"))
+STOCK_CACHE_STALE_TTL_SECONDS = int(os.getenv("STOCK_CACHE_STALE_TTL_SECONDS", str(7 * 86400)))
+
+_frame_cache = TTLCache[dict[str, Any]](
+    ttl_seconds=STOCK_CACHE_TTL_SECONDS,
+    stale_ttl_seconds=STOCK_CACHE_STALE_TTL_SECONDS,
+    max_entries=256,
+    max_bytes=256 * 1024 * 1024,
+    name="frames",
+    refresh_executor=provider_executor.executor,
+)
+_stock_cache = TTLCache[dict[str, Any]](
+    ttl_seconds=STOCK_CACHE_STALE_TTL_SECONDS,
+    max_entries=1024,
+    max_bytes=128 * 1024 * 1024,
+    name="stock",
+)
+# Coalesces concurrent loads on the event loop so only one provider worker runs per key.
+_stock_flight = SingleFlight[dict[str, Any]]()
+PROVIDER_FRAME_WORKERS = int(os.getenv("PROVIDER_FRAME_WORKERS", "16"))
+PROVIDER_FRAME_BUDGET_SECONDS = float(os.getenv("PROVIDER_FRAME_BUDGET_SECONDS", "15"))
+# Price and optional frames use separate pools so optional fetches abandoned
+# past the budget can never hold the threads a price fetch needs.
+_price_executor = ThreadPoolExecutor(max_workers=PROVIDER_FRAME_WORKERS, thread_name_prefix="provider-price")
+_optional_executor = ThreadPoolExecutor(max_workers=PROVIDER_FRAME_WORKERS, thread_name_prefix="provider-optional")
+_frame_stats_lock = threading.Lock()
+_frame_stats = {"priceTimeouts": 0, "optionalTimeouts": 0, "optionalFailures": 0, "optionalSkipped": 0}
+_optional_in_flight = 0
 PERIOD_DAYS = {
     "5d": 5,
     "1mo": 31,
@@ -20,6 +56,13 @@ PERIOD_DAYS = {
 }
 
 
+def cache_stats() -> dict[str, Any]:
+    return {
+        "stock": _stock_cache.stats(),
+        "frames": {**_frame_cache.stats(), "fetches": frame_fetch_stats()},
+    }
+
+
 def _clean_number(value: Any) -> float | int | None:
     try:
         if value is None:
@@ -44,38 +87,126 @@ def _clean_info(info: dict[str, Any]) -> dict[str, Any]:
     return cleaned
 
 
+def frame_fetch_stats() -> dict[str, int]:
+    with _frame_stats_lock:
+        return {**_frame_stats, "optionalInFlight": _optional_in_flight}
+
+
+def _count(stat: str) -> None:
+    with _frame_stats_lock:
+        _frame_stats[stat] += 1
+
+
+def _submit_optional(fn: Any, *args: Any) -> Future | None:
+    global _optional_in_flight
+    with _frame_stats_lock:
+        if _optional_in_flight >= PROVIDER_FRAME_WORKERS:
+            _frame_stats["optionalSkipped"] += 1
+            return None
+        _optional_in_flight += 1
+    future = _optional_executor.submit(fn, *args)
+    future.add_done_callback(_finish_optional)
+    return future
+
+
+def _finish_optional(_future: Future) -> None:
+    global _optional_in_flight
+    with _frame_stats_lock:
+        _optional_in_flight -= 1
+
+
+@instrumentation.span("provider_fetch")
 def _fetch_provider_frames(ticker: str):
     from defeatbeta_api.data.ticker import Ticker
 
+    deadline = time.monotonic() + PROVIDER_FRAME_BUDGET_SECONDS
     provider = Ticker(ticker)
-    frames = {"price": provider.price()}
+    price = _price_executor.submit(provider.price)
     optional_frames = {
-        "market_cap": provider.market_capitalization,
-        "ttm_pe": provider.ttm_pe,
-        "beta": lambda: provider.beta("5y"),
+        "market_cap": _submit_optional(provider.market_capitalization),
+        "ttm_pe": _submit_optional(provider.ttm_pe),
+        "beta": _submit_optional(provider.beta, "5y"),
     }
+    pending = [future for future in optional_frames.values() if future is not None]
 
-    for key, fetch_frame in optional_frames.items():
-        try:
-            frames[key] = fetch_frame()
-        except Exception:
-            frames[key] = None
-
+    try:
+        frames = {"price": price.result(timeout=max(deadline - time.monotonic(), 0))}
+    except BaseException as exc:
+        for future in pending:
+            future.cancel()
+        if not isinstance(exc, FutureTimeoutError):
+            raise
+        _count("priceTimeouts")
+        raise resilience.UpstreamUnavailableError(
+            "Defeat Beta", f"price fetch exceeded the {PROVIDER_FRAME_BUDGET_SECONDS:g}s budget"
+        ) from None
+
+    wait(pending, timeout=max(deadline - time.monotonic(), 0))
+    for key, future in optional_frames.items():
+        frames[key] = _optional_frame(future)
     return frames
 
 
+def _optional_frame(future: Future | None) -> Any | None:
+    if future is None:
+        return None
+    if not future.done():
+        future.cancel()
+        _count("optionalTimeouts")
+        return None
+    if future.exception() is not None:
+        _count("optionalFailures")
+        return None
+    return future.result()
+
+
+def _load_provider_frames(ticker: str) -> dict[str, Any]:
+    return resilience.defeatbeta.call(_fetch_provider_frames, ticker)
+
+
 def _row_value(row: Any, key: str) -> Any:
     if hasattr(row, "get"):
         return row.get(key)
     return getattr(row, key, None)
 
 
-def _format_report_date(value: Any) -> str:
-    if hasattr(value, "strftime"):
-        return value.strftime("%Y-%m-%d")
-    return str(value)[:10]
+def _numeric_column(frame: pd.DataFrame, column: str) -> pd.Series:
+    if column not in frame.columns:
+        return pd.Series(np.nan, index=frame.index, dtype="float64")
+    values = pd.to_numeric(frame[column], errors="coerce").astype("float64")
+    return values.where(np.isfinite(values))
 
 
+def _format_date_column(frame: pd.DataFrame) -> pd.Series:
+    if "report_date" not in frame.columns:
+        return pd.Series("None", index=frame.index, dtype="object")
+    dates = frame["report_date"]
+    parsed = dates if pd.api.types.is_datetime64_any_dtype(dates) else pd.to_datetime(dates, errors="coerce")
+    formatted = parsed.dt.strftime("%Y-%m-%d")
+    if formatted.notna().all():
+        return formatted
+    return formatted.where(parsed.notna(), dates.astype(str).str[:10])
+
+
+def _nullable(values: pd.Series) -> list[Any]:
+    return values.astype(object).where(values.notna(), None).tolist()
+
+
+def _history_records(price_frame: pd.DataFrame) -> list[dict[str, Any]]:
+    volume = _numeric_column(price_frame, "volume")
+    columns = {
+        "Date": _format_date_column(price_frame).tolist(),
+        "Open": _nullable(_numeric_column(price_frame, "open")),
+        "High": _nullable(_numeric_column(price_frame, "high")),
+        "Low": _nullable(_numeric_column(price_frame, "low")),
+        "Close": _nullable(_numeric_column(price_frame, "close")),
+        "Volume": _nullable(np.trunc(volume).astype("Int64")),
+    }
+    keys = [*columns, "Dividends", "Stock Splits"]
+    return [dict(zip(keys, (*row, None, None))) for row in zip(*columns.values())]
+
+
+@instrumentation.span("filter_price_frame")
 def _filter_price_frame(price_frame: Any, period: str):
     days = PERIOD_DAYS.get(period)
     if not days or not hasattr(price_frame, "copy"):
@@ -119,31 +250,47 @@ def _latest_number(frame: Any, *columns: str) -> float | int | None:
     return None
 
 
+def get_freshness(ticker: str) -> CacheEntry[dict[str, Any]] | None:
+    return _frame_cache.peek_metadata(ticker.upper().strip())
+
+
 def get_stock_data(ticker: str, period: str = "1mo"):
     normalized_ticker = ticker.upper().strip()
-    cache_key = f"{normalized_ticker}:{period}"
-    cached = _stock_cache.get(cache_key)
-    if cached is not None:
-        return cached
+    frames_entry = _frame_cache.get_or_load_entry(
+        normalized_ticker,
+        lambda: _load_provider_frames(normalized_ticker),
+    )
+    return _stock_cache.get_or_load(
+        f"{normalized_ticker}:{period}:{frames_entry.version}",
+        lambda: _build_stock_data(normalized_ticker, period, frames_entry.value),
+    )
+
 
-    provider_frames = _fetch_provider_frames(normalized_ticker)
+async def get_stock_data_async(ticker: str, period: str = "1mo"):
+    normalized_ticker = ticker.upper().strip()
+    return await _stock_flight.do_async(
+        f"{normalized_ticker}:{period}",
+        lambda: provider_executor.executor.run(get_stock_data, normalized_ticker, period),
+    )
+
+
+def needs_refresh(ticker: str, lead_seconds: float) -> bool:
+    return _frame_cache.expires_within(ticker.upper().strip(), lead_seconds)
+
+
+def refresh_stock_data(ticker: str, periods: set[str]) -> None:
+    normalized_ticker = ticker.upper().strip()
+    _frame_cache.refresh(normalized_ticker, lambda: _load_provider_frames(normalized_ticker))
+    for period in periods:
+        get_stock_data(normalized_ticker, period)
+
+
+def _build_stock_data(normalized_ticker: str, period: str, provider_frames: dict[str, Any]) -> dict[str, Any]:
     full_price_frame = provider_frames["price"]
     price_frame = _filter_price_frame(full_price_frame, period)
     fifty_two_week_frame = _filter_price_frame(full_price_frame, "1y")
 
-    history_with_dates = []
-    for _, row in price_frame.iterrows():
-        volume = _clean_number(_row_value(row, "volume"))
-        history_with_dates.append({
-            "Date": _format_report_date(_row_value(row, "report_date")),
-            "Open": _clean_number(_row_value(row, "open")),
-            "High": _clean_number(_row_value(row, "high")),
-            "Low": _clean_number(_row_value(row, "low")),
-            "Close": _clean_number(_row_value(row, "close")),
-            "Volume": int(volume) if volume is not None else None,
-            "Dividends": None,
-            "Stock Splits": None,
-        })
+    history_with_dates = _history_records(price_frame)
 
     latest = history_with_dates[-1] if history_with_dates else {}
     previous = history_with_dates[-2] if len(history_with_dates) > 1 else {}
@@ -158,24 +305,21 @@ def get_stock_data(ticker: str, period: str = "1mo"):
     fifty_two_week_low = _clean_number(fifty_two_week_frame["low"].min()) if "low" in getattr(fifty_two_week_frame, "columns", []) else None
     fifty_two_week_high = _clean_number(fifty_two_week_frame["high"].max()) if "high" in getattr(fifty_two_week_frame, "columns", []) else None
 
-    return _stock_cache.set(
-        cache_key,
-        {
-            "info": _clean_info({
-                "symbol": normalized_ticker,
-                "currentPrice": current_price,
-                "previousClose": previous_close,
-                "regularMarketChange": change,
-                "regularMarketChangePercent": change_percent,
-                "regularMarketVolume": int(volume) if volume is not None else None,
-                "volume": int(volume) if volume is not None else None,
-                "marketCap": _latest_number(provider_frames.get("market_cap"), "market_capitalization", "marketCap"),
-                "fiftyTwoWeekLow": fifty_two_week_low,
-                "fiftyTwoWeekHigh": fifty_two_week_high,
-                "trailingPE": _latest_number(provider_frames.get("ttm_pe"), "ttm_pe", "trailingPE"),
-                "beta": _latest_number(provider_frames.get("beta"), "beta", "beta_5y"),
-                "dataProvider": "Defeat Beta API",
-            }),
-            "history": history_with_dates,
-        },
-    )
+    return {
+        "info": _clean_info({
+            "symbol": normalized_ticker,
+            "currentPrice": current_price,
+            "previousClose": previous_close,
+            "regularMarketChange": change,
+            "regularMarketChangePercent": change_percent,
+            "regularMarketVolume": int(volume) if volume is not None else None,
+            "volume": int(volume) if volume is not None else None,
+            "marketCap": _latest_number(provider_frames.get("market_cap"), "market_capitalization", "marketCap"),
+            "fiftyTwoWeekLow": fifty_two_week_low,
+            "fiftyTwoWeekHigh": fifty_two_week_high,
+            "trailingPE": _latest_number(provider_frames.get("ttm_pe"), "ttm_pe", "trailingPE"),
+            "beta": _latest_number(provider_frames.get("beta"), "beta", "beta_5y"),
+            "dataProvider": "Defeat Beta API",
+        }),
+        "history": history_with_dates,
+    }
@@ -0,0 +1,51 @@
+import hashlib
+import time
+
+import request_scope
+from cache import CacheEntry
+
+
+def strong_etag(validator: str) -> str:
+    return '"' + hashlib.blake2b(validator.encode("utf-8"), digest_size=16).hexdigest() + '"'
+
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = [candidate.strip() for candidate in if_none_match.split(",")]
+    return "*" in candidates or etag in (candidate.removeprefix("W/") for candidate in candidates)
+
+
+def cache_control(*entries: CacheEntry | None, max_seconds: float | None = None) -> str:
+    now = time.time()
+    if not entries or any(entry is None for entry in entries):
+        return "no-cache"
+    fresh_for = min(entry.fresh_until for entry in entries) - now
+    if max_seconds is not None:
+        fresh_for = min(fresh_for, max_seconds)
+    if fresh_for < 1:
+        return "no-cache"
+    stale_for = max(min(entry.expires_at for entry in entries) - now - fresh_for, 0)
+    return f"public, max-age={int(fresh_for)}, stale-while-revalidate={int(stale_for)}"
+
+
+def settled_validator(before: str | None, after: str | None) -> str | None:
+    return after if before in (None, after) else None
+
+
+def attach_validators(validator: str | None, cache_control_value: str) -> None:
+    if validator is None:
+        request_scope.set_response_header("Cache-Control", "no-cache")
+        return
+    request_scope.set_response_header("ETag", strong_etag(validator))
+    request_scope.set_response_header("Cache-Control", cache_control_value)
+
+
+def not_modified(validator: str | None, cache_control_value: str) -> bool:
+    scope = request_scope.current()
+    if validator is None or scope is None:
+        return False
+    if not etag_matches(scope.request_headers.get("if-none-match"), strong_etag(validator)):
+        return False
+    attach_validators(validator, cache_control_value)
+    return True
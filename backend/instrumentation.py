@@ -0,0 +1,170 @@
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Iterator
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+import request_scope
+
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+STAGE_METRIC = "stocksentiment_stage_duration_seconds"
+REQUEST_METRIC = "stocksentiment_request_duration_seconds"
+CACHE_COUNTERS = ("hits", "staleHits", "misses", "evictions", "expirations", "refreshes", "refreshFailures")
+CACHE_GAUGES = ("entries", "bytes", "hitRatio")
+
+
+class Histogram:
+    def __init__(self, buckets: tuple[float, ...] = DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self._counts = [0] * (len(buckets) + 1)
+        self._sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, seconds: float) -> None:
+        index = bisect.bisect_left(self.buckets, seconds)
+        with self._lock:
+            self._counts[index] += 1
+            self._sum += seconds
+
+    def snapshot(self) -> tuple[list[int], float]:
+        with self._lock:
+            return list(self._counts), self._sum
+
+
+class Registry:
+    def __init__(self):
+        self._histograms: dict[tuple[str, tuple[tuple[str, str], ...]], Histogram] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, name: str, seconds: float, **labels: str) -> None:
+        key = (name, tuple(sorted(labels.items())))
+        histogram = self._histograms.get(key)
+        if histogram is None:
+            with self._lock:
+                histogram = self._histograms.setdefault(key, Histogram())
+        histogram.observe(seconds)
+
+    def render(self) -> str:
+        with self._lock:
+            histograms = sorted(self._histograms.items())
+        lines: list[str] = []
+        current_name = None
+        for (name, labels), histogram in histograms:
+            if name != current_name:
+                lines.append(f"# TYPE {name} histogram")
+                current_name = name
+            counts, total = histogram.snapshot()
+            cumulative = 0
+            for bound, count in zip((*histogram.buckets, float("inf")), counts):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else f"{bound:g}"
+                lines.append(f"{name}_bucket{_labels(labels, le=le)} {cumulative}")
+            lines.append(f"{name}_sum{_labels(labels)} {total:.6f}")
+            lines.append(f"{name}_count{_labels(labels)} {cumulative}")
+        return "\n".join(lines) + "\n" if lines else ""
+
+    def clear(self) -> None:
+        with self._lock:
+            self._histograms.clear()
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(labels: tuple[tuple[str, str], ...], **extra: str) -> str:
+    pairs = [*labels, *extra.items()]
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(str(value))}"' for name, value in pairs) + "}"
+
+
+registry = Registry()
+
+
+@contextmanager
+def span(stage: str) -> Iterator[None]:
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        registry.observe(STAGE_METRIC, elapsed, stage=stage)
+        scope = request_scope.current()
+        if scope is not None:
+            scope.add_timing(stage, elapsed)
+
+
+def _snake(field: str) -> str:
+    return "".join(f"_{char.lower()}" if char.isupper() else char for char in field)
+
+
+def render_cache_stats(caches: dict[str, dict[str, Any]]) -> str:
+    lines: list[str] = []
+    for field in (*CACHE_COUNTERS, *CACHE_GAUGES):
+        metric_type = "counter" if field in CACHE_COUNTERS else "gauge"
+        name = "stocksentiment_cache_" + _snake(field)
+        if metric_type == "counter":
+            name += "_total"
+        samples = [
+            f"{name}{_labels((('cache', cache),))} {stats[field]}"
+            for cache, stats in caches.items()
+            if stats.get(field) is not None
+        ]
+        if samples:
+            lines.append(f"# TYPE {name} {metric_type}")
+            lines.extend(samples)
+    return "\n".join(lines) + "\n" if lines else ""
+
+
+def render_upstream_stats(upstreams: dict[str, dict[str, Any]]) -> str:
+    lines = ["# TYPE stocksentiment_upstream_circuit_open gauge"]
+    lines.extend(
+        f"stocksentiment_upstream_circuit_open{_labels((('upstream', upstream),))} "
+        f"{int(stats['breaker']['state'] != 'closed')}"
+        for upstream, stats in upstreams.items()
+    )
+    for field in ("calls", "failures", "slowCalls"):
+        name = f"stocksentiment_upstream_{_snake(field)}_total"
+        lines.append(f"# TYPE {name} counter")
+        lines.extend(f"{name}{_labels((('upstream', upstream),))} {stats[field]}" for upstream, stats in upstreams.items())
+    lines.append("# TYPE stocksentiment_upstream_rejected_total counter")
+    lines.extend(
+        f"stocksentiment_upstream_rejected_total{_labels((('upstream', upstream), ('reason', reason)))} {count}"
+        for upstream, stats in upstreams.items()
+        for reason, count in stats["rejected"].items()
+    )
+    return "\n".join(lines) + "\n"
+
+
+class MetricsMiddleware:
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status = {"code": 500}
+
+        async def send_with_status(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            route = scope.get("route")
+            registry.observe(
+                REQUEST_METRIC,
+                time.perf_counter() - started,
+                endpoint=getattr(route, "path", "unmatched"),
+                method=scope["method"],
+                status=str(status["code"]),
+            )
@@ -0,0 +1,148 @@
+import asyncio
+import os
+import random
+import time
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable
+
+import fetch_reddit_data
+import fetch_stock_data
+import provider_executor
+
+
+PREFETCH_ENABLED = os.getenv("PREFETCH_ENABLED", "true").lower() in {"1", "true", "yes"}
+PREFETCH_TOP_N = int(os.getenv("PREFETCH_TOP_N", "20"))
+PREFETCH_INTERVAL_SECONDS = float(os.getenv("PREFETCH_INTERVAL_SECONDS", "300"))
+PREFETCH_LEAD_SECONDS = float(os.getenv("PREFETCH_LEAD_SECONDS", "3600"))
+PREFETCH_JITTER_SECONDS = float(os.getenv("PREFETCH_JITTER_SECONDS", "30"))
+PREFETCH_MAX_REFRESHES_PER_CYCLE = int(os.getenv("PREFETCH_MAX_REFRESHES_PER_CYCLE", "20"))
+PREFETCH_MIN_SPACING_SECONDS = float(os.getenv("PREFETCH_MIN_SPACING_SECONDS", "2"))
+PREFETCH_DECAY = 0.5
+MAX_TRACKED_PERIODS = 4
+
+
+@dataclass
+class PrefetchTarget:
+    name: str
+    needs_refresh: Callable[[str, float], bool]
+    refresh: Callable[[str, set[str]], Awaitable[None]]
+
+
+class PrefetchScheduler:
+    def __init__(
+        self,
+        targets: list[PrefetchTarget],
+        top_n: int = PREFETCH_TOP_N,
+        interval_seconds: float = PREFETCH_INTERVAL_SECONDS,
+        lead_seconds: float = PREFETCH_LEAD_SECONDS,
+        jitter_seconds: float = PREFETCH_JITTER_SECONDS,
+        max_refreshes_per_cycle: int = PREFETCH_MAX_REFRESHES_PER_CYCLE,
+        min_spacing_seconds: float = PREFETCH_MIN_SPACING_SECONDS,
+    ):
+        self.targets = targets
+        self.top_n = top_n
+        self.interval_seconds = interval_seconds
+        self.lead_seconds = lead_seconds
+        self.jitter_seconds = jitter_seconds
+        self.max_refreshes_per_cycle = max_refreshes_per_cycle
+        self.min_spacing_seconds = min_spacing_seconds
+        self._scores: dict[str, float] = defaultdict(float)
+        self._periods: dict[str, dict[str, None]] = defaultdict(dict)
+        self._task: asyncio.Task | None = None
+        self._last_refresh_at = 0.0
+        self._cycles = 0
+        self._refreshes = 0
+        self._failures = 0
+
+    def record(self, ticker: str, period: str | None = None) -> None:
+        normalized_ticker = ticker.upper().strip()
+        self._scores[normalized_ticker] += 1.0
+        if period:
+            periods = self._periods[normalized_ticker]
+            periods.pop(period, None)
+            periods[period] = None
+            while len(periods) > MAX_TRACKED_PERIODS:
+                periods.pop(next(iter(periods)))
+
+    def hot_tickers(self) -> list[str]:
+        ranked = sorted(self._scores.items(), key=lambda item: (-item[1], item[0]))
+        return [ticker for ticker, _score in ranked[:self.top_n]]
+
+    async def run_once(self) -> int:
+        self._cycles += 1
+        refreshed = 0
+        for ticker in self.hot_tickers():
+            for target in self.targets:
+                if refreshed >= self.max_refreshes_per_cycle:
+                    break
+                if not target.needs_refresh(ticker, self.lead_seconds):
+                    continue
+                await self._pace()
+                try:
+                    await target.refresh(ticker, set(self._periods.get(ticker) or {"1mo": None}))
+                    self._refreshes += 1
+                except Exception:
+                    self._failures += 1
+                refreshed += 1
+        self._decay()
+        return refreshed
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.ensure_future(self._run_forever())
+
+    async def stop(self) -> None:
+        task, self._task = self._task, None
+        if task is None:
+            return
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "running": self._task is not None and not self._task.done(),
+            "trackedTickers": len(self._scores),
+            "hotTickers": self.hot_tickers(),
+            "cycles": self._cycles,
+            "refreshes": self._refreshes,
+            "failures": self._failures,
+        }
+
+    async def _run_forever(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval_seconds + random.uniform(0, self.jitter_seconds))
+            await self.run_once()
+
+    async def _pace(self) -> None:
+        delay = self._last_refresh_at + self.min_spacing_seconds - time.monotonic()
+        delay += random.uniform(0, self.jitter_seconds / 10) if self.jitter_seconds else 0
+        if delay > 0:
+            await asyncio.sleep(delay)
+        self._last_refresh_at = time.monotonic()
+
+    def _decay(self) -> None:
+        for ticker in list(self._scores):
+            self._scores[ticker] *= PREFETCH_DECAY
+            if self._scores[ticker] < 0.05:
+                del self._scores[ticker]
+                self._periods.pop(ticker, None)
+
+
+async def _refresh_stock(ticker: str, periods: set[str]) -> None:
+    await provider_executor.executor.run(fetch_stock_data.refresh_stock_data, ticker, periods)
+
+
+async def _refresh_reddit(ticker: str, _periods: set[str]) -> None:
+    await fetch_reddit_data.refresh_reddit_data(ticker)
+
+
+scheduler = PrefetchScheduler(
+    targets=[
+        PrefetchTarget(name="stock", needs_refresh=fetch_stock_data.needs_refresh, refresh=_refresh_stock),
+        PrefetchTarget(name="reddit", needs_refresh=fetch_reddit_data.needs_refresh, refresh=_refresh_reddit),
+    ],
+)
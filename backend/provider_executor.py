@@ -0,0 +1,102 @@
+import asyncio
+import contextvars
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, TypeVar
+
+
+T = TypeVar("T")
+
+PROVIDER_MAX_WORKERS = int(os.getenv("PROVIDER_MAX_WORKERS", "8"))
+PROVIDER_MAX_QUEUE = int(os.getenv("PROVIDER_MAX_QUEUE", "64"))
+
+
+class ExecutorSaturatedError(RuntimeError):
+    pass
+
+
+class ProviderExecutor:
+    def __init__(self, max_workers: int, max_queue: int, name: str = "provider"):
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.name = name
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=name)
+        self._lock = threading.Lock()
+        self._active = 0
+        self._queued = 0
+        self._peak_queued = 0
+        self._completed = 0
+        self._failed = 0
+        self._rejected = 0
+        self._total_wait_seconds = 0.0
+
+    def submit(self, fn: Callable[..., T], *args: Any) -> Future:
+        with self._lock:
+            if self._queued >= self.max_queue:
+                self._rejected += 1
+                raise ExecutorSaturatedError(f"{self.name} executor queue is full ({self.max_queue} waiting)")
+            self._queued += 1
+            self._peak_queued = max(self._peak_queued, self._queued)
+
+        context = contextvars.copy_context()
+        submitted_at = time.perf_counter()
+
+        def run() -> T:
+            with self._lock:
+                self._queued -= 1
+                self._active += 1
+                self._total_wait_seconds += time.perf_counter() - submitted_at
+            failed = False
+            try:
+                return context.run(fn, *args)
+            except BaseException:
+                failed = True
+                raise
+            finally:
+                with self._lock:
+                    self._active -= 1
+                    self._completed += 1
+                    self._failed += failed
+
+        try:
+            future = self._executor.submit(run)
+        except BaseException:
+            self._release_queued()
+            raise
+        future.add_done_callback(self._release_if_cancelled)
+        return future
+
+    async def run(self, fn: Callable[..., T], *args: Any) -> T:
+        return await asyncio.wrap_future(self.submit(fn, *args))
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            started = self._completed + self._active
+            return {
+                "maxWorkers": self.max_workers,
+                "maxQueue": self.max_queue,
+                "active": self._active,
+                "queued": self._queued,
+                "peakQueued": self._peak_queued,
+                "completed": self._completed,
+                "failed": self._failed,
+                "rejected": self._rejected,
+                "averageWaitMs": round(self._total_wait_seconds / started * 1000, 3) if started else None,
+            }
+
+    def _release_if_cancelled(self, future: Future) -> None:
+        # A future cancelled while queued never reaches run(), so free its slot here.
+        if future.cancelled():
+            self._release_queued()
+
+    def _release_queued(self) -> None:
+        with self._lock:
+            self._queued -= 1
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+executor = ProviderExecutor(max_workers=PROVIDER_MAX_WORKERS, max_queue=PROVIDER_MAX_QUEUE)
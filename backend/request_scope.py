@@ -0,0 +1,64 @@
+import threading
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+
+@dataclass
+class RequestScope:
+    request_headers: Headers
+    response_headers: dict[str, str] = field(default_factory=dict)
+    timings: dict[str, float] = field(default_factory=dict)
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def add_timing(self, name: str, seconds: float) -> None:
+        with self._lock:
+            self.timings[name] = self.timings.get(name, 0.0) + seconds
+
+    def server_timing(self) -> str:
+        with self._lock:
+            return ", ".join(f"{name};dur={seconds * 1000:.1f}" for name, seconds in self.timings.items())
+
+
+_current: ContextVar[RequestScope | None] = ContextVar("request_scope", default=None)
+
+
+def current() -> RequestScope | None:
+    return _current.get()
+
+
+def set_response_header(name: str, value: str) -> None:
+    request_scope = _current.get()
+    if request_scope is not None:
+        request_scope.response_headers[name] = value
+
+
+class RequestScopeMiddleware:
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        request_scope = RequestScope(request_headers=Headers(scope=scope))
+        token = _current.set(request_scope)
+
+        async def send_with_headers(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                headers = MutableHeaders(scope=message)
+                for name, value in request_scope.response_headers.items():
+                    headers[name] = value
+                request_scope.add_timing("total", time.perf_counter() - started)
+                headers["Server-Timing"] = request_scope.server_timing()
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_headers)
+        finally:
+            _current.reset(token)
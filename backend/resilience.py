@@ -0,0 +1,256 @@
+import os
+import threading
+import time
+from collections.abc import Iterator
+from contextlib import AbstractContextManager, contextmanager
+from typing import Any, Callable, TypeVar
+
+
+T = TypeVar("T")
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class UpstreamUnavailableError(RuntimeError):
+    def __init__(self, upstream: str, reason: str, retry_after: float | None = None):
+        if retry_after is not None:
+            reason = f"{reason}, retry in {max(retry_after, 0.0):.0f}s"
+        super().__init__(f"{upstream} temporarily unavailable ({reason})")
+        self.upstream = upstream
+        self.retry_after = retry_after
+
+
+class TokenBucket:
+    def __init__(self, rate_per_second: float, burst: int, clock: Callable[[], float] = time.monotonic):
+        self.rate_per_second = rate_per_second
+        self.burst = burst
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._tokens = float(burst)
+        self._updated_at = clock()
+
+    def try_acquire(self) -> float:
+        """Take a token, returning 0 on success or the seconds until one is available."""
+        with self._lock:
+            now = self._clock()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated_at) * self.rate_per_second)
+            self._updated_at = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return 0.0
+            return (1 - self._tokens) / self.rate_per_second
+
+
+class CircuitBreaker:
+    def __init__(
+        self,
+        failure_threshold: int,
+        reset_seconds: float,
+        half_open_probes: int = 1,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.half_open_probes = half_open_probes
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probes = 0
+        self._opened = 0
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._current_state()
+
+    def allow(self) -> bool:
+        with self._lock:
+            state = self._current_state()
+            if state == CLOSED:
+                return True
+            if state == HALF_OPEN and self._probes < self.half_open_probes:
+                self._state = HALF_OPEN
+                self._probes += 1
+                return True
+            return False
+
+    def retry_after(self) -> float:
+        with self._lock:
+            return max(self._opened_at + self.reset_seconds - self._clock(), 0.0)
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._state = CLOSED
+            self._failures = 0
+            self._probes = 0
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            if self._state == HALF_OPEN or self._failures >= self.failure_threshold:
+                self._trip()
+
+    def release(self) -> None:
+        with self._lock:
+            self._probes = max(self._probes - 1, 0)
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "state": self._current_state(),
+                "consecutiveFailures": self._failures,
+                "failureThreshold": self.failure_threshold,
+                "resetSeconds": self.reset_seconds,
+                "timesOpened": self._opened,
+            }
+
+    def _current_state(self) -> str:
+        if self._state == OPEN and self._clock() - self._opened_at >= self.reset_seconds:
+            return HALF_OPEN
+        return self._state
+
+    def _trip(self) -> None:
+        self._state = OPEN
+        self._opened_at = self._clock()
+        self._probes = 0
+        self._opened += 1
+
+
+class Upstream:
+    """Rate limit and circuit-break calls to one upstream.
+
+    Calls slower than ``slow_call_seconds`` count as failures, so an upstream
+    that hangs trips the breaker as surely as one that errors.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        limiter: TokenBucket,
+        breaker: CircuitBreaker,
+        slow_call_seconds: float,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.name = name
+        self.limiter = limiter
+        self.breaker = breaker
+        self.slow_call_seconds = slow_call_seconds
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._calls = 0
+        self._failures = 0
+        self._slow_calls = 0
+        self._rejected = {"circuitOpen": 0, "rateLimited": 0}
+
+    @contextmanager
+    def guard(self) -> Iterator[None]:
+        with self.admission() as timed, timed():
+            yield
+
+    @contextmanager
+    def admission(self) -> Iterator[Callable[[], AbstractContextManager[None]]]:
+        """Admit a call now and time it later with the yielded context manager.
+
+        Lets a caller fail fast before queueing for a connection slot, without
+        counting the wait as call time. Leaving before the call starts gives
+        back the half-open probe slot.
+        """
+        self._admit()
+        started = False
+
+        @contextmanager
+        def timed() -> Iterator[None]:
+            nonlocal started
+            started = True
+            with self._timed():
+                yield
+
+        try:
+            yield timed
+        finally:
+            if not started:
+                self.breaker.release()
+
+    def call(self, fn: Callable[..., T], *args: Any) -> T:
+        with self.guard():
+            return fn(*args)
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            counters = {
+                "calls": self._calls,
+                "failures": self._failures,
+                "slowCalls": self._slow_calls,
+                "rejected": dict(self._rejected),
+            }
+        return {
+            **counters,
+            "breaker": self.breaker.stats(),
+            "ratePerSecond": self.limiter.rate_per_second,
+            "burst": self.limiter.burst,
+        }
+
+    @contextmanager
+    def _timed(self) -> Iterator[None]:
+        started = self._clock()
+        try:
+            yield
+        except Exception:
+            self._record(failed=True, slow=False)
+            raise
+        except BaseException:
+            self.breaker.release()
+            raise
+        slow = self._clock() - started > self.slow_call_seconds
+        self._record(failed=slow, slow=slow)
+
+    def _admit(self) -> None:
+        if not self.breaker.allow():
+            self._reject("circuitOpen")
+            raise UpstreamUnavailableError(self.name, "circuit open", self.breaker.retry_after())
+        retry_after = self.limiter.try_acquire()
+        if retry_after:
+            self.breaker.release()
+            self._reject("rateLimited")
+            raise UpstreamUnavailableError(self.name, "rate limited", retry_after)
+
+    def _reject(self, reason: str) -> None:
+        with self._lock:
+            self._rejected[reason] += 1
+
+    def _record(self, failed: bool, slow: bool) -> None:
+        with self._lock:
+            self._calls += 1
+            self._failures += failed
+            self._slow_calls += slow
+        if failed:
+            self.breaker.record_failure()
+        else:
+            self.breaker.record_success()
+
+
+def _from_env(name: str, prefix: str, rate: float, burst: int, slow_call_seconds: float) -> Upstream:
+    return Upstream(
+        name,
+        TokenBucket(
+            rate_per_second=float(os.getenv(f"{prefix}_RATE_PER_SECOND", str(rate))),
+            burst=int(os.getenv(f"{prefix}_RATE_BURST", str(burst))),
+        ),
+        CircuitBreaker(
+            failure_threshold=int(os.getenv(f"{prefix}_BREAKER_FAILURES", "5")),
+            reset_seconds=float(os.getenv(f"{prefix}_BREAKER_RESET_SECONDS", "30")),
+        ),
+        slow_call_seconds=float(os.getenv(f"{prefix}_SLOW_CALL_SECONDS", str(slow_call_seconds))),
+    )
+
+
+reddit = _from_env("Reddit", "REDDIT", rate=1.5, burst=10, slow_call_seconds=15.0)
+defeatbeta = _from_env("Defeat Beta", "DEFEATBETA", rate=4.0, burst=16, slow_call_seconds=20.0)
+
+
+def stats() -> dict[str, Any]:
+    return {"reddit": reddit.stats(), "defeatbeta": defeatbeta.stats()}
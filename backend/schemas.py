@@ -17,6 +17,17 @@ class StockHistoryPoint(BaseModel):
     volume: int | None = None
 
 
+class StockHistoryColumns(BaseModel):
+    date: list[str] | None = None
+    dateStart: str | None = None
+    dateDeltas: list[int] | None = None
+    open: list[float | None] = Field(default_factory=list)
+    high: list[float | None] = Field(default_factory=list)
+    low: list[float | None] = Field(default_factory=list)
+    close: list[float | None] = Field(default_factory=list)
+    volume: list[int | None] = Field(default_factory=list)
+
+
 class StockSummary(BaseModel):
     symbol: str
     name: str | None = None
@@ -34,6 +45,7 @@ class StockSummary(BaseModel):
     peRatio: float | None = None
     beta: float | None = None
     history: list[StockHistoryPoint] = Field(default_factory=list)
+    historyColumns: StockHistoryColumns | None = None
 
 
 class RedditPost(BaseModel):
@@ -66,6 +78,17 @@ class SentimentTimeseriesPoint(BaseModel):
     post_count: int
 
 
+class RollingCorrelationPoint(BaseModel):
+    date: str
+    correlation: float | None = None
+
+
+class LaggedCorrelation(BaseModel):
+    lagDays: int
+    correlation: float | None = None
+    observations: int = 0
+
+
 class AnalysisMetrics(BaseModel):
     averageSentiment: float | None = None
     priceChange: float | None = None
@@ -75,6 +98,16 @@ class AnalysisMetrics(BaseModel):
     alignmentLabel: str = "Not enough data yet"
     inverseSignal: str = "unknown"
     correlation: float | None = None
+    rollingWindow: int | None = None
+    rollingCorrelation: list[RollingCorrelationPoint] = Field(default_factory=list)
+    laggedCorrelations: list[LaggedCorrelation] = Field(default_factory=list)
+    strongestLeadDays: int | None = None
+
+
+class SourceFreshness(BaseModel):
+    fetchedAt: str
+    freshUntil: str
+    stale: bool
 
 
 class AnalysisResponse(BaseModel):
@@ -85,5 +118,20 @@ class AnalysisResponse(BaseModel):
     posts: list[RedditPost] = Field(default_factory=list)
     metrics: AnalysisMetrics
     generatedAt: str
+    freshness: dict[str, SourceFreshness] = Field(default_factory=dict)
+    sources: list[str] = Field(default_factory=list)
+    partialErrors: list[str] = Field(default_factory=list)
+
+
+class AnalysisStreamSummary(BaseModel):
+    ticker: str
+    generatedAt: str
+    freshness: dict[str, SourceFreshness] = Field(default_factory=dict)
     sources: list[str] = Field(default_factory=list)
     partialErrors: list[str] = Field(default_factory=list)
+
+
+class BatchAnalysisResponse(BaseModel):
+    results: list[AnalysisResponse] = Field(default_factory=list)
+    errors: dict[str, str] = Field(default_factory=dict)
+    generatedAt: str
@@ -0,0 +1,153 @@
+import asyncio
+import hashlib
+import multiprocessing
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any
+
+from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
+
+
+SCORE_CACHE_ENTRIES = int(os.getenv("SENTIMENT_SCORE_CACHE_ENTRIES", "50000"))
+PROCESS_BATCH_SIZE = int(os.getenv("SENTIMENT_PROCESS_BATCH_SIZE", "256"))
+PROCESS_CHUNK_SIZE = int(os.getenv("SENTIMENT_PROCESS_CHUNK_SIZE", "128"))
+MAX_PROCESSES = int(os.getenv("SENTIMENT_MAX_PROCESSES", str(max(1, min(4, (os.cpu_count() or 2) - 1)))))
+
+_analyzer: SentimentIntensityAnalyzer | None = None
+
+
+def _get_analyzer() -> SentimentIntensityAnalyzer:
+    global _analyzer
+    if _analyzer is None:
+        _analyzer = SentimentIntensityAnalyzer()
+    return _analyzer
+
+
+def score_texts(texts: list[str]) -> list[float]:
+    analyzer = _get_analyzer()
+    return [float(analyzer.polarity_scores(text)["compound"]) for text in texts]
+
+
+def content_key(post_id: str, text: str) -> str:
+    digest = hashlib.blake2b(text.encode("utf-8"), digest_size=12).hexdigest()
+    return f"{post_id}:{digest}"
+
+
+class SentimentScorer:
+    def __init__(
+        self,
+        max_cache_entries: int = SCORE_CACHE_ENTRIES,
+        process_batch_size: int = PROCESS_BATCH_SIZE,
+        chunk_size: int = PROCESS_CHUNK_SIZE,
+        max_processes: int = MAX_PROCESSES,
+    ):
+        self.max_cache_entries = max_cache_entries
+        self.process_batch_size = process_batch_size
+        self.chunk_size = chunk_size
+        self.max_processes = max_processes
+        self._scores: OrderedDict[str, float] = OrderedDict()
+        self._lock = threading.Lock()
+        self._pool: ProcessPoolExecutor | None = None
+        self._hits = 0
+        self._misses = 0
+        self._scored = 0
+        self._scoring_seconds = 0.0
+        self._process_batches = 0
+
+    def score(self, post_id: str, text: str) -> float:
+        key = content_key(post_id, text)
+        cached = self._lookup(key)
+        if cached is not None:
+            return cached
+        started = time.perf_counter()
+        score = score_texts([text])[0]
+        self._record([key], [score], time.perf_counter() - started)
+        return score
+
+    async def score_many(self, items: list[tuple[str, str]]) -> list[float]:
+        keys = [content_key(post_id, text) for post_id, text in items]
+        scores: list[float | None] = [self._lookup(key) for key in keys]
+        pending = [index for index, score in enumerate(scores) if score is None]
+        if not pending:
+            return scores
+
+        texts = [items[index][1] for index in pending]
+        started = time.perf_counter()
+        fresh_scores = await self._score_off_loop(texts)
+        self._record([keys[index] for index in pending], fresh_scores, time.perf_counter() - started)
+        for index, score in zip(pending, fresh_scores):
+            scores[index] = score
+        return scores
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "cachedScores": len(self._scores),
+                "hits": self._hits,
+                "misses": self._misses,
+                "hitRatio": round(self._hits / lookups, 4) if lookups else None,
+                "scored": self._scored,
+                "processBatches": self._process_batches,
+                "postsPerSecond": round(self._scored / self._scoring_seconds, 1) if self._scoring_seconds else None,
+            }
+
+    def clear(self) -> None:
+        with self._lock:
+            self._scores.clear()
+
+    def shutdown(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    async def _score_off_loop(self, texts: list[str]) -> list[float]:
+        loop = asyncio.get_running_loop()
+        if len(texts) < self.process_batch_size or self.max_processes < 1:
+            return await loop.run_in_executor(None, score_texts, texts)
+
+        chunks = [texts[start:start + self.chunk_size] for start in range(0, len(texts), self.chunk_size)]
+        try:
+            pool = self._get_pool()
+            results = await asyncio.gather(*(loop.run_in_executor(pool, score_texts, chunk) for chunk in chunks))
+        except BrokenProcessPool:
+            self.shutdown()
+            return await loop.run_in_executor(None, score_texts, texts)
+        with self._lock:
+            self._process_batches += 1
+        return [score for chunk_scores in results for score in chunk_scores]
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.max_processes,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return self._pool
+
+    def _lookup(self, key: str) -> float | None:
+        with self._lock:
+            score = self._scores.get(key)
+            if score is None:
+                self._misses += 1
+                return None
+            self._scores.move_to_end(key)
+            self._hits += 1
+            return score
+
+    def _record(self, keys: list[str], scores: list[float], elapsed: float) -> None:
+        with self._lock:
+            for key, score in zip(keys, scores):
+                self._scores[key] = score
+                self._scores.move_to_end(key)
+            while len(self._scores) > self.max_cache_entries:
+                self._scores.popitem(last=False)
+            self._scored += len(scores)
+            self._scoring_seconds += elapsed
+
+
+scorer = SentimentScorer()
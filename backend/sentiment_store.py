@@ -0,0 +1,187 @@
+import os
+import sqlite3
+import threading
+import time
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import date, datetime, timezone
+from typing import Any
+
+from schemas import SentimentLabel
+
+
+SENTIMENT_STORE_PATH = os.getenv(
+    "SENTIMENT_STORE_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "sentiment.sqlite3"),
+)
+_ID_CHUNK_SIZE = 500
+
+
+@dataclass
+class DailySentiment:
+    day: str
+    score_sum: float
+    post_count: int
+    positive: int
+    neutral: int
+    negative: int
+
+    @property
+    def average(self) -> float:
+        return self.score_sum / self.post_count if self.post_count else 0.0
+
+
+class SentimentStore:
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        self._write_lock = threading.Lock()
+
+    def record_posts(self, ticker: str, posts: list[dict[str, Any]]) -> int:
+        normalized_ticker = ticker.upper().strip()
+        candidates = {str(post["id"]): post for post in posts if post.get("id")}
+        if not candidates:
+            return 0
+
+        connection = self._connect()
+        with self._write_lock, connection:
+            known = self._known_ids(connection, normalized_ticker, list(candidates))
+            fresh = [(post_id, post) for post_id, post in candidates.items() if post_id not in known]
+            if not fresh:
+                return 0
+
+            days: dict[str, list[float]] = defaultdict(lambda: [0.0, 0, 0, 0, 0])
+            for _post_id, post in fresh:
+                aggregate = days[_post_day(post["date"])]
+                aggregate[0] += float(post["score"])
+                aggregate[1] += 1
+                aggregate[2 + _LABEL_COLUMNS[_post_label(post)]] += 1
+
+            connection.executemany(
+                "INSERT INTO sentiment_posts (ticker, post_id, day) VALUES (?, ?, ?)",
+                [(normalized_ticker, post_id, _post_day(post["date"])) for post_id, post in fresh],
+            )
+            connection.executemany(
+                """
+                INSERT INTO sentiment_daily (ticker, day, score_sum, post_count, positive, neutral, negative)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (ticker, day) DO UPDATE SET
+                    score_sum = score_sum + excluded.score_sum,
+                    post_count = post_count + excluded.post_count,
+                    positive = positive + excluded.positive,
+                    neutral = neutral + excluded.neutral,
+                    negative = negative + excluded.negative
+                """,
+                [(normalized_ticker, day, *aggregate) for day, aggregate in days.items()],
+            )
+            connection.execute(
+                "INSERT INTO sentiment_watermarks (ticker, version) VALUES (?, ?) "
+                "ON CONFLICT (ticker) DO UPDATE SET version = max(version + 1, excluded.version)",
+                (normalized_ticker, time.time_ns()),
+            )
+        return len(fresh)
+
+    def watermark(self, ticker: str) -> int:
+        """Version that changes whenever posts are recorded for the ticker, by any process."""
+        row = self._connect().execute(
+            "SELECT version FROM sentiment_watermarks WHERE ticker = ?",
+            (ticker.upper().strip(),),
+        ).fetchone()
+        return row[0] if row else 0
+
+    def daily_range(self, ticker: str, start: date, end: date) -> list[DailySentiment]:
+        rows = self._connect().execute(
+            "SELECT day, score_sum, post_count, positive, neutral, negative FROM sentiment_daily "
+            "WHERE ticker = ? AND day BETWEEN ? AND ? ORDER BY day",
+            (ticker.upper().strip(), start.isoformat(), end.isoformat()),
+        ).fetchall()
+        return [DailySentiment(*row) for row in rows]
+
+    def clear(self) -> None:
+        connection = self._connect()
+        with self._write_lock, connection:
+            connection.execute("DELETE FROM sentiment_posts")
+            connection.execute("DELETE FROM sentiment_daily")
+            connection.execute("DELETE FROM sentiment_watermarks")
+
+    def _known_ids(self, connection: sqlite3.Connection, ticker: str, post_ids: list[str]) -> set[str]:
+        known: set[str] = set()
+        for start in range(0, len(post_ids), _ID_CHUNK_SIZE):
+            chunk = post_ids[start:start + _ID_CHUNK_SIZE]
+            placeholders = ",".join("?" * len(chunk))
+            known.update(
+                row[0]
+                for row in connection.execute(
+                    f"SELECT post_id FROM sentiment_posts WHERE ticker = ? AND post_id IN ({placeholders})",
+                    (ticker, *chunk),
+                )
+            )
+        return known
+
+    def _connect(self) -> sqlite3.Connection:
+        connection = getattr(self._local, "connection", None)
+        if connection is not None:
+            return connection
+
+        if self.path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        connection = sqlite3.connect(self.path, timeout=30)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        with connection:
+            connection.execute(
+                """
+                CREATE TABLE IF NOT EXISTS sentiment_posts (
+                    ticker TEXT NOT NULL,
+                    post_id TEXT NOT NULL,
+                    day TEXT NOT NULL,
+                    PRIMARY KEY (ticker, post_id)
+                )
+                """
+            )
+            connection.execute(
+                """
+                CREATE TABLE IF NOT EXISTS sentiment_daily (
+                    ticker TEXT NOT NULL,
+                    day TEXT NOT NULL,
+                    score_sum REAL NOT NULL,
+                    post_count INTEGER NOT NULL,
+                    positive INTEGER NOT NULL,
+                    neutral INTEGER NOT NULL,
+                    negative INTEGER NOT NULL,
+                    PRIMARY KEY (ticker, day)
+                )
+                """
+            )
+            connection.execute(
+                """
+                CREATE TABLE IF NOT EXISTS sentiment_watermarks (
+                    ticker TEXT PRIMARY KEY,
+                    version INTEGER NOT NULL
+                )
+                """
+            )
+        self._local.connection = connection
+        return connection
+
+
+_LABEL_COLUMNS: dict[SentimentLabel, int] = {"positive": 0, "neutral": 1, "negative": 2}
+
+
+def _post_day(timestamp: float) -> str:
+    return datetime.fromtimestamp(float(timestamp), tz=timezone.utc).date().isoformat()
+
+
+def _post_label(post: dict[str, Any]) -> SentimentLabel:
+    label = post.get("sentiment")
+    if label in _LABEL_COLUMNS:
+        return label
+    score = float(post["score"])
+    if score >= 0.05:
+        return "positive"
+    if score <= -0.05:
+        return "negative"
+    return "neutral"
+
+
+store = SentimentStore(SENTIMENT_STORE_PATH)
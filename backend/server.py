@@ -1,22 +1,53 @@
 import re
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta, timezone
 
 import uvicorn
 from fastapi import FastAPI, HTTPException, Query
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse, Response, StreamingResponse
 
 import analysis_service
 import fetch_reddit_data
 import fetch_stock_data
-from schemas import AnalysisResponse
+import http_cache
+import instrumentation
+import prefetch
+import provider_executor
+import request_scope
+import resilience
+import sentiment_scoring
+from schemas import AnalysisResponse, BatchAnalysisResponse
 
 TICKER_PATTERN = r"^[A-Za-z][A-Za-z0-9.\-]{0,9}$"
 PERIOD_PATTERN = r"^(5d|1mo|3mo|6mo|1y|2y|5y|all)$"
+STREAM_FORMAT_PATTERN = r"^(ndjson|sse)$"
+HISTORY_FORMAT_PATTERN = r"^(rows|columnar|columnar-delta)$"
+STREAM_MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "sse": "text/event-stream",
+}
 TICKER_ERROR = "Ticker must be 1-10 letters, numbers, dots, or dashes."
 
+
+@asynccontextmanager
+async def lifespan(_app: FastAPI):
+    await fetch_reddit_data.reddit_pool.start()
+    if prefetch.PREFETCH_ENABLED:
+        prefetch.scheduler.start()
+    try:
+        yield
+    finally:
+        await prefetch.scheduler.stop()
+        await fetch_reddit_data.reddit_pool.close()
+        sentiment_scoring.scorer.shutdown()
+
+
 app = FastAPI(
     title="StockSentiment API",
     description="Compare Reddit sentiment with actual stock price movement.",
     version="1.0.0",
+    lifespan=lifespan,
 )
 
 app.add_middleware(
@@ -30,6 +61,8 @@ app.add_middleware(
     allow_methods=["GET", "OPTIONS"],
     allow_headers=["*"],
 )
+app.add_middleware(request_scope.RequestScopeMiddleware)
+app.add_middleware(instrumentation.MetricsMiddleware)
 
 
 def validate_ticker(ticker: str) -> str:
@@ -39,6 +72,30 @@ def validate_ticker(ticker: str) -> str:
     return normalized
 
 
+def _stock_validator(ticker: str, period: str, history_format: str) -> str | None:
+    entry = fetch_stock_data.get_freshness(ticker)
+    if entry is None:
+        return None
+    return f"stock:{ticker}:{period}:{history_format}:{entry.version}{'s' if entry.is_stale() else ''}"
+
+
+def _stock_cache_control(ticker: str) -> str:
+    return http_cache.cache_control(fetch_stock_data.get_freshness(ticker))
+
+
+def _seconds_until_next_utc_day() -> float:
+    now = datetime.now(timezone.utc)
+    return (datetime.combine(now.date() + timedelta(days=1), datetime.min.time(), timezone.utc) - now).total_seconds()
+
+
+def _analysis_cache_control(ticker: str) -> str:
+    return http_cache.cache_control(
+        fetch_stock_data.get_freshness(ticker),
+        fetch_reddit_data.get_freshness(ticker),
+        max_seconds=_seconds_until_next_utc_day(),
+    )
+
+
 @app.get("/")
 def read_root():
     return {"message": "Welcome to the Stock Sentiment API"}
@@ -49,16 +106,62 @@ def health():
     return {"status": "ok"}
 
 
+@app.get("/api/cache/stats")
+def cache_stats():
+    return {
+        **fetch_stock_data.cache_stats(),
+        **fetch_reddit_data.cache_stats(),
+        **analysis_service.cache_stats(),
+    }
+
+
+@app.get("/api/executor/stats")
+def executor_stats():
+    return {
+        "provider": provider_executor.executor.stats(),
+        "sentiment": sentiment_scoring.scorer.stats(),
+        "reddit": fetch_reddit_data.client_stats(),
+        "prefetch": prefetch.scheduler.stats(),
+        "upstreams": resilience.stats(),
+    }
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    return PlainTextResponse(
+        instrumentation.registry.render()
+        + instrumentation.render_cache_stats({**cache_stats(), "sentiment_scores": sentiment_scoring.scorer.stats()})
+        + instrumentation.render_upstream_stats(resilience.stats()),
+        media_type="text/plain; version=0.0.4",
+    )
+
+
 @app.get("/api/stock/{ticker}")
 async def get_stock_data(
     ticker: str,
     period: str = Query("1mo", pattern=PERIOD_PATTERN),
+    historyFormat: str = Query("rows", pattern=HISTORY_FORMAT_PATTERN),
 ):
     normalized_ticker = validate_ticker(ticker)
+    prefetch.scheduler.record(normalized_ticker, period)
+    validator = _stock_validator(normalized_ticker, period, historyFormat)
+    if http_cache.not_modified(validator, _stock_cache_control(normalized_ticker)):
+        return Response(status_code=304)
     try:
-        return fetch_stock_data.get_stock_data(normalized_ticker, period=period)
+        stock_data = await fetch_stock_data.get_stock_data_async(normalized_ticker, period)
     except Exception as exc:
         raise HTTPException(status_code=503, detail=str(exc)) from exc
+    http_cache.attach_validators(
+        http_cache.settled_validator(validator, _stock_validator(normalized_ticker, period, historyFormat)),
+        _stock_cache_control(normalized_ticker),
+    )
+    if stock_data and historyFormat != "rows":
+        columns = analysis_service.history_columns(
+            stock_data.get("history", []),
+            delta_dates=historyFormat == "columnar-delta",
+        )
+        stock_data = {**stock_data, "history": [], "historyColumns": columns}
+    return stock_data
 
 
 @app.get("/api/reddit/{ticker}")
@@ -67,6 +170,7 @@ async def get_reddit_data(
     limit: int = Query(30, ge=1, le=100),
 ):
     normalized_ticker = validate_ticker(ticker)
+    prefetch.scheduler.record(normalized_ticker)
     try:
         return await fetch_reddit_data.get_reddit_data(normalized_ticker, limit=limit)
     except Exception as exc:
@@ -94,15 +198,82 @@ async def get_sentiment_timeseries(
         raise HTTPException(status_code=503, detail=str(exc)) from exc
 
 
+@app.get("/api/analysis/batch", response_model=BatchAnalysisResponse)
+async def get_batch_analysis(
+    tickers: str = Query(..., min_length=1),
+    period: str = Query("1mo", pattern=PERIOD_PATTERN),
+    days: int = Query(30, ge=1, le=3650),
+    limit: int = Query(30, ge=1, le=100),
+    historyFormat: str = Query("rows", pattern=HISTORY_FORMAT_PATTERN),
+):
+    requested = [ticker for ticker in (item.upper().strip() for item in tickers.split(",")) if ticker]
+    if not requested or len(set(requested)) > analysis_service.BATCH_MAX_TICKERS:
+        raise HTTPException(
+            status_code=422,
+            detail=f"Provide between 1 and {analysis_service.BATCH_MAX_TICKERS} comma-separated tickers.",
+        )
+
+    valid = [ticker for ticker in requested if re.fullmatch(TICKER_PATTERN, ticker)]
+    for ticker in valid:
+        prefetch.scheduler.record(ticker, period)
+    response = await analysis_service.get_batch_analysis(
+        valid, period=period, days=days, limit=limit, history_format=historyFormat
+    )
+    for ticker in requested:
+        if ticker not in valid:
+            response.errors[ticker] = TICKER_ERROR
+    return response
+
+
 @app.get("/api/analysis/{ticker}", response_model=AnalysisResponse)
 async def get_analysis(
     ticker: str,
     period: str = Query("1mo", pattern=PERIOD_PATTERN),
     days: int = Query(30, ge=1, le=3650),
     limit: int = Query(30, ge=1, le=100),
+    historyFormat: str = Query("rows", pattern=HISTORY_FORMAT_PATTERN),
 ):
     normalized_ticker = validate_ticker(ticker)
-    return await analysis_service.get_analysis(normalized_ticker, period=period, days=days, limit=limit)
+    prefetch.scheduler.record(normalized_ticker, period)
+    validator = analysis_service.response_cache_key(normalized_ticker, period, days, limit, historyFormat)
+    if http_cache.not_modified(validator, _analysis_cache_control(normalized_ticker)):
+        return Response(status_code=304)
+    body, validator = await analysis_service.get_analysis_json(
+        normalized_ticker, period=period, days=days, limit=limit, history_format=historyFormat
+    )
+    http_cache.attach_validators(validator, _analysis_cache_control(normalized_ticker))
+    return Response(content=body, media_type="application/json")
+
+
+@app.get("/api/analysis/{ticker}/stream")
+async def stream_analysis(
+    ticker: str,
+    period: str = Query("1mo", pattern=PERIOD_PATTERN),
+    days: int = Query(30, ge=1, le=3650),
+    limit: int = Query(30, ge=1, le=100),
+    format: str = Query("ndjson", pattern=STREAM_FORMAT_PATTERN),
+    historyFormat: str = Query("rows", pattern=HISTORY_FORMAT_PATTERN),
+):
+    normalized_ticker = validate_ticker(ticker)
+    prefetch.scheduler.record(normalized_ticker, period)
+    cache_key, cached_body = analysis_service.cached_response(normalized_ticker, period, days, limit, historyFormat)
+    validator = f"{cache_key}:{format}" if cache_key is not None else None
+    if http_cache.not_modified(validator, _analysis_cache_control(normalized_ticker)):
+        return Response(status_code=304)
+    http_cache.attach_validators(validator, _analysis_cache_control(normalized_ticker))
+    return StreamingResponse(
+        analysis_service.stream_analysis(
+            normalized_ticker,
+            period=period,
+            days=days,
+            limit=limit,
+            stream_format=format,
+            history_format=historyFormat,
+            cached_body=cached_body,
+        ),
+        media_type=STREAM_MEDIA_TYPES[format],
+        headers={"X-Accel-Buffering": "no"},
+    )
 
 
 if __name__ == "__main__":
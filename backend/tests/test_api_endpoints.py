@@ -1,22 +1,68 @@
+import asyncio
+import json
+import threading
+
 import pytest
 from fastapi import HTTPException
 
 import server
+from cache import CacheEntry
+from sentiment_store import SentimentStore
 from schemas import (
     AnalysisMetrics,
     AnalysisResponse,
+    BatchAnalysisResponse,
     SentimentSummary,
     StockSummary,
 )
 
 
+async def _asgi_get(path, query="", headers=None):
+    messages = []
+    requested = []
+
+    async def receive():
+        if requested:
+            await asyncio.Event().wait()
+        requested.append(True)
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        messages.append(message)
+
+    await server.app(
+        {
+            "type": "http",
+            "asgi": {"version": "3.0"},
+            "http_version": "1.1",
+            "method": "GET",
+            "scheme": "http",
+            "path": path,
+            "raw_path": path.encode(),
+            "query_string": query.encode(),
+            "headers": [(name.lower().encode(), value.encode()) for name, value in (headers or {}).items()],
+            "client": ("127.0.0.1", 1234),
+            "server": ("testserver", 80),
+        },
+        receive,
+        send,
+    )
+    start = next(message for message in messages if message["type"] == "http.response.start")
+    body = b"".join(message.get("body", b"") for message in messages if message["type"] == "http.response.body")
+    return start["status"], {name.decode(): value.decode() for name, value in start["headers"]}, body
+
+
+def _stream_events(body):
+    return {event["event"]: event["data"] for event in map(json.loads, body.splitlines())}
+
+
 def test_health_endpoint():
     assert server.health() == {"status": "ok"}
 
 
 @pytest.mark.asyncio
 async def test_analysis_endpoint_returns_normalized_contract(monkeypatch):
-    async def fake_analysis(ticker, period, days, limit):
+    async def fake_analysis(ticker, period, days, limit, history_format="rows"):
         assert ticker == "NVDA"
         assert period == "1mo"
         assert days == 30
@@ -45,9 +91,9 @@ async def test_analysis_endpoint_returns_normalized_contract(monkeypatch):
 
     monkeypatch.setattr(server.analysis_service, "get_analysis", fake_analysis)
 
-    response = await server.get_analysis("nvda", period="1mo", days=30, limit=30)
+    response = await server.get_analysis("nvda", period="1mo", days=30, limit=30, historyFormat="rows")
 
-    data = response.model_dump()
+    data = json.loads(response.body)
     assert data["ticker"] == "NVDA"
     assert data["sentiment"]["label"] == "negative"
     assert data["metrics"]["alignment"] == "inverse"
@@ -97,7 +143,298 @@ async def test_legacy_reddit_endpoint_uses_mocked_provider(monkeypatch):
     assert response[0]["sentiment"] == "neutral"
 
 
+@pytest.mark.asyncio
+async def test_stock_endpoint_runs_provider_off_the_event_loop(monkeypatch):
+    def fake_stock(ticker, period):
+        return {"symbol": ticker, "period": period, "thread": threading.current_thread().name}
+
+    monkeypatch.setattr(server.fetch_stock_data, "get_stock_data", fake_stock)
+
+    response = await server.get_stock_data("aapl", period="1y", historyFormat="rows")
+
+    assert response["symbol"] == "AAPL"
+    assert response["period"] == "1y"
+    assert response["thread"].startswith("provider")
+
+
 def test_app_exposes_analysis_route():
     paths = {route.path for route in server.app.routes}
 
     assert "/api/analysis/{ticker}" in paths
+
+
+def test_batch_route_is_matched_before_single_ticker_route():
+    paths = [route.path for route in server.app.routes]
+
+    assert paths.index("/api/analysis/batch") < paths.index("/api/analysis/{ticker}")
+
+
+@pytest.mark.asyncio
+async def test_batch_endpoint_reports_invalid_tickers_per_symbol(monkeypatch):
+    async def fake_batch(tickers, period, days, limit, history_format="rows"):
+        assert tickers == ["AAPL", "MSFT"]
+        return BatchAnalysisResponse(results=[], errors={}, generatedAt="2026-06-15T00:00:00Z")
+
+    monkeypatch.setattr(server.analysis_service, "get_batch_analysis", fake_batch)
+
+    response = await server.get_batch_analysis("aapl, msft,123BAD", period="1mo", days=30, limit=30, historyFormat="rows")
+
+    assert response.errors == {"123BAD": server.TICKER_ERROR}
+
+
+@pytest.mark.asyncio
+async def test_batch_endpoint_rejects_oversized_watchlists():
+    tickers = ",".join(f"T{index}" for index in range(server.analysis_service.BATCH_MAX_TICKERS + 1))
+
+    with pytest.raises(HTTPException) as exc:
+        await server.get_batch_analysis(tickers, period="1mo", days=30, limit=30)
+
+    assert exc.value.status_code == 422
+
+
+def test_cache_stats_endpoint_reports_each_cache():
+    stats = server.cache_stats()
+
+    assert set(stats) == {"stock", "frames", "reddit", "analysis"}
+    assert {"hits", "misses", "evictions", "entries", "bytes"} <= set(stats["stock"])
+
+
+def test_executor_stats_endpoint_reports_queue_depth():
+    stats = server.executor_stats()["provider"]
+
+    assert {"active", "queued", "rejected", "maxWorkers", "maxQueue"} <= set(stats)
+    assert set(server.executor_stats()["upstreams"]) == {"reddit", "defeatbeta"}
+
+
+@pytest.mark.asyncio
+async def test_stock_endpoint_answers_conditional_requests_with_304(monkeypatch):
+    entry = CacheEntry(value={}, expires_at=4102444800.0, fresh_until=4102444800.0, version=3)
+    calls = []
+
+    def fake_stock(ticker, period):
+        calls.append(ticker)
+        return {"symbol": ticker}
+
+    monkeypatch.setattr(server.fetch_stock_data, "get_freshness", lambda _ticker: entry)
+    monkeypatch.setattr(server.fetch_stock_data, "get_stock_data", fake_stock)
+
+    status, headers, body = await _asgi_get("/api/stock/aapl", "period=1y")
+    assert status == 200
+    assert json.loads(body) == {"symbol": "AAPL"}
+    assert headers["cache-control"].startswith("public, max-age=")
+
+    status, revalidated, body = await _asgi_get(
+        "/api/stock/aapl", "period=1y", {"If-None-Match": headers["etag"]}
+    )
+    assert status == 304
+    assert body == b""
+    assert revalidated["etag"] == headers["etag"]
+    assert calls == ["AAPL"]
+
+    status, other_period, _body = await _asgi_get("/api/stock/aapl", "period=5y", {"If-None-Match": headers["etag"]})
+    assert status == 200
+    assert other_period["etag"] != headers["etag"]
+
+
+@pytest.mark.asyncio
+async def test_stock_endpoint_reloads_once_the_frames_go_stale(monkeypatch):
+    entry = CacheEntry(value={}, expires_at=4102444800.0, fresh_until=4102444800.0, version=3)
+    calls = []
+
+    def fake_stock(ticker, period):
+        calls.append(ticker)
+        return {"symbol": ticker}
+
+    monkeypatch.setattr(server.fetch_stock_data, "get_freshness", lambda _ticker: entry)
+    monkeypatch.setattr(server.fetch_stock_data, "get_stock_data", fake_stock)
+
+    _status, headers, _body = await _asgi_get("/api/stock/aapl")
+    entry.fresh_until = 0
+    status, stale, _body = await _asgi_get("/api/stock/aapl", headers={"If-None-Match": headers["etag"]})
+
+    assert status == 200
+    assert stale["etag"] != headers["etag"]
+    assert calls == ["AAPL", "AAPL"]
+
+
+@pytest.mark.asyncio
+async def test_analysis_endpoint_revalidates_against_source_versions(monkeypatch):
+    server.analysis_service._response_cache.clear()
+    entries = {"version": 1}
+    calls = []
+
+    def freshness(_ticker):
+        return CacheEntry(value={}, expires_at=4102444800.0, fresh_until=4102444800.0, version=entries["version"])
+
+    async def fake_analysis(ticker, period, days, limit, history_format="rows"):
+        calls.append(ticker)
+        return AnalysisResponse(
+            ticker=ticker,
+            sentiment=SentimentSummary(label="neutral", displayLabel="Mixed", score=0.0, postCount=0),
+            metrics=AnalysisMetrics(),
+            generatedAt="2026-06-15T00:00:00Z",
+        )
+
+    monkeypatch.setattr(server.fetch_stock_data, "get_freshness", freshness)
+    monkeypatch.setattr(server.fetch_reddit_data, "get_freshness", freshness)
+    monkeypatch.setattr(server.analysis_service, "get_analysis", fake_analysis)
+
+    status, headers, _body = await _asgi_get("/api/analysis/msft")
+    assert status == 200
+    status, _headers, _body = await _asgi_get("/api/analysis/msft", headers={"If-None-Match": headers["etag"]})
+    assert status == 304
+    entries["version"] = 2
+    status, refreshed, _body = await _asgi_get("/api/analysis/msft", headers={"If-None-Match": headers["etag"]})
+    assert status == 200
+    assert refreshed["etag"] != headers["etag"]
+    assert calls == ["MSFT", "MSFT"]
+
+
+@pytest.mark.asyncio
+async def test_analysis_endpoint_revalidates_when_the_sentiment_store_changes(monkeypatch, tmp_path):
+    server.analysis_service._response_cache.clear()
+    store = SentimentStore(str(tmp_path / "sentiment.sqlite3"))
+    entry = CacheEntry(value={}, expires_at=4102444800.0, fresh_until=4102444800.0, version=1)
+    calls = []
+
+    async def fake_analysis(ticker, period, days, limit, history_format="rows"):
+        calls.append(ticker)
+        return AnalysisResponse(
+            ticker=ticker,
+            sentiment=SentimentSummary(label="neutral", displayLabel="Mixed", score=0.0, postCount=0),
+            metrics=AnalysisMetrics(),
+            generatedAt="2026-06-15T00:00:00Z",
+        )
+
+    monkeypatch.setattr(server.analysis_service.sentiment_store, "store", store)
+    monkeypatch.setattr(server.fetch_stock_data, "get_freshness", lambda _ticker: entry)
+    monkeypatch.setattr(server.fetch_reddit_data, "get_freshness", lambda _ticker: entry)
+    monkeypatch.setattr(server.analysis_service, "get_analysis", fake_analysis)
+
+    status, headers, _body = await _asgi_get("/api/analysis/msft")
+    assert status == 200
+    SentimentStore(store.path).record_posts("MSFT", [{"id": "late", "date": 0, "score": 0.4}])
+    status, refreshed, _body = await _asgi_get("/api/analysis/msft", headers={"If-None-Match": headers["etag"]})
+
+    assert status == 200
+    assert refreshed["etag"] != headers["etag"]
+    assert calls == ["MSFT", "MSFT"]
+
+
+@pytest.mark.asyncio
+async def test_stream_endpoint_replays_settled_responses_with_validators(monkeypatch, tmp_path):
+    server.analysis_service._response_cache.clear()
+    entry = CacheEntry(value={}, expires_at=4102444800.0, fresh_until=4102444800.0, version=2)
+    calls = []
+
+    def fake_stock(ticker, _period):
+        calls.append(ticker)
+        return {"info": {"symbol": ticker}, "history": [{"Date": "2026-06-15", "Close": 11.0}]}
+
+    async def no_posts(_ticker, limit=30):
+        return []
+
+    async def no_series(_ticker, days=30):
+        return []
+
+    monkeypatch.setattr(server.analysis_service.sentiment_store, "store", SentimentStore(str(tmp_path / "s.sqlite3")))
+    monkeypatch.setattr(server.fetch_stock_data, "get_freshness", lambda _ticker: entry)
+    monkeypatch.setattr(server.fetch_reddit_data, "get_freshness", lambda _ticker: entry)
+    monkeypatch.setattr(server.analysis_service.fetch_stock_data, "get_stock_data", fake_stock)
+    monkeypatch.setattr(server.analysis_service.fetch_reddit_data, "get_reddit_data", no_posts)
+    monkeypatch.setattr(server.analysis_service.fetch_reddit_data, "get_sentiment_timeseries", no_series)
+
+    status, first, first_body = await _asgi_get("/api/analysis/amd/stream")
+    assert status == 200
+    assert "etag" not in first
+    assert first["cache-control"] == "no-cache"
+
+    status, replayed, replayed_body = await _asgi_get("/api/analysis/amd/stream")
+    assert status == 200
+    assert _stream_events(replayed_body) == _stream_events(first_body)
+    assert replayed["cache-control"].startswith("public, max-age=")
+
+    status, revalidated, body = await _asgi_get("/api/analysis/amd/stream", headers={"If-None-Match": replayed["etag"]})
+    assert status == 304
+    assert body == b""
+    assert revalidated["etag"] == replayed["etag"]
+
+    _status, sse, _body = await _asgi_get("/api/analysis/amd/stream", "format=sse")
+    _status, as_json, _body = await _asgi_get("/api/analysis/amd")
+    assert len({replayed["etag"], sse["etag"], as_json["etag"]}) == 3
+    assert calls == ["AMD"]
+
+
+@pytest.mark.asyncio
+async def test_failed_stock_request_carries_no_validators(monkeypatch):
+    entry = CacheEntry(value={}, expires_at=4102444800.0, fresh_until=4102444800.0, version=3)
+
+    def failing_stock(ticker, period):
+        raise RuntimeError("provider down")
+
+    monkeypatch.setattr(server.fetch_stock_data, "get_freshness", lambda _ticker: entry)
+    monkeypatch.setattr(server.fetch_stock_data, "get_stock_data", failing_stock)
+
+    status, headers, _body = await _asgi_get("/api/stock/aapl")
+
+    assert status == 503
+    assert "etag" not in headers
+
+
+@pytest.mark.asyncio
+async def test_stock_endpoint_serves_columnar_history_on_request(monkeypatch):
+    def fake_stock(ticker, period):
+        return {
+            "symbol": ticker,
+            "history": [
+                {"Date": "2026-06-01", "Open": 1.0, "High": 2.0, "Low": 0.5, "Close": 1.5, "Volume": 10},
+                {"Date": "2026-06-03", "Open": 1.5, "High": 2.5, "Low": 1.0, "Close": None, "Volume": None},
+            ],
+        }
+
+    monkeypatch.setattr(server.fetch_stock_data, "get_freshness", lambda _ticker: None)
+    monkeypatch.setattr(server.fetch_stock_data, "get_stock_data", fake_stock)
+
+    status, _headers, body = await _asgi_get("/api/stock/aapl", "historyFormat=columnar-delta")
+    data = json.loads(body)
+
+    assert status == 200
+    assert data["history"] == []
+    assert data["historyColumns"] == {
+        "date": None,
+        "dateStart": "2026-06-01",
+        "dateDeltas": [0, 2],
+        "open": [1.0, 1.5],
+        "high": [2.0, 2.5],
+        "low": [0.5, 1.0],
+        "close": [1.5, None],
+        "volume": [10, None],
+    }
+
+
+@pytest.mark.asyncio
+async def test_requests_report_server_timing_and_feed_metrics(monkeypatch):
+    server.instrumentation.registry.clear()
+
+    def fake_stock(ticker, period):
+        with server.instrumentation.span("provider_fetch"):
+            return {"symbol": ticker}
+
+    monkeypatch.setattr(server.fetch_stock_data, "get_freshness", lambda _ticker: None)
+    monkeypatch.setattr(server.fetch_stock_data, "get_stock_data", fake_stock)
+
+    status, headers, _body = await _asgi_get("/api/stock/aapl")
+    assert status == 200
+    assert [timing.split(";")[0] for timing in headers["server-timing"].split(", ")] == ["provider_fetch", "total"]
+
+    status, headers, body = await _asgi_get("/metrics")
+    text = body.decode()
+    assert status == 200
+    assert headers["content-type"].startswith("text/plain; version=0.0.4")
+    assert 'stocksentiment_stage_duration_seconds_count{stage="provider_fetch"} 1' in text
+    assert (
+        'stocksentiment_request_duration_seconds_count'
+        '{endpoint="/api/stock/{ticker}",method="GET",status="200"} 1'
+    ) in text
+    assert 'stocksentiment_cache_misses_total{cache="analysis"}' in text
+    assert "# TYPE stocksentiment_upstream_circuit_open gauge" in text
@@ -0,0 +1,339 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from cache import TTLCache
+from cache_backends import SQLiteBackend
+
+
+def test_get_or_load_coalesces_concurrent_thread_misses():
+    cache = TTLCache[int](ttl_seconds=60)
+    calls = {"count": 0}
+    release = threading.Event()
+    results = []
+
+    def slow_load():
+        calls["count"] += 1
+        release.wait(timeout=2)
+        return 42
+
+    threads = [
+        threading.Thread(target=lambda: results.append(cache.get_or_load("AAPL", slow_load)))
+        for _ in range(8)
+    ]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.05)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert calls["count"] == 1
+    assert results == [42] * 8
+    assert cache.get("AAPL") == 42
+
+
+def test_get_or_load_shares_exception_with_thread_waiters():
+    cache = TTLCache[int](ttl_seconds=60)
+    release = threading.Event()
+    errors = []
+
+    def failing_load():
+        release.wait(timeout=2)
+        raise RuntimeError("provider down")
+
+    def worker():
+        try:
+            cache.get_or_load("AAPL", failing_load)
+        except RuntimeError as exc:
+            errors.append(str(exc))
+
+    threads = [threading.Thread(target=worker) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.05)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert errors == ["provider down"] * 4
+    assert cache.get("AAPL") is None
+
+
+@pytest.mark.asyncio
+async def test_get_or_load_async_coalesces_concurrent_misses():
+    cache = TTLCache[list[str]](ttl_seconds=60)
+    calls = {"count": 0}
+
+    async def slow_load():
+        calls["count"] += 1
+        await asyncio.sleep(0.01)
+        return ["post"]
+
+    results = await asyncio.gather(*(cache.get_or_load_async("GME", slow_load) for _ in range(10)))
+
+    assert calls["count"] == 1
+    assert results == [["post"]] * 10
+
+
+@pytest.mark.asyncio
+async def test_get_or_load_async_propagates_exception_to_every_waiter():
+    cache = TTLCache[list[str]](ttl_seconds=60)
+    calls = {"count": 0}
+
+    async def failing_load():
+        calls["count"] += 1
+        await asyncio.sleep(0.01)
+        raise RuntimeError("rate limited")
+
+    results = await asyncio.gather(
+        *(cache.get_or_load_async("GME", failing_load) for _ in range(5)),
+        return_exceptions=True,
+    )
+
+    assert calls["count"] == 1
+    assert all(isinstance(result, RuntimeError) for result in results)
+
+
+@pytest.mark.asyncio
+async def test_cancelled_waiter_does_not_cancel_shared_fetch():
+    cache = TTLCache[str](ttl_seconds=60)
+
+    async def slow_load():
+        await asyncio.sleep(0.05)
+        return "done"
+
+    impatient = asyncio.ensure_future(cache.get_or_load_async("TSLA", slow_load))
+    patient = asyncio.ensure_future(cache.get_or_load_async("TSLA", slow_load))
+    await asyncio.sleep(0)
+    impatient.cancel()
+
+    assert await patient == "done"
+
+
+def test_lru_eviction_respects_max_entries():
+    cache = TTLCache[int](ttl_seconds=60, max_entries=2)
+    cache.set("A", 1)
+    cache.set("B", 2)
+    assert cache.get("A") == 1
+    cache.set("C", 3)
+
+    assert cache.get("B") is None
+    assert cache.get("A") == 1
+    assert cache.get("C") == 3
+    assert cache.stats()["evictions"] == 1
+
+
+def test_byte_budget_evicts_least_recently_used():
+    cache = TTLCache[bytes](ttl_seconds=60, max_bytes=2500)
+    cache.set("A", b"x" * 1000)
+    cache.set("B", b"x" * 1000)
+    cache.set("C", b"x" * 1000)
+
+    stats = cache.stats()
+    assert cache.get("A") is None
+    assert stats["entries"] == 2
+    assert stats["bytes"] <= 2500
+
+
+def test_sweep_drops_expired_entries_without_reads(monkeypatch):
+    now = {"value": 1000.0}
+    monkeypatch.setattr("cache.time.time", lambda: now["value"])
+    cache = TTLCache[int](ttl_seconds=10, sweep_interval_seconds=5)
+    cache.set("OLD", 1)
+    now["value"] += 20
+    cache.set("NEW", 2)
+
+    stats = cache.stats()
+    assert stats["entries"] == 1
+    assert stats["expirations"] == 1
+
+
+def test_stats_track_hits_and_misses():
+    cache = TTLCache[int](ttl_seconds=60)
+    cache.get("MISS")
+    cache.set("HIT", 1)
+    cache.get("HIT")
+
+    stats = cache.stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 1
+    assert stats["hitRatio"] == 0.5
+
+
+def test_stale_entry_is_served_while_refreshing_in_background(monkeypatch):
+    now = {"value": 1000.0}
+    monkeypatch.setattr("cache.time.time", lambda: now["value"])
+    cache = TTLCache[str](ttl_seconds=10, stale_ttl_seconds=100)
+    refreshed = threading.Event()
+
+    def reload():
+        refreshed.set()
+        return "new"
+
+    cache.set("AAPL", "old")
+    now["value"] += 20
+
+    assert cache.get_or_load("AAPL", reload) == "old"
+    assert refreshed.wait(timeout=2)
+    for _ in range(100):
+        if cache.peek_entry("AAPL").value == "new":
+            break
+        time.sleep(0.01)
+    assert cache.get("AAPL") == "new"
+    assert not cache.peek_entry("AAPL").is_stale()
+
+
+def test_entry_past_hard_ttl_is_reloaded_inline(monkeypatch):
+    now = {"value": 1000.0}
+    monkeypatch.setattr("cache.time.time", lambda: now["value"])
+    cache = TTLCache[str](ttl_seconds=10, stale_ttl_seconds=100)
+    cache.set("AAPL", "old")
+    now["value"] += 200
+
+    assert cache.get_or_load("AAPL", lambda: "new") == "new"
+
+
+@pytest.mark.asyncio
+async def test_async_stale_entry_refreshes_in_background(monkeypatch):
+    now = {"value": 1000.0}
+    monkeypatch.setattr("cache.time.time", lambda: now["value"])
+    cache = TTLCache[str](ttl_seconds=10, stale_ttl_seconds=100)
+    calls = {"count": 0}
+
+    async def reload():
+        calls["count"] += 1
+        return "new"
+
+    cache.set("GME", "old")
+    now["value"] += 20
+
+    first = await cache.get_or_load_async("GME", reload)
+    second = await cache.get_or_load_async("GME", reload)
+    await asyncio.sleep(0.01)
+
+    assert (first, second) == ("old", "old")
+    assert calls["count"] == 1
+    assert await cache.get_or_load_async("GME", reload) == "new"
+
+
+@pytest.mark.asyncio
+async def test_failed_background_refresh_keeps_stale_value(monkeypatch):
+    now = {"value": 1000.0}
+    monkeypatch.setattr("cache.time.time", lambda: now["value"])
+    cache = TTLCache[str](ttl_seconds=10, stale_ttl_seconds=100)
+
+    async def failing_reload():
+        raise RuntimeError("rate limited")
+
+    cache.set("GME", "old")
+    now["value"] += 20
+
+    assert await cache.get_or_load_async("GME", failing_reload) == "old"
+    await asyncio.sleep(0.01)
+
+    assert cache.get("GME") == "old"
+    assert cache.stats()["refreshFailures"] == 1
+
+
+def test_sqlite_backend_is_shared_between_cache_instances(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    writer = TTLCache[dict](ttl_seconds=60, backend=SQLiteBackend(path, "stock"))
+    reader = TTLCache[dict](ttl_seconds=60, backend=SQLiteBackend(path, "stock"))
+    other_namespace = TTLCache[dict](ttl_seconds=60, backend=SQLiteBackend(path, "reddit"))
+
+    writer.set("AAPL:1mo", {"info": {"symbol": "AAPL"}, "history": [{"Close": 1.5}]})
+
+    assert reader.get("AAPL:1mo") == {"info": {"symbol": "AAPL"}, "history": [{"Close": 1.5}]}
+    assert reader.peek_entry("AAPL:1mo").version == writer.peek_entry("AAPL:1mo").version
+    assert other_namespace.get("AAPL:1mo") is None
+
+
+def test_sqlite_backend_survives_restart_and_picks_up_new_versions(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    first = TTLCache[str](ttl_seconds=60, backend=SQLiteBackend(path, "reddit"))
+    first.set("GME", "old")
+    restarted = TTLCache[str](ttl_seconds=60, backend=SQLiteBackend(path, "reddit"))
+
+    assert restarted.get("GME") == "old"
+    first.set("GME", "new")
+    assert restarted.get("GME") == "new"
+
+
+def test_sqlite_backend_evicts_least_recently_used(tmp_path):
+    cache = TTLCache[str](ttl_seconds=60, backend=SQLiteBackend(str(tmp_path / "cache.sqlite3"), "stock", max_entries=2))
+    cache.set("A", "a")
+    cache.set("B", "b")
+    cache.get("A")
+    cache.set("C", "c")
+
+    assert cache.get("B") is None
+    assert cache.get("A") == "a"
+    assert cache.stats()["entries"] == 2
+    assert cache.stats()["evictions"] == 1
+
+
+def test_sqlite_backend_sweeps_expired_rows(tmp_path, monkeypatch):
+    now = {"value": 1000.0}
+    monkeypatch.setattr("cache.time.time", lambda: now["value"])
+    cache = TTLCache[str](
+        ttl_seconds=10,
+        sweep_interval_seconds=5,
+        backend=SQLiteBackend(str(tmp_path / "cache.sqlite3"), "stock"),
+    )
+    cache.set("OLD", "value")
+    now["value"] += 20
+    cache.set("NEW", "value")
+
+    assert cache.stats()["entries"] == 1
+
+
+def test_refresh_replaces_entry_and_expires_within_tracks_soft_ttl(monkeypatch):
+    now = {"value": 1000.0}
+    monkeypatch.setattr("cache.time.time", lambda: now["value"])
+    cache = TTLCache[str](ttl_seconds=100, stale_ttl_seconds=200)
+
+    assert cache.expires_within("AAPL", 10)
+    cache.set("AAPL", "old")
+    assert not cache.expires_within("AAPL", 10)
+    now["value"] += 95
+    assert cache.expires_within("AAPL", 10)
+
+    cache.refresh("AAPL", lambda: "new")
+
+    assert cache.get("AAPL") == "new"
+    assert not cache.expires_within("AAPL", 10)
+    assert cache.stats()["refreshes"] == 1
+
+
+def test_sqlite_metadata_peeks_skip_decoding_values(tmp_path, monkeypatch):
+    path = str(tmp_path / "cache.sqlite3")
+    writer = TTLCache[dict](ttl_seconds=60, backend=SQLiteBackend(path, "frames"))
+    reader = TTLCache[dict](ttl_seconds=60, backend=SQLiteBackend(path, "frames"))
+    version = writer.set_entry("AAPL", {"price": [1.5] * 1000}).version
+
+    def fail_decode(_blob):
+        raise AssertionError("metadata peek decoded the value")
+
+    monkeypatch.setattr("cache_backends.decode_value", fail_decode)
+
+    assert reader.peek_metadata("AAPL").version == version
+    assert not reader.expires_within("AAPL", 10)
+    assert reader.peek_metadata("MSFT") is None
+
+
+def test_sqlite_hits_do_not_write_until_the_next_store(tmp_path):
+    backend = SQLiteBackend(str(tmp_path / "cache.sqlite3"), "stock", max_entries=2)
+    cache = TTLCache[str](ttl_seconds=60, backend=backend)
+    cache.set("A", "a")
+    cache.set("B", "b")
+    writes = backend._connect().total_changes
+
+    assert cache.get("A") == "a"
+    assert backend._connect().total_changes == writes
+
+    cache.set("C", "c")
+    assert cache.get("B") is None
+    assert cache.get("A") == "a"
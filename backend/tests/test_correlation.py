@@ -0,0 +1,44 @@
+import numpy as np
+
+import correlation
+
+
+def test_lagged_pearson_finds_the_lead_across_all_lags():
+    rng = np.random.default_rng(3)
+    leading = rng.normal(size=200)
+    lagging = np.concatenate([rng.normal(size=2), leading[:-2]])
+
+    correlations, observations = correlation.lagged_pearson(leading, lagging, max_lag=5)
+
+    assert correlations.shape == (6,)
+    assert int(np.nanargmax(np.abs(correlations))) == 2
+    assert abs(correlations[2] - 1.0) < 1e-9
+    assert observations.tolist() == [200, 199, 198, 197, 196, 195]
+
+
+def test_lagged_pearson_ignores_missing_days():
+    leading = np.array([0.1, np.nan, 0.3, 0.5, np.nan, 0.2])
+    lagging = np.array([1.0, 2.0, np.nan, 5.0, 4.0, 2.0])
+
+    correlations, observations = correlation.lagged_pearson(leading, lagging, max_lag=1)
+
+    pairs = ~np.isnan(leading) & ~np.isnan(lagging)
+    assert observations[0] == pairs.sum() == 3
+    assert abs(correlations[0] - np.corrcoef(leading[pairs], lagging[pairs])[0, 1]) < 1e-12
+
+
+def test_rolling_pearson_matches_per_window_coefficients():
+    rng = np.random.default_rng(8)
+    x = rng.normal(size=40)
+    y = x * 0.5 + rng.normal(size=40)
+    y[10:15] = 1.0
+    x[10:15] = 2.0
+
+    rolling = correlation.rolling_pearson(x, y, window=5)
+
+    assert len(rolling) == 36
+    assert np.isnan(rolling[10])
+    for start in (0, 20, 35):
+        expected = np.corrcoef(x[start:start + 5], y[start:start + 5])[0, 1]
+        assert abs(rolling[start] - expected) < 1e-12
+    assert len(correlation.rolling_pearson(x[:3], y[:3], window=5)) == 0
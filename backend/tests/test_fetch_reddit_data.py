@@ -1,9 +1,19 @@
-from datetime import datetime, timedelta, timezone
+import asyncio
+from datetime import date, datetime, timedelta, timezone
 from types import SimpleNamespace
 
 import pytest
 
 import fetch_reddit_data
+import resilience
+import sentiment_store
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    temporary_store = sentiment_store.SentimentStore(str(tmp_path / "sentiment.sqlite3"))
+    monkeypatch.setattr(sentiment_store, "store", temporary_store)
+    return temporary_store
 
 
 def test_classify_sentiment_thresholds():
@@ -76,17 +86,18 @@ async def test_categorize_sentiment_handles_no_posts(monkeypatch):
 
 
 @pytest.mark.asyncio
-async def test_get_sentiment_timeseries_groups_recent_posts(monkeypatch):
+async def test_get_sentiment_timeseries_groups_recent_posts(monkeypatch, store):
     now = datetime.now(timezone.utc)
     today = now.timestamp()
     yesterday = (now - timedelta(days=1)).timestamp()
+    store.record_posts("AAPL", [
+        {"id": "a", "date": today, "score": 0.4},
+        {"id": "b", "date": today, "score": 0.2},
+        {"id": "c", "date": yesterday, "score": -0.4},
+    ])
 
     async def fake_posts(_ticker, limit=50):
-        return [
-            {"date": today, "score": 0.4},
-            {"date": today, "score": 0.2},
-            {"date": yesterday, "score": -0.4},
-        ]
+        return []
 
     monkeypatch.setattr(fetch_reddit_data, "get_reddit_data", fake_posts)
 
@@ -99,9 +110,277 @@ async def test_get_sentiment_timeseries_groups_recent_posts(monkeypatch):
     assert series[-2]["sentiment"] == "negative"
 
 
+@pytest.mark.asyncio
+async def test_get_sentiment_timeseries_reads_long_windows_from_store(monkeypatch, store):
+    long_ago = datetime.now(timezone.utc) - timedelta(days=900)
+    store.record_posts("AAPL", [{"id": "old", "date": long_ago.timestamp(), "score": -0.6}])
+
+    async def fake_posts(_ticker, limit=50):
+        return []
+
+    monkeypatch.setattr(fetch_reddit_data, "get_reddit_data", fake_posts)
+
+    series = await fetch_reddit_data.get_sentiment_timeseries("aapl", days=3650)
+
+    assert len(series) == 3651
+    populated = [point for point in series if point["post_count"]]
+    assert populated == [{
+        "date": long_ago.strftime("%Y-%m-%d"),
+        "score": pytest.approx(-0.6),
+        "sentiment": "negative",
+        "post_count": 1,
+    }]
+
+
+@pytest.mark.asyncio
+async def test_get_sentiment_timeseries_serves_stored_days_while_reddit_is_unavailable(monkeypatch, store):
+    async def unavailable(_ticker, limit=50):
+        raise resilience.UpstreamUnavailableError("Reddit", "circuit open", 12)
+
+    monkeypatch.setattr(fetch_reddit_data, "get_reddit_data", unavailable)
+
+    with pytest.raises(resilience.UpstreamUnavailableError):
+        await fetch_reddit_data.get_sentiment_timeseries("AAPL", days=2)
+
+    store.record_posts("AAPL", [{"id": "a", "date": datetime.now(timezone.utc).timestamp(), "score": 0.4}])
+    series = await fetch_reddit_data.get_sentiment_timeseries("AAPL", days=2)
+
+    assert series[-1]["post_count"] == 1
+
+
+@pytest.mark.asyncio
+async def test_get_reddit_data_slices_single_search_per_ticker(monkeypatch):
+    fetch_reddit_data._reddit_cache.clear()
+    calls = []
+
+    async def fake_search(ticker, previous=None):
+        calls.append(ticker)
+        return [{"id": str(index), "date": 0, "score": 0.0} for index in range(fetch_reddit_data.REDDIT_FETCH_LIMIT)]
+
+    monkeypatch.setattr(fetch_reddit_data, "_search_posts", fake_search)
+
+    small = await fetch_reddit_data.get_reddit_data("aapl", limit=5)
+    large = await fetch_reddit_data.get_reddit_data("AAPL", limit=30)
+    series_posts = await fetch_reddit_data.get_reddit_data("AAPL", limit=fetch_reddit_data.REDDIT_FETCH_LIMIT)
+
+    assert calls == ["AAPL"]
+    assert [post["id"] for post in small] == ["0", "1", "2", "3", "4"]
+    assert len(large) == 30
+    assert series_posts[:30] == large
+
+
+@pytest.mark.asyncio
+async def test_search_posts_scores_submissions_in_one_batch(monkeypatch, store):
+    submissions = [
+        SimpleNamespace(id="a", title="GME to the moon", selftext="", created_utc=1750184049),
+        SimpleNamespace(id="b", title="GME is finished", selftext="sell everything", created_utc=1750184050),
+    ]
+    batches = []
+
+    class FakeSubreddit:
+        async def search(self, query, limit, sort):
+            assert query == "$GME"
+            assert sort == "new"
+            for submission in submissions:
+                yield submission
+
+    class FakeReddit:
+        async def subreddit(self, _name):
+            return FakeSubreddit()
+
+        async def close(self):
+            pass
+
+    async def fake_score_many(items):
+        batches.append(items)
+        return [0.5, -0.5]
+
+    monkeypatch.setattr(fetch_reddit_data, "get_async_reddit", FakeReddit)
+    monkeypatch.setattr(fetch_reddit_data.sentiment_scoring.scorer, "score_many", fake_score_many)
+
+    posts = await fetch_reddit_data._search_posts("GME")
+
+    assert batches == [[("a", "GME to the moon "), ("b", "GME is finished sell everything")]]
+    assert [post["id"] for post in posts] == ["b", "a"]
+    assert [post["sentiment"] for post in posts] == ["negative", "positive"]
+
+
+@pytest.mark.asyncio
+async def test_search_posts_only_ingests_submissions_newer_than_cursor(monkeypatch, store):
+    newest_first = [
+        SimpleNamespace(id="new2", title="GME squeeze", selftext="", created_utc=300),
+        SimpleNamespace(id="new1", title="GME again", selftext="", created_utc=250),
+        SimpleNamespace(id="old2", title="GME old", selftext="", created_utc=200),
+        SimpleNamespace(id="older", title="GME older", selftext="", created_utc=100),
+    ]
+    yielded = []
+    scored = []
+
+    class FakeSubreddit:
+        async def search(self, query, limit, sort):
+            for submission in newest_first:
+                yielded.append(submission.id)
+                yield submission
+
+    class FakeReddit:
+        async def subreddit(self, _name):
+            return FakeSubreddit()
+
+    async def fake_score_many(items):
+        scored.extend(post_id for post_id, _text in items)
+        return [0.0 for _ in items]
+
+    monkeypatch.setattr(fetch_reddit_data, "get_async_reddit", FakeReddit)
+    monkeypatch.setattr(fetch_reddit_data.sentiment_scoring.scorer, "score_many", fake_score_many)
+    previous = [
+        {"id": "old2", "date": 200.0, "score": 0.5},
+        {"id": "old1", "date": 150.0, "score": -0.5},
+    ]
+
+    posts = await fetch_reddit_data._search_posts("GME", previous=previous)
+
+    assert yielded == ["new2", "new1", "old2", "older"]
+    assert scored == ["new2", "new1"]
+    assert [post["id"] for post in posts] == ["new2", "new1", "old2", "old1"]
+    assert [row.post_count for row in store.daily_range("GME", date(1970, 1, 1), date(1970, 1, 1))] == [2]
+
+
+def test_merge_posts_dedupes_and_caps_retained_store():
+    previous = [{"id": "a", "date": 1.0, "likes": 1}, {"id": "b", "date": 2.0, "likes": 1}]
+    new_posts = [{"id": "b", "date": 2.0, "likes": 9}, {"id": "c", "date": 3.0, "likes": 1}]
+
+    merged = fetch_reddit_data.merge_posts(new_posts, previous, retain=2)
+
+    assert merged == [{"id": "c", "date": 3.0, "likes": 1}, {"id": "b", "date": 2.0, "likes": 9}]
+
+
+@pytest.mark.asyncio
+async def test_reddit_pool_reuses_one_client_and_limits_concurrency(monkeypatch):
+    created = []
+    closed = []
+    peak = {"active": 0, "current": 0}
+
+    class FakeReddit:
+        def __init__(self):
+            created.append(self)
+
+        async def close(self):
+            closed.append(self)
+
+    async def search():
+        async with pool.client() as client:
+            peak["current"] += 1
+            peak["active"] = max(peak["active"], peak["current"])
+            await asyncio.sleep(0.01)
+            peak["current"] -= 1
+            return client
+
+    monkeypatch.setattr(fetch_reddit_data, "get_async_reddit", FakeReddit)
+    pool = fetch_reddit_data.RedditClientPool(max_concurrent_searches=2)
+    await pool.start()
+
+    clients = await asyncio.gather(*(search() for _ in range(6)))
+    await pool.close()
+
+    assert len(created) == 1
+    assert all(client is created[0] for client in clients)
+    assert peak["active"] == 2
+    assert closed == created
+    assert pool.stats()["searches"] == 6
+
+
+@pytest.mark.asyncio
+async def test_reddit_pool_start_tolerates_missing_credentials(monkeypatch):
+    monkeypatch.setattr(fetch_reddit_data, "app_id", None)
+    pool = fetch_reddit_data.RedditClientPool(max_concurrent_searches=1)
+
+    await pool.start()
+
+    assert pool.stats()["connected"] is False
+    with pytest.raises(RuntimeError, match="Reddit credentials"):
+        async with pool.client():
+            pass
+
+
 def test_get_async_reddit_requires_credentials(monkeypatch):
     monkeypatch.setattr(fetch_reddit_data, "app_id", None)
     monkeypatch.setattr(fetch_reddit_data, "client_secret", None)
 
     with pytest.raises(RuntimeError, match="Reddit credentials"):
         fetch_reddit_data.get_async_reddit()
+
+
+def test_reddit_pool_closes_the_client_of_a_previous_loop(monkeypatch):
+    created = []
+    closed = []
+
+    class FakeReddit:
+        def __init__(self):
+            created.append(self)
+
+        async def close(self):
+            closed.append(self)
+
+    async def search():
+        async with pool.client() as client:
+            await asyncio.sleep(0)
+            return client
+
+    monkeypatch.setattr(fetch_reddit_data, "get_async_reddit", FakeReddit)
+    pool = fetch_reddit_data.RedditClientPool(max_concurrent_searches=1)
+
+    first = asyncio.run(search())
+
+    async def search_on_new_loop():
+        client = await search()
+        await asyncio.sleep(0)
+        return client
+
+    second = asyncio.run(search_on_new_loop())
+
+    assert first is not second
+    assert closed == [first]
+    assert pool.stats()["clientsCreated"] == 2
+    assert pool.stats()["activeSearches"] == 0
+
+
+@pytest.mark.asyncio
+async def test_reddit_pool_releases_the_semaphore_it_acquired(monkeypatch):
+    class FakeReddit:
+        async def close(self):
+            pass
+
+    monkeypatch.setattr(fetch_reddit_data, "get_async_reddit", FakeReddit)
+    pool = fetch_reddit_data.RedditClientPool(max_concurrent_searches=1)
+
+    async with pool.client():
+        acquired = pool._semaphore
+        pool._loop = None
+        pool._ensure_client()
+
+    assert not acquired.locked()
+    assert not pool._semaphore.locked()
+
+
+@pytest.mark.asyncio
+async def test_search_fails_fast_on_an_open_breaker_while_slots_are_busy(monkeypatch):
+    class FakeReddit:
+        async def close(self):
+            pass
+
+    monkeypatch.setattr(fetch_reddit_data, "get_async_reddit", FakeReddit)
+    monkeypatch.setattr(fetch_reddit_data, "reddit_pool", fetch_reddit_data.RedditClientPool(max_concurrent_searches=1))
+    upstream = resilience.Upstream(
+        "Reddit",
+        resilience.TokenBucket(rate_per_second=100.0, burst=100),
+        resilience.CircuitBreaker(failure_threshold=1, reset_seconds=30.0),
+        slow_call_seconds=5.0,
+    )
+    upstream.breaker.record_failure()
+    monkeypatch.setattr(resilience, "reddit", upstream)
+
+    async with fetch_reddit_data.reddit_pool.client():
+        with pytest.raises(resilience.UpstreamUnavailableError, match="circuit open"):
+            await asyncio.wait_for(fetch_reddit_data._search_posts("GME"), 1)
+
+    assert upstream.stats()["rejected"]["circuitOpen"] == 1
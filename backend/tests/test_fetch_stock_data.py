@@ -1,10 +1,19 @@
+import asyncio
+import sys
+import threading
+import time
+from types import SimpleNamespace
+
 import pandas as pd
+import pytest
 
 import fetch_stock_data
+import resilience
 
 
 def test_get_stock_data_normalizes_history_and_uses_cache(monkeypatch):
     fetch_stock_data._stock_cache.clear()
+    fetch_stock_data._frame_cache.clear()
     calls = {"count": 0}
 
     def fake_provider_frames(ticker):
@@ -81,3 +90,193 @@ def test_get_stock_data_normalizes_history_and_uses_cache(monkeypatch):
         "Dividends": None,
         "Stock Splits": None,
     }
+
+
+def test_get_stock_data_derives_every_period_from_one_provider_fetch(monkeypatch):
+    fetch_stock_data._stock_cache.clear()
+    fetch_stock_data._frame_cache.clear()
+    calls = {"count": 0}
+    dates = pd.date_range("2024-06-15", "2026-06-15", freq="D")
+
+    def fake_provider_frames(_ticker):
+        calls["count"] += 1
+        return {
+            "price": pd.DataFrame({
+                "report_date": dates,
+                "open": 1.0,
+                "high": 2.0,
+                "low": 0.5,
+                "close": 1.5,
+                "volume": 10,
+            }),
+            "market_cap": None,
+            "ttm_pe": None,
+            "beta": None,
+        }
+
+    monkeypatch.setattr(fetch_stock_data, "_fetch_provider_frames", fake_provider_frames)
+
+    month = fetch_stock_data.get_stock_data("PERIOD", period="1mo")
+    year = fetch_stock_data.get_stock_data("PERIOD", period="1y")
+    everything = fetch_stock_data.get_stock_data("PERIOD", period="all")
+
+    assert calls["count"] == 1
+    assert len(month["history"]) == 32
+    assert len(year["history"]) == 367
+    assert len(everything["history"]) == len(dates)
+    assert everything["history"][-1]["Date"] == "2026-06-15"
+
+
+def test_history_records_clean_nan_inf_and_dates_column_wise():
+    frame = pd.DataFrame({
+        "report_date": pd.to_datetime(["2026-06-12", "2026-06-15"]),
+        "open": [1.0, float("nan")],
+        "high": [float("inf"), 3.0],
+        "low": [0.5, None],
+        "close": ["1.5", 2.5],
+        "volume": [1234.9, float("nan")],
+    })
+
+    records = fetch_stock_data._history_records(frame)
+
+    assert records == [
+        {
+            "Date": "2026-06-12",
+            "Open": 1.0,
+            "High": None,
+            "Low": 0.5,
+            "Close": 1.5,
+            "Volume": 1234,
+            "Dividends": None,
+            "Stock Splits": None,
+        },
+        {
+            "Date": "2026-06-15",
+            "Open": None,
+            "High": 3.0,
+            "Low": None,
+            "Close": 2.5,
+            "Volume": None,
+            "Dividends": None,
+            "Stock Splits": None,
+        },
+    ]
+    assert type(records[0]["Volume"]) is int
+    assert type(records[0]["Open"]) is float
+
+
+def test_fetch_provider_frames_runs_concurrently_and_drops_frames_past_the_budget(monkeypatch):
+    delays = {"price": 0.2, "market_capitalization": 0.2, "ttm_pe": 0.2, "beta": 2.0}
+
+    class FakeTicker:
+        def __init__(self, ticker):
+            self.ticker = ticker
+
+        def _frame(self, name):
+            time.sleep(delays[name])
+            return pd.DataFrame([{"symbol": self.ticker, name: 1.0}])
+
+        def price(self):
+            return self._frame("price")
+
+        def market_capitalization(self):
+            return self._frame("market_capitalization")
+
+        def ttm_pe(self):
+            raise RuntimeError("no earnings")
+
+        def beta(self, period):
+            assert period == "5y"
+            return self._frame("beta")
+
+    monkeypatch.setitem(sys.modules, "defeatbeta_api.data.ticker", SimpleNamespace(Ticker=FakeTicker))
+    monkeypatch.setattr(fetch_stock_data, "PROVIDER_FRAME_BUDGET_SECONDS", 0.5)
+    monkeypatch.setattr(fetch_stock_data, "_frame_stats", dict.fromkeys(fetch_stock_data._frame_stats, 0))
+
+    started = time.perf_counter()
+    frames = fetch_stock_data._fetch_provider_frames("TEST")
+    elapsed = time.perf_counter() - started
+
+    assert elapsed < 1.0
+    assert list(frames["price"].columns) == ["symbol", "price"]
+    assert frames["market_cap"]["market_capitalization"].tolist() == [1.0]
+    assert frames["ttm_pe"] is None
+    assert frames["beta"] is None
+    assert fetch_stock_data._frame_stats == {
+        "priceTimeouts": 0,
+        "optionalTimeouts": 1,
+        "optionalFailures": 1,
+        "optionalSkipped": 0,
+    }
+    assert "optionalInFlight" in fetch_stock_data.cache_stats()["frames"]["fetches"]
+
+
+class SlowTicker:
+    def __init__(self, ticker, price_delay=0.0):
+        self.ticker = ticker
+        self.price_delay = price_delay
+
+    def price(self):
+        time.sleep(self.price_delay)
+        return pd.DataFrame([{"symbol": self.ticker, "close": 1.0}])
+
+    def market_capitalization(self):
+        return pd.DataFrame([{"market_capitalization": 1.0}])
+
+    def ttm_pe(self):
+        return pd.DataFrame([{"ttm_pe": 1.0}])
+
+    def beta(self, _period):
+        return pd.DataFrame([{"beta": 1.0}])
+
+
+def test_fetch_provider_frames_bounds_the_price_fetch_by_the_budget(monkeypatch):
+    monkeypatch.setitem(
+        sys.modules,
+        "defeatbeta_api.data.ticker",
+        SimpleNamespace(Ticker=lambda ticker: SlowTicker(ticker, price_delay=1.0)),
+    )
+    monkeypatch.setattr(fetch_stock_data, "PROVIDER_FRAME_BUDGET_SECONDS", 0.1)
+    monkeypatch.setattr(fetch_stock_data, "_frame_stats", dict.fromkeys(fetch_stock_data._frame_stats, 0))
+
+    started = time.perf_counter()
+    with pytest.raises(resilience.UpstreamUnavailableError, match="price fetch exceeded the 0.1s budget"):
+        fetch_stock_data._fetch_provider_frames("TEST")
+
+    assert time.perf_counter() - started < 0.5
+    assert fetch_stock_data._frame_stats["priceTimeouts"] == 1
+
+
+def test_fetch_provider_frames_skips_optional_frames_when_too_many_are_in_flight(monkeypatch):
+    monkeypatch.setitem(sys.modules, "defeatbeta_api.data.ticker", SimpleNamespace(Ticker=SlowTicker))
+    monkeypatch.setattr(fetch_stock_data, "_frame_stats", dict.fromkeys(fetch_stock_data._frame_stats, 0))
+    monkeypatch.setattr(fetch_stock_data, "_optional_in_flight", fetch_stock_data.PROVIDER_FRAME_WORKERS)
+
+    frames = fetch_stock_data._fetch_provider_frames("TEST")
+
+    assert frames["price"]["close"].tolist() == [1.0]
+    assert frames["market_cap"] is None and frames["ttm_pe"] is None and frames["beta"] is None
+    assert fetch_stock_data._frame_stats["optionalSkipped"] == 3
+
+
+@pytest.mark.asyncio
+async def test_concurrent_stock_loads_share_one_provider_worker(monkeypatch):
+    calls = []
+    release = threading.Event()
+
+    def slow_stock(ticker, period):
+        calls.append((ticker, period))
+        release.wait(5)
+        return {"info": {"symbol": ticker}}
+
+    monkeypatch.setattr(fetch_stock_data, "get_stock_data", slow_stock)
+
+    loads = [asyncio.ensure_future(fetch_stock_data.get_stock_data_async("aapl")) for _ in range(16)]
+    await asyncio.sleep(0.05)
+    active = fetch_stock_data.provider_executor.executor.stats()["active"]
+    release.set()
+    results = await asyncio.gather(*loads)
+
+    assert active == 1
+    assert calls == [("AAPL", "1mo")]
+    assert all(result == {"info": {"symbol": "AAPL"}} for result in results)
@@ -0,0 +1,33 @@
+import http_cache
+from cache import CacheEntry
+
+
+def test_etag_matches_lists_wildcards_and_weak_validators():
+    etag = http_cache.strong_etag("stock:AAPL:1mo:1")
+
+    assert etag.startswith('"') and etag.endswith('"')
+    assert etag == http_cache.strong_etag("stock:AAPL:1mo:1")
+    assert etag != http_cache.strong_etag("stock:AAPL:1mo:2")
+    assert http_cache.etag_matches(f'"other", {etag}', etag)
+    assert http_cache.etag_matches(f"W/{etag}", etag)
+    assert http_cache.etag_matches("*", etag)
+    assert not http_cache.etag_matches(None, etag)
+    assert not http_cache.etag_matches('"other"', etag)
+
+
+def test_cache_control_follows_the_soonest_source_expiry(monkeypatch):
+    now = 1_750_000_000.0
+    monkeypatch.setattr(http_cache.time, "time", lambda: now)
+    stock = CacheEntry(value={}, fresh_until=now + 3600, expires_at=now + 7200)
+    reddit = CacheEntry(value=[], fresh_until=now + 600, expires_at=now + 86400)
+
+    assert http_cache.cache_control(stock, reddit) == "public, max-age=600, stale-while-revalidate=6600"
+    assert http_cache.cache_control(stock, reddit, max_seconds=60.5) == "public, max-age=60, stale-while-revalidate=7139"
+    assert http_cache.cache_control(stock, None) == "no-cache"
+    assert http_cache.cache_control(CacheEntry(value={}, fresh_until=now - 1, expires_at=now + 60)) == "no-cache"
+
+
+def test_settled_validator_drops_tags_that_changed_mid_request():
+    assert http_cache.settled_validator(None, "v2") == "v2"
+    assert http_cache.settled_validator("v2", "v2") == "v2"
+    assert http_cache.settled_validator("v1", "v2") is None
@@ -0,0 +1,51 @@
+from starlette.datastructures import Headers
+
+import instrumentation
+import request_scope
+
+
+def test_registry_renders_cumulative_prometheus_histograms():
+    registry = instrumentation.Registry()
+    registry.observe("demo_seconds", 0.002, stage="fetch")
+    registry.observe("demo_seconds", 0.2, stage="fetch")
+    registry.observe("demo_seconds", 60.0, stage="fetch")
+
+    lines = registry.render().splitlines()
+
+    assert lines[0] == "# TYPE demo_seconds histogram"
+    assert 'demo_seconds_bucket{stage="fetch",le="0.001"} 0' in lines
+    assert 'demo_seconds_bucket{stage="fetch",le="0.0025"} 1' in lines
+    assert 'demo_seconds_bucket{stage="fetch",le="0.25"} 2' in lines
+    assert 'demo_seconds_bucket{stage="fetch",le="+Inf"} 3' in lines
+    assert 'demo_seconds_count{stage="fetch"} 3' in lines
+    assert 'demo_seconds_sum{stage="fetch"} 60.202000' in lines
+
+
+def test_span_records_stage_histogram_and_request_timing():
+    instrumentation.registry.clear()
+    scope = request_scope.RequestScope(request_headers=Headers())
+    token = request_scope._current.set(scope)
+    try:
+        with instrumentation.span("build_metrics"):
+            pass
+        with instrumentation.span("build_metrics"):
+            pass
+    finally:
+        request_scope._current.reset(token)
+
+    assert set(scope.timings) == {"build_metrics"}
+    assert scope.server_timing().startswith("build_metrics;dur=")
+    assert 'stocksentiment_stage_duration_seconds_count{stage="build_metrics"} 2' in instrumentation.registry.render()
+
+
+def test_render_cache_stats_exports_counters_and_ratios():
+    text = instrumentation.render_cache_stats({
+        "stock": {"hits": 3, "staleHits": 1, "misses": 2, "hitRatio": 0.6667, "entries": 4},
+        "reddit": {"hits": 0, "misses": 0, "hitRatio": None, "ingestion": {"searches": 2}},
+    })
+
+    assert "# TYPE stocksentiment_cache_hits_total counter" in text
+    assert 'stocksentiment_cache_stale_hits_total{cache="stock"} 1' in text
+    assert 'stocksentiment_cache_hit_ratio{cache="stock"} 0.6667' in text
+    assert 'stocksentiment_cache_hit_ratio{cache="reddit"}' not in text
+    assert "ingestion" not in text
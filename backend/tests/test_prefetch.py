@@ -0,0 +1,72 @@
+import pytest
+
+from prefetch import PrefetchScheduler, PrefetchTarget
+
+
+def _target(name, due, refreshed):
+    async def refresh(ticker, periods):
+        refreshed.append((name, ticker, sorted(periods)))
+
+    return PrefetchTarget(name=name, needs_refresh=lambda ticker, _lead: ticker in due, refresh=refresh)
+
+
+def test_hot_tickers_rank_by_request_frequency():
+    scheduler = PrefetchScheduler(targets=[], top_n=2)
+    for ticker in ["aapl", "GME", "AAPL", "NVDA", "gme", "AAPL"]:
+        scheduler.record(ticker)
+
+    assert scheduler.hot_tickers() == ["AAPL", "GME"]
+
+
+@pytest.mark.asyncio
+async def test_run_once_refreshes_only_due_hot_tickers_with_their_periods():
+    refreshed = []
+    scheduler = PrefetchScheduler(
+        targets=[_target("stock", {"AAPL"}, refreshed), _target("reddit", {"AAPL", "GME"}, refreshed)],
+        top_n=2,
+        jitter_seconds=0,
+        min_spacing_seconds=0,
+    )
+    scheduler.record("AAPL", "1mo")
+    scheduler.record("AAPL", "1y")
+    scheduler.record("GME", "5d")
+    scheduler.record("MSFT", "1mo")
+    scheduler.record("AAPL", "1mo")
+
+    count = await scheduler.run_once()
+
+    assert count == 3
+    assert refreshed == [
+        ("stock", "AAPL", ["1mo", "1y"]),
+        ("reddit", "AAPL", ["1mo", "1y"]),
+        ("reddit", "GME", ["5d"]),
+    ]
+
+
+@pytest.mark.asyncio
+async def test_run_once_respects_refresh_budget_and_survives_failures():
+    async def failing_refresh(_ticker, _periods):
+        raise RuntimeError("rate limited")
+
+    scheduler = PrefetchScheduler(
+        targets=[PrefetchTarget(name="stock", needs_refresh=lambda _ticker, _lead: True, refresh=failing_refresh)],
+        max_refreshes_per_cycle=2,
+        jitter_seconds=0,
+        min_spacing_seconds=0,
+    )
+    for ticker in ["A", "B", "C"]:
+        scheduler.record(ticker)
+
+    assert await scheduler.run_once() == 2
+    assert scheduler.stats()["failures"] == 2
+
+
+@pytest.mark.asyncio
+async def test_request_counts_decay_so_cold_tickers_drop_out():
+    scheduler = PrefetchScheduler(targets=[], jitter_seconds=0, min_spacing_seconds=0)
+    scheduler.record("FAD")
+
+    for _ in range(5):
+        await scheduler.run_once()
+
+    assert scheduler.hot_tickers() == []
@@ -0,0 +1,85 @@
+import asyncio
+import contextvars
+import threading
+
+import pytest
+
+from provider_executor import ExecutorSaturatedError, ProviderExecutor
+
+
+@pytest.mark.asyncio
+async def test_run_executes_off_the_event_loop_thread():
+    executor = ProviderExecutor(max_workers=2, max_queue=4, name="test-provider")
+
+    thread_name = await executor.run(lambda: threading.current_thread().name)
+
+    assert thread_name.startswith("test-provider")
+    assert executor.stats()["completed"] == 1
+    executor.shutdown()
+
+
+def test_submit_rejects_when_queue_is_full():
+    executor = ProviderExecutor(max_workers=1, max_queue=1, name="test-provider")
+    release = threading.Event()
+    started = threading.Event()
+
+    def block():
+        started.set()
+        release.wait(timeout=2)
+
+    running = executor.submit(block)
+    assert started.wait(timeout=2)
+    queued = executor.submit(block)
+
+    with pytest.raises(ExecutorSaturatedError):
+        executor.submit(block)
+
+    stats = executor.stats()
+    assert stats["active"] == 1
+    assert stats["queued"] == 1
+    assert stats["rejected"] == 1
+
+    release.set()
+    running.result(timeout=2)
+    queued.result(timeout=2)
+    assert executor.stats()["completed"] == 2
+    executor.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_run_propagates_context_and_errors():
+    request_id = contextvars.ContextVar("request_id")
+    request_id.set("abc")
+    executor = ProviderExecutor(max_workers=1, max_queue=1, name="test-provider")
+
+    def fail():
+        raise RuntimeError(request_id.get())
+
+    with pytest.raises(RuntimeError, match="abc"):
+        await executor.run(fail)
+
+    assert executor.stats()["failed"] == 1
+    executor.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_cancelled_queued_work_releases_its_queue_slot():
+    executor = ProviderExecutor(max_workers=1, max_queue=3, name="test-provider")
+    release = threading.Event()
+    started = threading.Event()
+
+    def block():
+        started.set()
+        release.wait(timeout=2)
+
+    running = executor.submit(block)
+    assert started.wait(timeout=2)
+    for _ in range(3):
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(executor.run(block), timeout=0.01)
+
+    release.set()
+    running.result(timeout=2)
+    assert executor.stats()["queued"] == 0
+    assert await executor.run(lambda: "ok") == "ok"
+    executor.shutdown()
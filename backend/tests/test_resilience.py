@@ -0,0 +1,195 @@
+import asyncio
+
+import pandas as pd
+import pytest
+
+import fetch_stock_data
+import resilience
+from resilience import CircuitBreaker, TokenBucket, Upstream, UpstreamUnavailableError
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def _upstream(clock, failures=2, reset_seconds=30.0, rate=100.0, burst=100, slow_call_seconds=5.0):
+    return Upstream(
+        "Test",
+        TokenBucket(rate_per_second=rate, burst=burst, clock=clock),
+        CircuitBreaker(failure_threshold=failures, reset_seconds=reset_seconds, clock=clock),
+        slow_call_seconds=slow_call_seconds,
+        clock=clock,
+    )
+
+
+def _fail():
+    raise RuntimeError("upstream down")
+
+
+def test_token_bucket_refills_at_its_rate():
+    clock = FakeClock()
+    bucket = TokenBucket(rate_per_second=2.0, burst=2, clock=clock)
+
+    assert bucket.try_acquire() == 0
+    assert bucket.try_acquire() == 0
+    assert bucket.try_acquire() == pytest.approx(0.5)
+
+    clock.now += 0.5
+    assert bucket.try_acquire() == 0
+
+
+def test_rate_limited_calls_are_rejected_without_tripping_the_breaker():
+    clock = FakeClock()
+    upstream = _upstream(clock, rate=1.0, burst=1)
+
+    assert upstream.call(lambda: "ok") == "ok"
+    with pytest.raises(UpstreamUnavailableError, match="rate limited"):
+        upstream.call(lambda: "ok")
+
+    stats = upstream.stats()
+    assert stats["rejected"] == {"circuitOpen": 0, "rateLimited": 1}
+    assert stats["breaker"]["state"] == "closed"
+
+
+def test_breaker_opens_after_consecutive_failures_and_rejects_fast():
+    clock = FakeClock()
+    upstream = _upstream(clock)
+    calls = {"count": 0}
+
+    def failing():
+        calls["count"] += 1
+        _fail()
+
+    for _ in range(2):
+        with pytest.raises(RuntimeError, match="upstream down"):
+            upstream.call(failing)
+
+    with pytest.raises(UpstreamUnavailableError, match="circuit open, retry in 30s") as excinfo:
+        upstream.call(failing)
+
+    assert calls["count"] == 2
+    assert excinfo.value.retry_after == pytest.approx(30.0)
+    assert upstream.stats()["breaker"]["state"] == "open"
+    assert upstream.stats()["rejected"]["circuitOpen"] == 1
+
+
+def test_half_open_probe_closes_on_success_and_reopens_on_failure():
+    clock = FakeClock()
+    upstream = _upstream(clock, failures=1)
+
+    with pytest.raises(RuntimeError):
+        upstream.call(_fail)
+    clock.now += 30
+    assert upstream.breaker.state == "half_open"
+
+    with pytest.raises(RuntimeError):
+        upstream.call(_fail)
+    assert upstream.breaker.state == "open"
+    with pytest.raises(UpstreamUnavailableError):
+        upstream.call(lambda: "ok")
+
+    clock.now += 30
+    assert upstream.call(lambda: "ok") == "ok"
+    assert upstream.breaker.state == "closed"
+    assert upstream.stats()["breaker"]["timesOpened"] == 2
+
+
+def test_half_open_admits_one_probe_at_a_time():
+    clock = FakeClock()
+    upstream = _upstream(clock, failures=1)
+    with pytest.raises(RuntimeError):
+        upstream.call(_fail)
+    clock.now += 30
+
+    with upstream.guard():
+        with pytest.raises(UpstreamUnavailableError):
+            upstream.call(lambda: "ok")
+
+    assert upstream.breaker.state == "closed"
+
+
+def test_slow_calls_count_as_failures():
+    clock = FakeClock()
+    upstream = _upstream(clock, failures=1, slow_call_seconds=5.0)
+
+    def slow():
+        clock.now += 6
+        return "late"
+
+    assert upstream.call(slow) == "late"
+
+    assert upstream.stats()["slowCalls"] == 1
+    assert upstream.breaker.state == "open"
+
+
+def test_admission_times_only_the_call_and_frees_unused_probes():
+    clock = FakeClock()
+    upstream = _upstream(clock, failures=1, slow_call_seconds=5.0)
+
+    with upstream.admission() as timed:
+        clock.now += 60
+        with timed():
+            clock.now += 1
+    assert upstream.stats()["slowCalls"] == 0
+
+    with pytest.raises(RuntimeError):
+        upstream.call(_fail)
+    clock.now += 30
+    with pytest.raises(asyncio.CancelledError):
+        with upstream.admission():
+            raise asyncio.CancelledError
+
+    assert upstream.call(lambda: "ok") == "ok"
+    assert upstream.breaker.state == "closed"
+
+
+@pytest.mark.asyncio
+async def test_cancelled_probe_releases_its_slot():
+    clock = FakeClock()
+    upstream = _upstream(clock, failures=1)
+    with pytest.raises(RuntimeError):
+        upstream.call(_fail)
+    clock.now += 30
+
+    async def probe():
+        with upstream.guard():
+            await asyncio.sleep(10)
+
+    task = asyncio.create_task(probe())
+    await asyncio.sleep(0)
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+
+    assert upstream.call(lambda: "ok") == "ok"
+
+
+def test_open_breaker_serves_stale_stock_without_calling_provider(monkeypatch):
+    fetch_stock_data._stock_cache.clear()
+    fetch_stock_data._frame_cache.clear()
+    clock = FakeClock()
+    monkeypatch.setattr(resilience, "defeatbeta", _upstream(clock, failures=1))
+    calls = {"count": 0}
+
+    def provider_frames(_ticker):
+        calls["count"] += 1
+        if calls["count"] > 1:
+            _fail()
+        return {"price": pd.DataFrame([{"report_date": "2026-06-15", "close": 12.5, "volume": 10}])}
+
+    monkeypatch.setattr(fetch_stock_data, "_fetch_provider_frames", provider_frames)
+
+    assert fetch_stock_data.get_stock_data("TEST")["info"]["currentPrice"] == 12.5
+    with pytest.raises(RuntimeError):
+        fetch_stock_data.refresh_stock_data("TEST", set())
+    fetch_stock_data.get_freshness("TEST").fresh_until = 0
+    fetch_stock_data._stock_cache.clear()
+
+    assert fetch_stock_data.get_stock_data("TEST")["info"]["currentPrice"] == 12.5
+    assert calls["count"] == 2
+    with pytest.raises(UpstreamUnavailableError):
+        fetch_stock_data.get_stock_data("OTHER")
@@ -0,0 +1,60 @@
+import pytest
+
+import sentiment_scoring
+from sentiment_scoring import SentimentScorer
+
+
+def test_score_caches_by_post_id_and_content(monkeypatch):
+    calls = []
+    real_score_texts = sentiment_scoring.score_texts
+
+    def counting_score_texts(texts):
+        calls.append(list(texts))
+        return real_score_texts(texts)
+
+    monkeypatch.setattr(sentiment_scoring, "score_texts", counting_score_texts)
+    scorer = SentimentScorer()
+
+    first = scorer.score("abc", "NVDA is unstoppable")
+    again = scorer.score("abc", "NVDA is unstoppable")
+    edited = scorer.score("abc", "NVDA is a disaster")
+
+    assert first == again
+    assert edited < first
+    assert len(calls) == 2
+    assert scorer.stats()["hits"] == 1
+
+
+@pytest.mark.asyncio
+async def test_score_many_only_scores_cache_misses(monkeypatch):
+    scorer = SentimentScorer()
+    scorer.score("1", "great earnings")
+    scored_batches = []
+    real_score_texts = sentiment_scoring.score_texts
+
+    def counting_score_texts(texts):
+        scored_batches.append(list(texts))
+        return real_score_texts(texts)
+
+    monkeypatch.setattr(sentiment_scoring, "score_texts", counting_score_texts)
+
+    scores = await scorer.score_many([("1", "great earnings"), ("2", "terrible guidance")])
+
+    assert scored_batches == [["terrible guidance"]]
+    assert scores[0] > 0.05
+    assert scores[1] < -0.05
+
+
+@pytest.mark.asyncio
+async def test_large_batches_are_scored_in_process_pool():
+    scorer = SentimentScorer(process_batch_size=4, chunk_size=2, max_processes=1)
+    items = [(str(index), text) for index, text in enumerate(["love it", "hate it", "meh", "amazing", "awful"])]
+
+    try:
+        scores = await scorer.score_many(items)
+    finally:
+        scorer.shutdown()
+
+    assert scores == sentiment_scoring.score_texts([text for _, text in items])
+    assert scorer.stats()["scored"] == 5
+    assert scorer.stats()["postsPerSecond"] > 0
@@ -0,0 +1,63 @@
+from datetime import date
+
+from sentiment_store import SentimentStore
+
+
+DAY = 86400
+
+
+def test_record_posts_aggregates_scores_and_labels_per_day(tmp_path):
+    store = SentimentStore(str(tmp_path / "sentiment.sqlite3"))
+
+    added = store.record_posts("gme", [
+        {"id": "a", "date": 0, "score": 0.5, "sentiment": "positive"},
+        {"id": "b", "date": 60, "score": -0.3, "sentiment": "negative"},
+        {"id": "c", "date": DAY, "score": 0.01},
+    ])
+
+    rows = store.daily_range("GME", date(1970, 1, 1), date(1970, 1, 2))
+    assert added == 3
+    assert [(row.day, row.post_count, row.positive, row.neutral, row.negative) for row in rows] == [
+        ("1970-01-01", 2, 1, 0, 1),
+        ("1970-01-02", 1, 0, 1, 0),
+    ]
+    assert rows[0].average == 0.1
+
+
+def test_record_posts_skips_already_ingested_ids(tmp_path):
+    store = SentimentStore(str(tmp_path / "sentiment.sqlite3"))
+    store.record_posts("GME", [{"id": "a", "date": 0, "score": 0.5}])
+
+    added = store.record_posts("GME", [
+        {"id": "a", "date": 0, "score": 0.5},
+        {"id": "b", "date": 0, "score": 0.1},
+    ])
+
+    rows = store.daily_range("GME", date(1970, 1, 1), date(1970, 1, 1))
+    assert added == 1
+    assert rows[0].post_count == 2
+    assert rows[0].score_sum == 0.6
+    assert store.daily_range("AMC", date(1970, 1, 1), date(1970, 1, 1)) == []
+
+
+def test_store_is_shared_across_instances(tmp_path):
+    path = str(tmp_path / "sentiment.sqlite3")
+    SentimentStore(path).record_posts("GME", [{"id": "a", "date": 0, "score": 0.5}])
+
+    rows = SentimentStore(path).daily_range("GME", date(1970, 1, 1), date(2000, 1, 1))
+
+    assert [row.post_count for row in rows] == [1]
+
+
+def test_watermark_moves_only_when_new_posts_are_recorded(tmp_path):
+    store = SentimentStore(str(tmp_path / "sentiment.sqlite3"))
+    assert store.watermark("gme") == 0
+
+    store.record_posts("gme", [{"id": "a", "date": 0, "score": 0.5}])
+    first = store.watermark("GME")
+    store.record_posts("GME", [{"id": "a", "date": 0, "score": 0.5}])
+    assert store.watermark("GME") == first
+
+    SentimentStore(store.path).record_posts("GME", [{"id": "b", "date": 0, "score": 0.1}])
+    assert store.watermark("GME") > first
+    assert store.watermark("AMC") == 0
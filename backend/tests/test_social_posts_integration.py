@@ -1,3 +1,10 @@
+import asyncio
+import json
+import time
+
+import pytest
+
+from cache import CacheEntry
 from schemas import SentimentSummary, StockHistoryPoint, StockSummary
 
 import analysis_service
@@ -62,3 +69,331 @@ def test_metrics_handles_insufficient_data():
 
     assert metrics.alignment == "insufficient_data"
     assert metrics.priceChangePercent is None
+
+
+def test_metrics_correlates_sentiment_with_price_on_shared_days():
+    metrics = analysis_service._build_metrics(
+        stock=_stock_with_closes(100, 104, 101, 110),
+        sentiment=SentimentSummary(
+            label="positive",
+            displayLabel="Bullish Reddit mood",
+            score=0.3,
+            postCount=6,
+        ),
+        sentiment_series=[
+            {"date": "2026-06-09", "score": -0.9, "sentiment": "negative", "post_count": 1},
+            {"date": "2026-06-10", "score": 0.0, "sentiment": "neutral", "post_count": 1},
+            {"date": "2026-06-11", "score": 0.4, "sentiment": "positive", "post_count": 2},
+            {"date": "2026-06-12", "score": 0.1, "sentiment": "positive", "post_count": 1},
+            {"date": "2026-06-13", "score": 0.9, "sentiment": "positive", "post_count": 2},
+        ],
+    )
+
+    assert metrics.correlation == 0.999
+    assert metrics.laggedCorrelations[0].observations == 4
+    assert [point.lagDays for point in metrics.laggedCorrelations] == [0, 1, 2, 3, 4, 5]
+
+
+def test_metrics_report_rolling_and_lead_correlations():
+    moves = [0, 3, -1, 4, 2, 6, -2, 1, 5, 0, 3, 7, -3, 2, 4, 1, 6, -1, 2, 5, 0, 3, 8, 1, 4]
+    history = [
+        StockHistoryPoint(date=f"2026-05-{day:02d}", close=100 + move)
+        for day, move in enumerate(moves, start=3)
+    ]
+    series = [
+        {"date": f"2026-05-{day:02d}", "score": move / 10, "sentiment": "neutral", "post_count": 1}
+        for day, move in enumerate(moves[2:], start=3)
+    ]
+
+    metrics = analysis_service._build_metrics(
+        stock=StockSummary(symbol="TEST", history=history),
+        sentiment=SentimentSummary(label="positive", displayLabel="Bullish", score=0.3, postCount=23),
+        sentiment_series=series,
+    )
+
+    assert metrics.strongestLeadDays == 2
+    assert metrics.laggedCorrelations[2].correlation == 1.0
+    assert metrics.rollingWindow == analysis_service.ROLLING_CORRELATION_WINDOW
+    assert [point.date for point in metrics.rollingCorrelation] == [
+        f"2026-05-{day:02d}" for day in range(22, 26)
+    ]
+
+
+def _stock_data(*closes):
+    return {
+        "info": {"symbol": "TEST"},
+        "history": [
+            {"Date": f"2026-06-{day:02d}", "Open": close - 1, "High": close + 1, "Low": close - 2,
+             "Close": close, "Volume": 1000 + index}
+            for index, (day, close) in enumerate(zip((1, 2, 5, 6), closes))
+        ],
+    }
+
+
+def test_history_columns_delta_encode_dates():
+    columns = analysis_service.history_columns(_stock_data(100, 101, 99, 104)["history"], delta_dates=True)
+
+    assert columns.date is None
+    assert columns.dateStart == "2026-06-01"
+    assert columns.dateDeltas == [0, 1, 3, 1]
+    assert columns.close == [100.0, 101.0, 99.0, 104.0]
+    assert columns.volume == [1000, 1001, 1002, 1003]
+
+
+def test_columnar_stock_summary_keeps_metrics_and_prices():
+    series = [
+        {"date": day, "score": score, "sentiment": "neutral", "post_count": 1}
+        for day, score in (("2026-06-01", -0.2), ("2026-06-02", 0.1), ("2026-06-05", -0.4), ("2026-06-06", 0.5))
+    ]
+    sentiment = SentimentSummary(label="positive", displayLabel="Bullish Reddit mood", score=0.2, postCount=4)
+    summaries = {
+        history_format: analysis_service._normalize_stock("TEST", _stock_data(100, 101, 99, 104), history_format)
+        for history_format in analysis_service.HISTORY_FORMATS
+    }
+
+    assert summaries["columnar"].history == []
+    assert summaries["columnar"].historyColumns.date == ["2026-06-01", "2026-06-02", "2026-06-05", "2026-06-06"]
+    assert summaries["rows"].historyColumns is None
+    metrics = {
+        history_format: analysis_service._build_metrics(summary, sentiment, series)
+        for history_format, summary in summaries.items()
+    }
+    for summary in summaries.values():
+        assert (summary.currentPrice, summary.previousClose) == (104.0, 99.0)
+    assert metrics["rows"] == metrics["columnar"] == metrics["columnar-delta"]
+    assert metrics["rows"].correlation is not None
+
+
+def _post(post_id, score):
+    return {
+        "id": post_id,
+        "username": "u/test",
+        "handle": "test",
+        "avatar": "https://www.redditstatic.com/avatars/defaults/v2/avatar_default_1.png",
+        "content": "TEST maybe",
+        "platform": "reddit",
+        "date": 1750184049,
+        "sentiment": "positive" if score >= 0.05 else "neutral",
+        "score": score,
+        "likes": 10,
+        "comments": 2,
+        "url": "https://reddit.com/example",
+        "subreddit": "stocks",
+    }
+
+
+@pytest.mark.asyncio
+async def test_analysis_degrades_slow_source_without_blocking(monkeypatch):
+    async def fake_posts(_ticker, limit=30):
+        return [_post("a", 0.4)]
+
+    async def slow_series(_ticker, days=30):
+        await asyncio.sleep(5)
+        return []
+
+    monkeypatch.setattr(analysis_service, "REDDIT_TIMEOUT_SECONDS", 0.05)
+    monkeypatch.setattr(analysis_service.fetch_stock_data, "get_stock_data", lambda ticker, period: {
+        "info": {"symbol": ticker},
+        "history": [{"Date": "2026-06-14", "Close": 10.0}, {"Date": "2026-06-15", "Close": 11.0}],
+    })
+    monkeypatch.setattr(analysis_service.fetch_reddit_data, "get_reddit_data", fake_posts)
+    monkeypatch.setattr(analysis_service.fetch_reddit_data, "get_sentiment_timeseries", slow_series)
+
+    response = await analysis_service.get_analysis("test", period="1mo", days=30, limit=30)
+
+    assert response.stock.currentPrice == 11.0
+    assert [post.id for post in response.posts] == ["a"]
+    assert response.sentiment.label == "positive"
+    assert response.sentimentSeries == []
+    assert response.partialErrors == ["Reddit data unavailable: timed out after 0.05s"]
+
+
+@pytest.mark.asyncio
+async def test_analysis_reports_stock_failure_as_partial_error(monkeypatch):
+    def failing_stock(_ticker, _period):
+        raise RuntimeError("provider down")
+
+    async def no_posts(_ticker, limit=30):
+        return []
+
+    async def no_series(_ticker, days=30):
+        return []
+
+    monkeypatch.setattr(analysis_service.fetch_stock_data, "get_stock_data", failing_stock)
+    monkeypatch.setattr(analysis_service.fetch_reddit_data, "get_reddit_data", no_posts)
+    monkeypatch.setattr(analysis_service.fetch_reddit_data, "get_sentiment_timeseries", no_series)
+
+    response = await analysis_service.get_analysis("TEST", period="1mo", days=30, limit=30)
+
+    assert response.stock is None
+    assert response.partialErrors == ["Stock data unavailable: provider down"]
+
+
+def test_freshness_reports_each_cached_source(monkeypatch):
+    entry = CacheEntry(value={}, expires_at=4102444800.0, fresh_until=1750000000.0, stored_at=1749900000.0)
+    monkeypatch.setattr(analysis_service.fetch_stock_data, "get_freshness", lambda _ticker: entry)
+    monkeypatch.setattr(analysis_service.fetch_reddit_data, "get_freshness", lambda _ticker: None)
+
+    freshness = analysis_service._build_freshness("TEST")
+
+    assert set(freshness) == {"stock"}
+    assert freshness["stock"].fetchedAt == "2025-06-14T11:20:00Z"
+    assert freshness["stock"].stale is True
+
+
+@pytest.mark.asyncio
+async def test_analysis_json_is_served_from_cache_until_a_source_refreshes(monkeypatch):
+    analysis_service._response_cache.clear()
+    entries = {
+        "stock": CacheEntry(value={}, expires_at=4102444800.0, fresh_until=4102444800.0, version=1),
+        "reddit": CacheEntry(value=[], expires_at=4102444800.0, fresh_until=4102444800.0, version=7),
+    }
+    calls = []
+
+    async def fake_analysis(ticker, period, days, limit, history_format="rows"):
+        calls.append(ticker)
+        return analysis_service.AnalysisResponse(
+            ticker=ticker,
+            sentiment=analysis_service._build_sentiment([]),
+            metrics=analysis_service.AnalysisMetrics(),
+            generatedAt=f"call-{len(calls)}",
+        )
+
+    monkeypatch.setattr(analysis_service.fetch_stock_data, "get_freshness", lambda _ticker: entries["stock"])
+    monkeypatch.setattr(analysis_service.fetch_reddit_data, "get_freshness", lambda _ticker: entries["reddit"])
+    monkeypatch.setattr(analysis_service, "get_analysis", fake_analysis)
+
+    first, first_key = await analysis_service.get_analysis_json("tsla", "1mo", 30, 30)
+    second, second_key = await analysis_service.get_analysis_json("TSLA", "1mo", 30, 30)
+    other_limit, _key = await analysis_service.get_analysis_json("TSLA", "1mo", 30, 10)
+    entries["reddit"] = CacheEntry(value=[], expires_at=4102444800.0, fresh_until=4102444800.0, version=8)
+    refreshed, refreshed_key = await analysis_service.get_analysis_json("TSLA", "1mo", 30, 30)
+
+    assert second is first
+    assert second_key == first_key != refreshed_key
+    assert json.loads(first)["generatedAt"] == "call-1"
+    assert json.loads(other_limit)["generatedAt"] == "call-2"
+    assert json.loads(refreshed)["generatedAt"] == "call-3"
+    assert calls == ["TSLA", "TSLA", "TSLA"]
+
+
+@pytest.mark.asyncio
+async def test_analysis_json_does_not_cache_partial_responses(monkeypatch):
+    analysis_service._response_cache.clear()
+    entry = CacheEntry(value={}, expires_at=4102444800.0, fresh_until=4102444800.0, version=1)
+    calls = []
+
+    async def fake_analysis(ticker, period, days, limit, history_format="rows"):
+        calls.append(ticker)
+        return analysis_service.AnalysisResponse(
+            ticker=ticker,
+            sentiment=analysis_service._build_sentiment([]),
+            metrics=analysis_service.AnalysisMetrics(),
+            generatedAt="2026-06-15T00:00:00Z",
+            partialErrors=["Reddit data unavailable: timed out after 15s"],
+        )
+
+    monkeypatch.setattr(analysis_service.fetch_stock_data, "get_freshness", lambda _ticker: entry)
+    monkeypatch.setattr(analysis_service.fetch_reddit_data, "get_freshness", lambda _ticker: entry)
+    monkeypatch.setattr(analysis_service, "get_analysis", fake_analysis)
+
+    await analysis_service.get_analysis_json("TSLA", "1mo", 30, 30)
+    _body, cache_key = await analysis_service.get_analysis_json("TSLA", "1mo", 30, 30)
+
+    assert len(calls) == 2
+    assert cache_key is None
+
+
+@pytest.mark.asyncio
+async def test_batch_analysis_dedupes_bounds_concurrency_and_reports_errors(monkeypatch):
+    running = {"current": 0, "peak": 0}
+    calls = []
+
+    async def fake_analysis(ticker, period, days, limit, history_format="rows"):
+        calls.append(ticker)
+        running["current"] += 1
+        running["peak"] = max(running["peak"], running["current"])
+        await asyncio.sleep(0.01)
+        running["current"] -= 1
+        if ticker == "BOOM":
+            raise RuntimeError("unexpected failure")
+        return analysis_service.AnalysisResponse(
+            ticker=ticker,
+            sentiment=SentimentSummary(label="neutral", displayLabel="Neutral Reddit mood", score=0.0, postCount=0),
+            metrics=analysis_service.AnalysisMetrics(),
+            generatedAt="2026-06-15T00:00:00Z",
+            partialErrors=["Reddit data unavailable: timed out after 15s"] if ticker == "SLOW" else [],
+        )
+
+    monkeypatch.setattr(analysis_service, "get_analysis", fake_analysis)
+    monkeypatch.setattr(analysis_service, "BATCH_CONCURRENCY", 2)
+
+    response = await analysis_service.get_batch_analysis(
+        ["aapl", "MSFT", "AAPL", "SLOW", "BOOM", "NVDA"],
+        period="1mo",
+        days=30,
+        limit=30,
+    )
+
+    assert sorted(calls) == ["AAPL", "BOOM", "MSFT", "NVDA", "SLOW"]
+    assert running["peak"] == 2
+    assert [result.ticker for result in response.results] == ["AAPL", "MSFT", "SLOW", "NVDA"]
+    assert response.errors == {
+        "SLOW": "Reddit data unavailable: timed out after 15s",
+        "BOOM": "unexpected failure",
+    }
+
+
+@pytest.mark.asyncio
+async def test_stream_analysis_emits_sections_as_sources_finish(monkeypatch):
+    async def fast_posts(_ticker, limit=30):
+        return [_post("a", 0.4)]
+
+    async def slow_series(_ticker, days=30):
+        await asyncio.sleep(0.05)
+        return [{"date": "2026-06-15", "score": 0.4, "sentiment": "positive", "post_count": 1}]
+
+    def slow_stock(ticker, _period):
+        time.sleep(0.02)
+        return {"info": {"symbol": ticker}, "history": [{"Date": "2026-06-15", "Close": 11.0}]}
+
+    monkeypatch.setattr(analysis_service.fetch_stock_data, "get_stock_data", slow_stock)
+    monkeypatch.setattr(analysis_service.fetch_reddit_data, "get_reddit_data", fast_posts)
+    monkeypatch.setattr(analysis_service.fetch_reddit_data, "get_sentiment_timeseries", slow_series)
+
+    lines = [line async for line in analysis_service.stream_analysis("TEST", period="1mo", days=30, limit=30)]
+    events = [json.loads(line) for line in lines]
+
+    assert [event["event"] for event in events] == [
+        "sentiment",
+        "posts",
+        "stock",
+        "sentimentSeries",
+        "metrics",
+        "done",
+    ]
+    assert events[1]["data"][0]["id"] == "a"
+    assert events[2]["data"]["currentPrice"] == 11.0
+    assert events[-1]["data"]["ticker"] == "TEST"
+    assert events[-1]["data"]["partialErrors"] == []
+
+
+@pytest.mark.asyncio
+async def test_stream_analysis_supports_server_sent_events(monkeypatch):
+    async def no_posts(_ticker, limit=30):
+        return []
+
+    async def no_series(_ticker, days=30):
+        return []
+
+    monkeypatch.setattr(analysis_service.fetch_stock_data, "get_stock_data", lambda _ticker, _period: None)
+    monkeypatch.setattr(analysis_service.fetch_reddit_data, "get_reddit_data", no_posts)
+    monkeypatch.setattr(analysis_service.fetch_reddit_data, "get_sentiment_timeseries", no_series)
+
+    chunks = [
+        chunk
+        async for chunk in analysis_service.stream_analysis("TEST", period="1mo", days=30, limit=30, stream_format="sse")
+    ]
+
+    assert chunks[-1].startswith(b"event: done\ndata: {")
+    assert all(chunk.endswith(b"\n\n") for chunk in chunks)
@@ -0,0 +1,41 @@
+from datetime import date
+
+import numpy as np
+
+import timeseries
+
+
+def test_dense_daily_series_fills_gaps_and_averages_scores():
+    start = timeseries.day_number(date(2026, 6, 1))
+    series = timeseries.dense_daily_series(
+        timeseries.day_index(["2026-06-02", "2026-06-04", "2026-07-01"]),
+        np.array([0.6, -0.3, 0.9]),
+        np.array([2, 1, 1]),
+        start,
+        start + 3,
+    )
+
+    assert series.records() == [
+        {"date": "2026-06-01", "score": 0.0, "sentiment": "neutral", "post_count": 0},
+        {"date": "2026-06-02", "score": 0.3, "sentiment": "positive", "post_count": 2},
+        {"date": "2026-06-03", "score": 0.0, "sentiment": "neutral", "post_count": 0},
+        {"date": "2026-06-04", "score": -0.3, "sentiment": "negative", "post_count": 1},
+    ]
+
+
+def test_day_index_marks_unparseable_dates():
+    days = timeseries.day_index(["2026-06-02", "None", "2026-06-03T00:00:00"])
+
+    assert days[0] == timeseries.day_number(date(2026, 6, 2))
+    assert days[1] == timeseries.NO_DAY
+    assert days[2] == days[0] + 1
+
+
+def test_scatter_days_places_values_on_calendar_and_drops_outliers():
+    start = timeseries.day_number(date(2026, 6, 1))
+    days = timeseries.day_index(["2026-06-03", "None", "2026-06-01", "2026-07-01"])
+
+    dense = timeseries.scatter_days(days, np.array([1.5, 9.0, -2.0, 4.0]), start, 4)
+
+    assert np.isnan(dense[[1, 3]]).all()
+    assert dense[[0, 2]].tolist() == [-2.0, 1.5]
@@ -0,0 +1,86 @@
+from collections.abc import Sequence
+from dataclasses import dataclass
+from datetime import date
+from typing import Any
+
+import numpy as np
+
+
+NO_DAY = np.iinfo(np.int64).min
+POSITIVE_THRESHOLD = 0.05
+NEGATIVE_THRESHOLD = -0.05
+
+
+@dataclass
+class DailySeries:
+    days: np.ndarray
+    scores: np.ndarray
+    counts: np.ndarray
+
+    def records(self) -> list[dict[str, Any]]:
+        labels = np.where(
+            self.scores >= POSITIVE_THRESHOLD,
+            "positive",
+            np.where(self.scores <= NEGATIVE_THRESHOLD, "negative", "neutral"),
+        )
+        return [
+            {"date": day, "score": score, "sentiment": label, "post_count": count}
+            for day, score, label, count in zip(
+                day_labels(self.days),
+                self.scores.tolist(),
+                labels.tolist(),
+                self.counts.tolist(),
+            )
+        ]
+
+
+def day_number(value: date) -> int:
+    return int(np.datetime64(value, "D").astype(np.int64))
+
+
+def day_index(dates: Sequence[str]) -> np.ndarray:
+    try:
+        return np.asarray([value[:10] for value in dates], dtype="datetime64[D]").astype(np.int64)
+    except ValueError:
+        return np.fromiter((_parse_day(value) for value in dates), dtype=np.int64, count=len(dates))
+
+
+def day_labels(days: np.ndarray) -> list[str]:
+    return np.datetime_as_string(days.astype("datetime64[D]"), unit="D").tolist()
+
+
+def dense_daily_series(
+    days: np.ndarray,
+    score_sums: np.ndarray,
+    counts: np.ndarray,
+    start_day: int,
+    end_day: int,
+) -> DailySeries:
+    span = max(end_day - start_day + 1, 0)
+    offsets = days - start_day
+    in_range = (offsets >= 0) & (offsets < span)
+    dense_sums = np.zeros(span, dtype=np.float64)
+    dense_counts = np.zeros(span, dtype=np.int64)
+    np.add.at(dense_sums, offsets[in_range], score_sums[in_range])
+    np.add.at(dense_counts, offsets[in_range], counts[in_range])
+    scores = np.divide(dense_sums, dense_counts, out=np.zeros(span, dtype=np.float64), where=dense_counts > 0)
+    return DailySeries(
+        days=np.arange(start_day, start_day + span, dtype=np.int64),
+        scores=scores,
+        counts=dense_counts,
+    )
+
+
+def scatter_days(days: np.ndarray, values: np.ndarray, start_day: int, span: int) -> np.ndarray:
+    offsets = days - start_day
+    in_range = (days != NO_DAY) & (offsets >= 0) & (offsets < span)
+    dense = np.full(span, np.nan)
+    dense[offsets[in_range]] = values[in_range]
+    return dense
+
+
+def _parse_day(value: str) -> int:
+    try:
+        return int(np.datetime64(value[:10], "D").astype(np.int64))
+    except ValueError:
+        return NO_DAY
@@ -38,11 +38,12 @@ import {
   StatusLabel,
 } from '@/components/ui/kibo-ui/status';
 import {
-  fetchAnalysis,
   isValidTicker,
   normalizeTicker,
+  streamAnalysis,
   type AnalysisResponse,
 } from '@/lib/api';
+import { formatDateTime } from '@/lib/format';
 
 export function DashboardClient() {
   const searchParams = useSearchParams();
@@ -71,15 +72,29 @@ export function DashboardClient() {
       setError(null);
 
       try {
-        const result = await fetchAnalysis(
+        let hasFirstSection = false;
+        const result = await streamAnalysis(
           ticker,
           { period: activeRange.period, days: activeRange.days, limit: 30 },
+          (partial) => {
+            if (controller.signal.aborted) return;
+
+            setAnalysis(partial);
+            if (!hasFirstSection) {
+              hasFirstSection = true;
+              setLoading(false);
+            }
+          },
           controller.signal,
         );
 
         if (controller.signal.aborted) return;
 
         setAnalysis(result);
+        if (hasFirstSection) {
+          abortControllerRef.current = null;
+          return;
+        }
         setIsCompleting(true);
         completionTimer = window.setTimeout(() => {
           if (controller.signal.aborted) return;
@@ -159,6 +174,11 @@ export function DashboardClient() {
   const stock = analysis.stock;
   const metrics = analysis.metrics;
   const generatedAt = new Date(analysis.generatedAt);
+  const sourceFreshness = Object.values(analysis.freshness ?? {});
+  const oldestFetchedAt = sourceFreshness
+    .map((source) => source.fetchedAt)
+    .sort()[0];
+  const isRefreshing = sourceFreshness.some((source) => source.stale);
   const localTimeZone = Intl.DateTimeFormat().resolvedOptions().timeZone;
 
   return (
@@ -224,6 +244,12 @@ export function DashboardClient() {
           <StatusIndicator />
           <StatusLabel>Exploratory sentiment tool</StatusLabel>
         </Status>
+        {oldestFetchedAt ? (
+          <span>
+            Data as of {formatDateTime(oldestFetchedAt)}
+            {isRefreshing ? ' · refreshing' : ''}
+          </span>
+        ) : null}
         <RelativeTime
           dateFormatOptions={{ month: 'short', day: 'numeric' }}
           time={generatedAt}
@@ -2,6 +2,7 @@ export type SentimentLabel = 'positive' | 'neutral' | 'negative';
 export type AlignmentLabel = 'aligned' | 'inverse' | 'mixed' | 'insufficient_data';
 export type PriceDirection = 'up' | 'down' | 'flat' | 'unknown';
 export type AnalysisPeriod = '5d' | '1mo' | '3mo' | '6mo' | '1y' | '2y' | '5y' | 'all';
+export type HistoryFormat = 'rows' | 'columnar' | 'columnar-delta';
 
 export interface StockHistoryPoint {
   date: string;
@@ -12,6 +13,17 @@ export interface StockHistoryPoint {
   volume: number | null;
 }
 
+export interface StockHistoryColumns {
+  date: string[] | null;
+  dateStart: string | null;
+  dateDeltas: number[] | null;
+  open: (number | null)[];
+  high: (number | null)[];
+  low: (number | null)[];
+  close: (number | null)[];
+  volume: (number | null)[];
+}
+
 export interface StockSummary {
   symbol: string;
   name?: string | null;
@@ -29,6 +41,7 @@ export interface StockSummary {
   peRatio?: number | null;
   beta?: number | null;
   history: StockHistoryPoint[];
+  historyColumns?: StockHistoryColumns | null;
 }
 
 export interface RedditPost {
@@ -61,6 +74,17 @@ export interface SentimentTimeseriesPoint {
   post_count: number;
 }
 
+export interface RollingCorrelationPoint {
+  date: string;
+  correlation: number | null;
+}
+
+export interface LaggedCorrelation {
+  lagDays: number;
+  correlation: number | null;
+  observations: number;
+}
+
 export interface AnalysisMetrics {
   averageSentiment: number | null;
   priceChange: number | null;
@@ -70,6 +94,16 @@ export interface AnalysisMetrics {
   alignmentLabel: string;
   inverseSignal: string;
   correlation: number | null;
+  rollingWindow: number | null;
+  rollingCorrelation: RollingCorrelationPoint[];
+  laggedCorrelations: LaggedCorrelation[];
+  strongestLeadDays: number | null;
+}
+
+export interface SourceFreshness {
+  fetchedAt: string;
+  freshUntil: string;
+  stale: boolean;
 }
 
 export interface AnalysisResponse {
@@ -80,10 +114,30 @@ export interface AnalysisResponse {
   posts: RedditPost[];
   metrics: AnalysisMetrics;
   generatedAt: string;
+  freshness: Record<string, SourceFreshness>;
   sources: string[];
   partialErrors: string[];
 }
 
+export type AnalysisStreamSummary = Pick<
+  AnalysisResponse,
+  'ticker' | 'generatedAt' | 'freshness' | 'sources' | 'partialErrors'
+>;
+
+export type AnalysisStreamEvent =
+  | { event: 'stock'; data: StockSummary | null }
+  | { event: 'sentiment'; data: SentimentSummary }
+  | { event: 'posts'; data: RedditPost[] }
+  | { event: 'sentimentSeries'; data: SentimentTimeseriesPoint[] }
+  | { event: 'metrics'; data: AnalysisMetrics }
+  | { event: 'done'; data: AnalysisStreamSummary };
+
+export interface BatchAnalysisResponse {
+  results: AnalysisResponse[];
+  errors: Record<string, string>;
+  generatedAt: string;
+}
+
 const DEFAULT_API_URL =
   process.env.NODE_ENV === 'development'
     ? 'http://localhost:8000'
@@ -102,29 +156,173 @@ export interface FetchAnalysisOptions {
   period?: AnalysisPeriod;
   days?: number;
   limit?: number;
+  historyFormat?: HistoryFormat;
+}
+
+function analysisParams(options: FetchAnalysisOptions) {
+  return new URLSearchParams({
+    period: options.period || '1mo',
+    days: String(options.days || 30),
+    limit: String(options.limit || 30),
+    historyFormat: options.historyFormat || 'columnar-delta',
+  });
+}
+
+const DAY_MS = 24 * 60 * 60 * 1000;
+
+function columnDates(columns: StockHistoryColumns): string[] {
+  if (columns.date) return columns.date;
+  if (!columns.dateStart || !columns.dateDeltas) return [];
+
+  const [year, month, day] = columns.dateStart.split('-').map(Number);
+  let timestamp = Date.UTC(year, month - 1, day);
+  return columns.dateDeltas.map((delta) => {
+    timestamp += delta * DAY_MS;
+    return new Date(timestamp).toISOString().slice(0, 10);
+  });
+}
+
+export function decodeHistoryColumns(columns: StockHistoryColumns): StockHistoryPoint[] {
+  return columnDates(columns).map((date, index) => ({
+    date,
+    open: columns.open[index] ?? null,
+    high: columns.high[index] ?? null,
+    low: columns.low[index] ?? null,
+    close: columns.close[index] ?? null,
+    volume: columns.volume[index] ?? null,
+  }));
+}
+
+function decodeStock(stock: StockSummary | null): StockSummary | null {
+  if (!stock?.historyColumns) return stock;
+  const { historyColumns, ...summary } = stock;
+  return { ...summary, history: decodeHistoryColumns(historyColumns) };
+}
+
+function decodeAnalysis(analysis: AnalysisResponse): AnalysisResponse {
+  return { ...analysis, stock: decodeStock(analysis.stock) };
 }
 
-export async function fetchAnalysis(
+async function readJson<T>(response: Response): Promise<T> {
+  if (!response.ok) {
+    const detail = await response.json().catch(() => null);
+    const message = detail?.detail || `Request failed with ${response.status}`;
+    throw new Error(typeof message === 'string' ? message : `Request failed with ${response.status}`);
+  }
+
+  return response.json();
+}
+
+export async function fetchBatchAnalysis(
+  tickers: string[],
+  options: FetchAnalysisOptions = {},
+  signal?: AbortSignal,
+): Promise<BatchAnalysisResponse> {
+  const params = analysisParams(options);
+  params.set('tickers', tickers.map(normalizeTicker).join(','));
+  const response = await fetch(`${API_URL}/api/analysis/batch?${params.toString()}`, { signal });
+  const batch = await readJson<BatchAnalysisResponse>(response);
+
+  return { ...batch, results: batch.results.map(decodeAnalysis) };
+}
+
+function emptyAnalysis(ticker: string): AnalysisResponse {
+  return {
+    ticker,
+    stock: null,
+    sentiment: {
+      label: 'neutral',
+      displayLabel: 'Loading Reddit posts',
+      score: 0,
+      postCount: 0,
+    },
+    sentimentSeries: [],
+    posts: [],
+    metrics: {
+      averageSentiment: null,
+      priceChange: null,
+      priceChangePercent: null,
+      priceDirection: 'unknown',
+      alignment: 'insufficient_data',
+      alignmentLabel: 'Not enough data yet',
+      inverseSignal: 'unknown',
+      correlation: null,
+      rollingWindow: null,
+      rollingCorrelation: [],
+      laggedCorrelations: [],
+      strongestLeadDays: null,
+    },
+    generatedAt: new Date().toISOString(),
+    freshness: {},
+    sources: [],
+    partialErrors: [],
+  };
+}
+
+function applyStreamEvent(analysis: AnalysisResponse, message: AnalysisStreamEvent): AnalysisResponse {
+  switch (message.event) {
+    case 'stock':
+      return { ...analysis, stock: decodeStock(message.data) };
+    case 'sentiment':
+      return { ...analysis, sentiment: message.data };
+    case 'posts':
+      return { ...analysis, posts: message.data };
+    case 'sentimentSeries':
+      return { ...analysis, sentimentSeries: message.data };
+    case 'metrics':
+      return { ...analysis, metrics: message.data };
+    case 'done':
+      return { ...analysis, ...message.data };
+  }
+}
+
+export async function streamAnalysis(
   ticker: string,
   options: FetchAnalysisOptions = {},
+  onUpdate: (analysis: AnalysisResponse, event: AnalysisStreamEvent['event']) => void,
   signal?: AbortSignal,
 ): Promise<AnalysisResponse> {
   const normalizedTicker = normalizeTicker(ticker);
-  const params = new URLSearchParams({
-    period: options.period || '1mo',
-    days: String(options.days || 30),
-    limit: String(options.limit || 30),
-  });
+  const params = analysisParams(options);
   const response = await fetch(
-    `${API_URL}/api/analysis/${encodeURIComponent(normalizedTicker)}?${params.toString()}`,
+    `${API_URL}/api/analysis/${encodeURIComponent(normalizedTicker)}/stream?${params.toString()}`,
     { signal },
   );
 
   if (!response.ok) {
-    const detail = await response.json().catch(() => null);
-    const message = detail?.detail || `Request failed with ${response.status}`;
-    throw new Error(message);
+    return decodeAnalysis(await readJson<AnalysisResponse>(response));
   }
 
-  return response.json();
+  if (!response.body) {
+    const fallback = await fetch(
+      `${API_URL}/api/analysis/${encodeURIComponent(normalizedTicker)}?${params.toString()}`,
+      { signal },
+    );
+    const analysis = decodeAnalysis(await readJson<AnalysisResponse>(fallback));
+    onUpdate(analysis, 'done');
+    return analysis;
+  }
+
+  const reader = response.body.getReader();
+  const decoder = new TextDecoder();
+  let analysis = emptyAnalysis(normalizedTicker);
+  let buffered = '';
+
+  while (true) {
+    const { done, value } = await reader.read();
+    buffered += decoder.decode(value, { stream: !done });
+    const lines = buffered.split('\n');
+    buffered = lines.pop() ?? '';
+
+    for (const line of lines) {
+      if (!line.trim()) continue;
+      const message = JSON.parse(line) as AnalysisStreamEvent;
+      analysis = applyStreamEvent(analysis, message);
+      onUpdate(analysis, message.event);
+    }
+
+    if (done) break;
+  }
+
+  return analysis;
 }